@@ -0,0 +1,50 @@
+"""store requested data as json
+
+Revision ID: 5b9e27c4d1a8
+Revises: a3c81e5f2d90
+Create Date: 2026-10-19 13:41:05.218334+00:00
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5b9e27c4d1a8"
+down_revision = "a3c81e5f2d90"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # the column already contains JSON encoded strings, which are converted in place
+    with op.batch_alter_table("change") as batch_op:
+        batch_op.alter_column(
+            "requested_data",
+            existing_type=sa.VARCHAR(),
+            type_=sa.JSON().with_variant(postgresql.JSONB(), "postgresql"),
+            existing_nullable=False,
+            postgresql_using="requested_data::jsonb",
+        )
+
+    op.create_index(
+        "change_requested_data",
+        "change",
+        ["requested_data"],
+        postgresql_using="gin",
+        postgresql_ops={"requested_data": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("change_requested_data", table_name="change")
+
+    with op.batch_alter_table("change") as batch_op:
+        batch_op.alter_column(
+            "requested_data",
+            existing_type=sa.JSON().with_variant(postgresql.JSONB(), "postgresql"),
+            type_=sa.VARCHAR(),
+            existing_nullable=False,
+            postgresql_using="requested_data::text",
+        )
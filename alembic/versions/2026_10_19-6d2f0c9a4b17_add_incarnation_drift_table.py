@@ -0,0 +1,36 @@
+"""add incarnation drift table
+
+Revision ID: 6d2f0c9a4b17
+Revises: 001f927357ef
+Create Date: 2026-10-19 09:12:41.318406+00:00
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6d2f0c9a4b17"
+down_revision = "001f927357ef"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "incarnation_drift",
+        sa.Column("incarnation_id", sa.Integer(), nullable=False),
+        sa.Column("incarnation_commit_sha", sa.String(), nullable=False),
+        sa.Column("template_repository_version_hash", sa.String(), nullable=False),
+        sa.Column("drifted", sa.Boolean(), nullable=False),
+        sa.Column("added_files", sa.String(), nullable=False),
+        sa.Column("modified_files", sa.String(), nullable=False),
+        sa.Column("removed_files", sa.String(), nullable=False),
+        sa.Column("scanned_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["incarnation_id"], ["incarnation.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("incarnation_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("incarnation_drift")
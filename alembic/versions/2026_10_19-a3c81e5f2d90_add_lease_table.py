@@ -0,0 +1,30 @@
+"""add lease table
+
+Revision ID: a3c81e5f2d90
+Revises: 6d2f0c9a4b17
+Create Date: 2026-10-19 11:02:17.550912+00:00
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "a3c81e5f2d90"
+down_revision = "6d2f0c9a4b17"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "lease",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("holder", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("lease")
@@ -0,0 +1,38 @@
+"""track change progress
+
+Revision ID: c4e7d19b8a26
+Revises: e8f1a6b3c052
+Create Date: 2026-10-19 18:27:31.540981+00:00
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c4e7d19b8a26"
+down_revision = "e8f1a6b3c052"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("change") as batch_op:
+        batch_op.add_column(sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column("merge_request_title", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("merge_request_description", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("merge_request_automerge", sa.Boolean(), nullable=True))
+
+    change = sa.table("change", sa.column("created_at"), sa.column("updated_at"))
+    op.execute(change.update().values(updated_at=change.c.created_at))
+
+    with op.batch_alter_table("change") as batch_op:
+        batch_op.alter_column("updated_at", existing_type=sa.DateTime(timezone=True), nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("change") as batch_op:
+        batch_op.drop_column("merge_request_automerge")
+        batch_op.drop_column("merge_request_description")
+        batch_op.drop_column("merge_request_title")
+        batch_op.drop_column("updated_at")
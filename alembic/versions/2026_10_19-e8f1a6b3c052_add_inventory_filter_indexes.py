@@ -0,0 +1,31 @@
+"""add inventory filter indexes
+
+Revision ID: e8f1a6b3c052
+Revises: 5b9e27c4d1a8
+Create Date: 2026-10-19 15:12:48.903517+00:00
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e8f1a6b3c052"
+down_revision = "5b9e27c4d1a8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("incarnation_template_repository", "incarnation", ["template_repository"])
+    op.create_index(
+        "change_requested_version",
+        "change",
+        ["requested_version"],
+        postgresql_ops={"requested_version": "text_pattern_ops"},
+    )
+    op.create_index("change_created_at", "change", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("change_created_at", table_name="change")
+    op.drop_index("change_requested_version", table_name="change")
+    op.drop_index("incarnation_template_repository", table_name="incarnation")
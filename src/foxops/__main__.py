@@ -1,20 +1,40 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from starlette.responses import FileResponse
 
 from foxops import __version__
+from foxops.database.repositories.lease import LeaseRepository
 from foxops.dependencies import (
+    dispose_database_engine,
+    get_change_repository,
+    get_database_engine,
+    get_database_replica_engine,
+    get_database_settings,
+    get_drift_repository,
+    get_event_bus,
     get_hoster,
     get_hoster_settings,
+    get_incarnation_repository,
+    get_revision_resolver,
     get_settings,
     static_token_auth_scheme,
 )
 from foxops.error_handlers import __error_handlers__
 from foxops.logger import get_logger, setup_logging
-from foxops.middlewares import request_id_middleware, request_time_middleware
+from foxops.middlewares import (
+    read_your_writes_middleware,
+    request_id_middleware,
+    request_time_middleware,
+)
 from foxops.openapi import custom_openapi
-from foxops.routers import auth, incarnations, not_found, version
+from foxops.routers import auth, incarnations, metrics, not_found, version
+from foxops.services.change import ChangeService
+from foxops.services.drift import DriftService, scan_periodically
+from foxops.services.reconciler import reconcile_periodically
+from foxops.settings import get_drift_settings, get_reconciler_settings
 
 #: Holds the module logger instance
 logger = get_logger(__name__)
@@ -29,6 +49,7 @@ def create_app():
     app = FastAPI()
 
     settings = get_settings()
+    background_tasks: list[asyncio.Task] = []
 
     @app.on_event("startup")
     async def startup():
@@ -38,11 +59,49 @@ def create_app():
 
         setup_logging(level=settings.log_level)
 
+        # create the database engines (and their connection pools) up front, instead of with the first request
+        get_database_engine(get_database_settings())
+        get_database_replica_engine(get_database_settings())
+
+        drift_settings = get_drift_settings()
+        if drift_settings.scan_interval_seconds > 0:
+            background_tasks.append(
+                asyncio.create_task(
+                    scan_periodically(
+                        create_drift_service,
+                        interval_seconds=drift_settings.scan_interval_seconds,
+                        max_concurrency=drift_settings.max_concurrent_scans,
+                    )
+                )
+            )
+
+        reconciler_settings = get_reconciler_settings()
+        if reconciler_settings.interval_seconds > 0:
+            background_tasks.append(
+                asyncio.create_task(
+                    reconcile_periodically(
+                        create_change_service,
+                        LeaseRepository(get_database_engine(get_database_settings())),
+                        interval_seconds=reconciler_settings.interval_seconds,
+                    )
+                )
+            )
+
         logger.info(f"Started foxops {__version__}")
 
+    @app.on_event("shutdown")
+    async def shutdown():
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        background_tasks.clear()
+
+        await dispose_database_engine()
+
     # Add middlewares
     app.middleware("http")(request_id_middleware)
     app.middleware("http")(request_time_middleware)
+    app.middleware("http")(read_your_writes_middleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["http://localhost:3000"],
@@ -58,6 +117,7 @@ def create_app():
     # Add routes to the publicly available router (no authentication)
     public_router = APIRouter()
     public_router.include_router(version.router)
+    public_router.include_router(metrics.router)
     public_router.include_router(auth.router)
 
     # Add routes to the protected router (authentication required)
@@ -94,6 +154,28 @@ def create_app():
     return app
 
 
+# the services of background jobs don't get the read replica engine: they read what they write,
+# which the replica might not have yet
+def create_change_service() -> ChangeService:
+    database_engine = get_database_engine(get_database_settings())
+    return ChangeService(
+        hoster=get_hoster(get_hoster_settings()),
+        incarnation_repository=get_incarnation_repository(database_engine, None),
+        change_repository=get_change_repository(database_engine, None),
+        revision_resolver=get_revision_resolver(),
+        event_bus=get_event_bus(),
+    )
+
+
+def create_drift_service() -> DriftService:
+    database_engine = get_database_engine(get_database_settings())
+    return DriftService(
+        hoster=get_hoster(get_hoster_settings()),
+        incarnation_repository=get_incarnation_repository(database_engine, None),
+        drift_repository=get_drift_repository(database_engine, None),
+    )
+
+
 def main_dev():
     """Main entrypoint for LOCAL DEVELOPMENT ONLY!"""
     import uvicorn  # type: ignore
@@ -0,0 +1,32 @@
+from typing import Any
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from foxops.settings import DatabaseSettings
+
+
+def create_database_engine(settings: DatabaseSettings, replica: bool = False) -> AsyncEngine:
+    """Creates the engine of the database - or of its read replica, which must be configured then."""
+    if replica:
+        assert settings.replica_url is not None
+        url = make_url(settings.replica_url.get_secret_value())
+    else:
+        url = make_url(settings.url.get_secret_value())
+
+    kwargs: dict[str, Any] = {"pool_pre_ping": settings.pool_pre_ping}
+    if url.get_backend_name() != "sqlite":
+        # SQLite uses a pool of a single connection (or none at all), which can't be sized
+        kwargs.update(
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_timeout=settings.pool_timeout,
+            pool_recycle=settings.pool_recycle,
+        )
+    if url.get_driver_name() == "asyncpg":
+        kwargs["connect_args"] = {
+            "prepared_statement_cache_size": settings.statement_cache_size,
+            "command_timeout": settings.statement_timeout,
+        }
+
+    return create_async_engine(url, future=True, echo=False, **kwargs)
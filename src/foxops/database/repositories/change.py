@@ -1,14 +1,34 @@
 import enum
+import json
+import math
 from datetime import datetime, timezone
-from typing import AsyncIterator
+from typing import AsyncIterator, Mapping
 
 from pydantic import BaseModel
-from sqlalchemy import and_, delete, insert, select, update
+from sqlalchemy import (
+    Text,
+    and_,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    type_coerce,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from sqlalchemy.ext.asyncio import AsyncEngine
 
+from foxops.database.repositories.incarnation.errors import (
+    IncarnationNotFoundError as IncarnationNotFoundInDBError,
+)
 from foxops.database.schema import change, incarnations
-from foxops.errors import FoxopsError, IncarnationNotFoundError
+from foxops.database.unit_of_work import read_only_unit_of_work, unit_of_work
+from foxops.engine import TemplateData
+from foxops.errors import FoxopsError
 
 
 class ChangeConflictError(FoxopsError):
@@ -49,18 +69,30 @@ class ChangeInDB(BaseModel):
 
     type: ChangeType
     created_at: datetime
+    updated_at: datetime
 
     requested_version_hash: str
     requested_version: str
-    requested_data: str
+    requested_data: TemplateData
 
     merge_request_id: str | None
     merge_request_branch_name: str | None
+    merge_request_title: str | None
+    merge_request_description: str | None
+    merge_request_automerge: bool | None
 
     class Config:
         orm_mode = True
 
 
+class ChangeWithIncarnationInDB(ChangeInDB):
+    """Represents a change combined with the incarnation it belongs to."""
+
+    incarnation_repository: str
+    target_directory: str
+    template_repository: str
+
+
 class IncarnationWithChangesSummary(BaseModel):
     """Represents an incarnation combined with information about its latest change."""
 
@@ -70,6 +102,7 @@ class IncarnationWithChangesSummary(BaseModel):
     target_directory: str
     template_repository: str
 
+    change_id: int
     revision: int
     type: ChangeType
     commit_sha: str
@@ -81,9 +114,26 @@ class IncarnationWithChangesSummary(BaseModel):
         orm_mode = True
 
 
+def _json_values_with_text(text: str) -> list:
+    """Returns the JSON values whose text representation is the given string.
+
+    Besides the string itself, that's the number or boolean which the string spells out (e.g. `3` for "3").
+    """
+    values: list = [text]
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return values
+
+    if isinstance(value, (bool, int, float)) and math.isfinite(value) and json.dumps(value) == text:
+        values.append(value)
+    return values
+
+
 class ChangeRepository:
-    def __init__(self, engine: AsyncEngine) -> None:
+    def __init__(self, engine: AsyncEngine, replica_engine: AsyncEngine | None = None) -> None:
         self.engine = engine
+        self.replica_engine = replica_engine
 
     async def create_change(
         self,
@@ -94,9 +144,12 @@ class ChangeRepository:
         commit_pushed: bool,
         requested_version_hash: str,
         requested_version: str,
-        requested_data: str,
+        requested_data: TemplateData,
         merge_request_id: str | None = None,
         merge_request_branch_name: str | None = None,
+        merge_request_title: str | None = None,
+        merge_request_description: str | None = None,
+        merge_request_automerge: bool | None = None,
     ) -> ChangeInDB:
         """
         Create a new change for the given incarnation with the given "revision" number.
@@ -106,16 +159,21 @@ class ChangeRepository:
         change with an identical revision number was created py another party.
 
         This is a useful mechanism to prevent conflicting changes.
+
+        For merge request changes, the merge request that is going to be created should be given,
+        so that it can be created the same way if the creation of the change is interrupted.
         """
 
-        async with self.engine.connect() as conn:
+        now = datetime.now(timezone.utc)
+        async with unit_of_work(self.engine) as conn:
             query = (
                 insert(change)
                 .values(
                     incarnation_id=incarnation_id,
                     revision=revision,
                     type=change_type.value,
-                    created_at=datetime.now(timezone.utc),
+                    created_at=now,
+                    updated_at=now,
                     requested_version_hash=requested_version_hash,
                     requested_version=requested_version,
                     requested_data=requested_data,
@@ -123,6 +181,9 @@ class ChangeRepository:
                     commit_pushed=commit_pushed,
                     merge_request_id=merge_request_id,
                     merge_request_branch_name=merge_request_branch_name,
+                    merge_request_title=merge_request_title,
+                    merge_request_description=merge_request_description,
+                    merge_request_automerge=merge_request_automerge,
                 )
                 .returning(*change.columns)
             )
@@ -132,7 +193,6 @@ class ChangeRepository:
                 raise ChangeConflictError(incarnation_id, revision)
 
             row = result.one()
-            await conn.commit()
 
         return ChangeInDB.from_orm(row)
 
@@ -144,9 +204,10 @@ class ChangeRepository:
         commit_sha: str,
         requested_version_hash: str,
         requested_version: str,
-        requested_data: str,
+        requested_data: TemplateData,
     ) -> ChangeInDB:
-        async with self.engine.begin() as conn:
+        now = datetime.now(timezone.utc)
+        async with unit_of_work(self.engine) as conn:
             query_insert_incarnation = (
                 insert(incarnations)
                 .values(
@@ -165,7 +226,8 @@ class ChangeRepository:
                     incarnation_id=incarnation_id,
                     revision=1,
                     type=ChangeType.DIRECT.value,
-                    created_at=datetime.now(timezone.utc),
+                    created_at=now,
+                    updated_at=now,
                     requested_version_hash=requested_version_hash,
                     requested_version=requested_version,
                     requested_data=requested_data,
@@ -177,18 +239,16 @@ class ChangeRepository:
             result = await conn.execute(query_insert_change)
 
             row = result.one()
-            await conn.commit()
 
         return ChangeInDB.from_orm(row)
 
     async def delete_incarnation(self, id_: int) -> None:
-        async with self.engine.connect() as conn:
+        async with unit_of_work(self.engine) as conn:
             await conn.execute(delete(incarnations).where(incarnations.c.id == id_))
-            await conn.commit()
 
     async def get_change(self, id_: int) -> ChangeInDB:
         query = select(change).where(change.c.id == id_)
-        async with self.engine.connect() as conn:
+        async with read_only_unit_of_work(self.engine, self.replica_engine) as conn:
             result = await conn.execute(query)
 
             try:
@@ -202,7 +262,7 @@ class ChangeRepository:
         query = (
             select(change).where(change.c.incarnation_id == incarnation_id).order_by(change.c.revision.desc()).limit(1)
         )
-        async with self.engine.connect() as conn:
+        async with unit_of_work(self.engine) as conn:
             result = await conn.execute(query)
 
             try:
@@ -212,6 +272,87 @@ class ChangeRepository:
             else:
                 return ChangeInDB.from_orm(row)
 
+    def _change_with_incarnation_query(self):
+        return select(
+            change,
+            incarnations.c.incarnation_repository,
+            incarnations.c.target_directory,
+            incarnations.c.template_repository,
+        ).join(incarnations, incarnations.c.id == change.c.incarnation_id)
+
+    async def get_change_with_incarnation(self, id_: int) -> ChangeWithIncarnationInDB:
+        query = self._change_with_incarnation_query().where(change.c.id == id_)
+        async with unit_of_work(self.engine) as conn:
+            result = await conn.execute(query)
+
+            try:
+                row = result.one()
+            except NoResultFound:
+                raise ChangeNotFoundError(id_)
+            else:
+                return ChangeWithIncarnationInDB.from_orm(row)
+
+    async def get_latest_change_with_incarnation(self, incarnation_id: int) -> ChangeWithIncarnationInDB:
+        """Returns the latest change (the highest revision) of the given incarnation, together with the incarnation."""
+        query = (
+            self._change_with_incarnation_query()
+            .where(change.c.incarnation_id == incarnation_id)
+            .order_by(change.c.revision.desc())
+            .limit(1)
+        )
+        async with unit_of_work(self.engine) as conn:
+            row = (await conn.execute(query)).one_or_none()
+            if row is not None:
+                return ChangeWithIncarnationInDB.from_orm(row)
+
+            # find out what is missing - the incarnation or its changes
+            query_incarnation_exists = select(incarnations.c.id).where(incarnations.c.id == incarnation_id)
+            if (await conn.execute(query_incarnation_exists)).one_or_none() is None:
+                raise IncarnationNotFoundInDBError(f"could not find incarnation in DB with id: {incarnation_id}")
+            raise IncarnationHasNoChangesError(incarnation_id)
+
+    async def list_latest_changes_with_incarnation(self, incarnation_ids: list[int]) -> list[ChangeWithIncarnationInDB]:
+        """Like `get_latest_change_with_incarnation()`, but for many incarnations at once (ordered by their ID).
+
+        Incarnations which don't exist or don't have any changes are left out.
+        """
+        change_newer = change.alias("change_newer")
+        query = (
+            self._change_with_incarnation_query()
+            # filter out all changes for which a newer one exists (see `_incarnations_with_changes_summary_query()`)
+            .join(
+                change_newer,
+                and_(
+                    change_newer.c.incarnation_id == change.c.incarnation_id,
+                    change.c.revision < change_newer.c.revision,
+                ),
+                isouter=True,
+            )
+            .where(change_newer.c.id.is_(None))
+            .where(change.c.incarnation_id.in_(incarnation_ids))
+            .order_by(change.c.incarnation_id)
+        )
+        async with unit_of_work(self.engine) as conn:
+            return [ChangeWithIncarnationInDB.from_orm(row) for row in await conn.execute(query)]
+
+    async def list_incomplete_changes(self, updated_before: datetime) -> list[ChangeWithIncarnationInDB]:
+        """Returns all changes whose commit was not pushed yet or whose merge request was not created yet
+        and which did not make any progress since the given point in time."""
+        query = (
+            self._change_with_incarnation_query()
+            .where(
+                or_(
+                    change.c.commit_pushed.is_(False),
+                    and_(change.c.type == ChangeType.MERGE_REQUEST.value, change.c.merge_request_id.is_(None)),
+                )
+            )
+            .where(change.c.updated_at < updated_before)
+            .order_by(change.c.id)
+        )
+
+        async with unit_of_work(self.engine) as conn:
+            return [ChangeWithIncarnationInDB.from_orm(row) for row in await conn.execute(query)]
+
     def _incarnations_with_changes_summary_query(self):
         alias_change = change.alias("change")
         alias_change_newer = change.alias("change_newer")
@@ -225,6 +366,7 @@ class ChangeRepository:
                     incarnations.c.incarnation_repository,
                     incarnations.c.target_directory,
                     incarnations.c.template_repository,
+                    alias_change.c.id.label("change_id"),
                     alias_change.c.revision,
                     alias_change.c.type,
                     alias_change.c.requested_version,
@@ -250,34 +392,95 @@ class ChangeRepository:
             ),
         )
 
-    async def list_incarnations_with_changes_summary(self) -> AsyncIterator[IncarnationWithChangesSummary]:
-        _, _, query = self._incarnations_with_changes_summary_query()
+    def _template_data_filter(self, requested_data_column, template_data: Mapping[str, str]):
+        if self.engine.dialect.name == "postgresql":
+            # containment queries are supported by the GIN index on the column. The requested values are typed,
+            # so each JSON value whose text representation is the given string is looked up.
+            return and_(
+                *(
+                    or_(
+                        *(
+                            requested_data_column.op("@>")(type_coerce({key: candidate}, JSONB))
+                            for candidate in _json_values_with_text(value)
+                        )
+                    )
+                    for key, value in template_data.items()
+                )
+            )
 
-        async with self.engine.connect() as conn:
-            for row in await conn.execute(query):
-                yield IncarnationWithChangesSummary.from_orm(row)
+        return and_(
+            *(
+                self._template_data_value_as_text(requested_data_column, key) == value
+                for key, value in template_data.items()
+            )
+        )
 
-    async def get_incarnation_by_repo_and_target_dir(
-        self, incarnation_repository: str, target_directory: str
-    ) -> IncarnationWithChangesSummary:
-        incarnation_c, _, query = self._incarnations_with_changes_summary_query()
-        query = query.where(incarnation_c.incarnation_repository == incarnation_repository).where(
-            incarnation_c.target_directory == target_directory
+    def _template_data_value_as_text(self, requested_data_column, key: str):
+        # SQLite extracts JSON numbers and booleans as SQL numbers - which never equal the given strings
+        path = f'$."{key}"'
+        return case(
+            (
+                func.json_type(requested_data_column, path).in_(["true", "false"]),
+                func.json_type(requested_data_column, path),
+            ),
+            else_=cast(func.json_extract(requested_data_column, path), Text),
         )
 
-        async with self.engine.connect() as conn:
-            result = await conn.execute(query)
-            try:
-                row = result.one()
-            except NoResultFound:
-                raise IncarnationNotFoundError(0)
+    async def list_incarnations_with_changes_summary(
+        self,
+        *,
+        incarnation_repository: str | None = None,
+        target_directory: str | None = None,
+        template_repository: str | None = None,
+        requested_version: str | None = None,
+        requested_version_prefix: str | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        change_type: ChangeType | None = None,
+        has_merge_request: bool | None = None,
+        template_data: Mapping[str, str] | None = None,
+    ) -> AsyncIterator[IncarnationWithChangesSummary]:
+        """Lists all incarnations together with a summary of their latest change.
+
+        The filters which are given are combined, all of them apply to the latest change of an incarnation.
+        With `template_data`, only incarnations whose latest change requested all the given template data values
+        are listed. The values are compared with the text representation of the requested values
+        (e.g. `3` for a number or `true` for a boolean).
+        """
+        incarnation_c, change_c, query = self._incarnations_with_changes_summary_query()
+        if incarnation_repository is not None:
+            query = query.where(incarnation_c.incarnation_repository == incarnation_repository)
+        if target_directory is not None:
+            query = query.where(incarnation_c.target_directory == target_directory)
+        if template_repository is not None:
+            query = query.where(incarnation_c.template_repository == template_repository)
+        if requested_version is not None:
+            query = query.where(change_c.requested_version == requested_version)
+        if requested_version_prefix is not None:
+            query = query.where(change_c.requested_version.startswith(requested_version_prefix, autoescape=True))
+        if created_after is not None:
+            query = query.where(change_c.created_at >= created_after)
+        if created_before is not None:
+            query = query.where(change_c.created_at < created_before)
+        if change_type is not None:
+            query = query.where(change_c.type == change_type.value)
+        if has_merge_request is not None:
+            query = query.where(
+                change_c.merge_request_id.is_not(None) if has_merge_request else change_c.merge_request_id.is_(None)
+            )
+        if template_data:
+            query = query.where(self._template_data_filter(change_c.requested_data, template_data))
 
-        return IncarnationWithChangesSummary.from_orm(row)
+        # the rows are fetched up front, so that the connection isn't held while the caller iterates
+        async with read_only_unit_of_work(self.engine, self.replica_engine) as conn:
+            rows = (await conn.execute(query)).all()
+
+        for row in rows:
+            yield IncarnationWithChangesSummary.from_orm(row)
 
     async def delete_change(self, id_: int) -> None:
-        async with self.engine.connect() as conn:
+        async with unit_of_work(self.engine) as conn:
             result = await conn.execute(delete(change).where(change.c.id == id_))
-            await conn.commit()
 
         if result.rowcount == 0:
             raise ChangeNotFoundError(id_)
@@ -285,7 +488,7 @@ class ChangeRepository:
     async def update_commit_sha(self, id_: int, commit_sha: str) -> ChangeInDB:
         query_select_change_commit_pushed = select(change.c.commit_pushed).where(change.c.id == id_)
 
-        async with self.engine.begin() as conn:
+        async with unit_of_work(self.engine) as conn:
             # verify that the change exists and the referenced commit was not yet pushed
             # NOTE: Maybe it makes sense to move this into the business service, to also verify that the commit
             #       referenced in the DB does NOT exist in the target repo
@@ -300,10 +503,12 @@ class ChangeRepository:
 
             # all good, let's update the commit sha
             result = await conn.execute(
-                update(change).values(commit_sha=commit_sha).where(change.c.id == id_).returning(*change.columns)
+                update(change)
+                .values(commit_sha=commit_sha, updated_at=datetime.now(timezone.utc))
+                .where(change.c.id == id_)
+                .returning(*change.columns)
             )
             row = result.one()
-            await conn.commit()
 
         return ChangeInDB.from_orm(row)
 
@@ -313,12 +518,16 @@ class ChangeRepository:
     async def update_merge_request_id(self, id_: int, merge_request_id: str) -> ChangeInDB:
         return await self._update_one(id_, merge_request_id=merge_request_id)
 
+    async def touch_change(self, id_: int) -> ChangeInDB:
+        """Records that the creation of the given change is still making progress."""
+        return await self._update_one(id_)
+
     async def _update_one(self, id_: int, **kwargs) -> ChangeInDB:
+        kwargs["updated_at"] = datetime.now(timezone.utc)
         query = update(change).values(**kwargs).where(change.c.id == id_).returning(*change.columns)
-        async with self.engine.connect() as conn:
+        async with unit_of_work(self.engine) as conn:
             result = await conn.execute(query)
 
             row = result.one()
-            await conn.commit()
 
         return ChangeInDB.from_orm(row)
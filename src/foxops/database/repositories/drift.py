@@ -0,0 +1,108 @@
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator
+
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from foxops.database.schema import incarnation_drift
+from foxops.database.unit_of_work import read_only_unit_of_work, unit_of_work
+from foxops.errors import FoxopsError
+
+
+class IncarnationDriftNotFoundError(FoxopsError):
+    def __init__(self, incarnation_id: int) -> None:
+        super().__init__(f"Incarnation with id {incarnation_id} was not scanned for drift yet")
+
+
+class IncarnationDriftInDB(BaseModel):
+    incarnation_id: int
+
+    #: the commit of the incarnation repository that was scanned
+    incarnation_commit_sha: str
+    #: the template version the incarnation was compared against
+    template_repository_version_hash: str
+
+    drifted: bool
+    added_files: list[str]
+    modified_files: list[str]
+    removed_files: list[str]
+
+    scanned_at: datetime
+
+    @classmethod
+    def from_row(cls, row: Row) -> "IncarnationDriftInDB":
+        return cls(
+            incarnation_id=row.incarnation_id,
+            incarnation_commit_sha=row.incarnation_commit_sha,
+            template_repository_version_hash=row.template_repository_version_hash,
+            drifted=row.drifted,
+            added_files=json.loads(row.added_files),
+            modified_files=json.loads(row.modified_files),
+            removed_files=json.loads(row.removed_files),
+            scanned_at=row.scanned_at,
+        )
+
+
+class DriftRepository:
+    def __init__(self, engine: AsyncEngine, replica_engine: AsyncEngine | None = None) -> None:
+        self.engine = engine
+        self.replica_engine = replica_engine
+
+    async def save(
+        self,
+        incarnation_id: int,
+        incarnation_commit_sha: str,
+        template_repository_version_hash: str,
+        added_files: list[str],
+        modified_files: list[str],
+        removed_files: list[str],
+    ) -> IncarnationDriftInDB:
+        """Stores the result of a drift scan of the given incarnation, replacing the result of any previous scan."""
+
+        async with unit_of_work(self.engine) as conn:
+            await conn.execute(delete(incarnation_drift).where(incarnation_drift.c.incarnation_id == incarnation_id))
+
+            query = (
+                insert(incarnation_drift)
+                .values(
+                    incarnation_id=incarnation_id,
+                    incarnation_commit_sha=incarnation_commit_sha,
+                    template_repository_version_hash=template_repository_version_hash,
+                    drifted=bool(added_files or modified_files or removed_files),
+                    added_files=json.dumps(added_files),
+                    modified_files=json.dumps(modified_files),
+                    removed_files=json.dumps(removed_files),
+                    scanned_at=datetime.now(timezone.utc),
+                )
+                .returning(*incarnation_drift.columns)
+            )
+            result = await conn.execute(query)
+
+            return IncarnationDriftInDB.from_row(result.one())
+
+    async def get(self, incarnation_id: int) -> IncarnationDriftInDB:
+        if (drift := await self.get_or_none(incarnation_id)) is None:
+            raise IncarnationDriftNotFoundError(incarnation_id)
+        return drift
+
+    async def get_or_none(self, incarnation_id: int) -> IncarnationDriftInDB | None:
+        query = select(incarnation_drift).where(incarnation_drift.c.incarnation_id == incarnation_id)
+
+        async with unit_of_work(self.engine) as conn:
+            row = (await conn.execute(query)).one_or_none()
+
+        return None if row is None else IncarnationDriftInDB.from_row(row)
+
+    async def list(self, drifted: bool | None = None) -> AsyncIterator[IncarnationDriftInDB]:
+        query = select(incarnation_drift).order_by(incarnation_drift.c.incarnation_id)
+        if drifted is not None:
+            query = query.where(incarnation_drift.c.drifted == drifted)
+
+        async with read_only_unit_of_work(self.engine, self.replica_engine) as conn:
+            rows = (await conn.execute(query)).all()
+
+        for row in rows:
+            yield IncarnationDriftInDB.from_row(row)
@@ -10,11 +10,13 @@ from foxops.database.repositories.incarnation.errors import (
 )
 from foxops.database.repositories.incarnation.model import IncarnationInDB
 from foxops.database.schema import incarnations
+from foxops.database.unit_of_work import read_only_unit_of_work, unit_of_work
 
 
 class IncarnationRepository:
-    def __init__(self, engine: AsyncEngine) -> None:
+    def __init__(self, engine: AsyncEngine, replica_engine: AsyncEngine | None = None) -> None:
         self.engine = engine
+        self.replica_engine = replica_engine
 
     async def create(
         self,
@@ -22,7 +24,7 @@ class IncarnationRepository:
         target_directory: str,
         template_repository: str,
     ) -> IncarnationInDB:
-        async with self.engine.begin() as conn:
+        async with unit_of_work(self.engine) as conn:
             query = (
                 insert(incarnations)
                 .values(
@@ -46,14 +48,16 @@ class IncarnationRepository:
     async def list(self) -> AsyncIterator[IncarnationInDB]:
         query = select(incarnations)
 
-        async with self.engine.begin() as conn:
-            for row in await conn.execute(query):
-                yield IncarnationInDB.from_orm(row)
+        async with read_only_unit_of_work(self.engine, self.replica_engine) as conn:
+            rows = (await conn.execute(query)).all()
+
+        for row in rows:
+            yield IncarnationInDB.from_orm(row)
 
     async def get_by_id(self, id_: int) -> IncarnationInDB:
         query = select(incarnations).where(incarnations.c.id == id_)
 
-        async with self.engine.begin() as conn:
+        async with read_only_unit_of_work(self.engine, self.replica_engine) as conn:
             result = await conn.execute(query)
 
             try:
@@ -66,7 +70,7 @@ class IncarnationRepository:
     async def delete_by_id(self, id_: int) -> None:
         query = delete(incarnations).where(incarnations.c.id == id_)
 
-        async with self.engine.begin() as conn:
+        async with unit_of_work(self.engine) as conn:
             result = await conn.execute(query)
 
             if result.rowcount == 0:
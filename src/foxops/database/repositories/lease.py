@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from foxops.database.schema import lease
+
+
+class LeaseRepository:
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+
+    async def acquire(self, name: str, holder: str, duration: timedelta) -> bool:
+        """Acquires (or renews) the lease with the given name for `duration`.
+
+        Returns `False` if the lease is currently held by someone else (and did not expire yet).
+        """
+        now = datetime.now(timezone.utc)
+
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                update(lease)
+                .where(lease.c.name == name, or_(lease.c.holder == holder, lease.c.expires_at < now))
+                .values(holder=holder, expires_at=now + duration)
+            )
+            if result.rowcount == 1:
+                return True
+
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(insert(lease).values(name=name, holder=holder, expires_at=now + duration))
+        except IntegrityError:
+            # someone else holds the lease
+            return False
+
+        return True
+
+    async def release(self, name: str, holder: str) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(lease).where(lease.c.name == name, lease.c.holder == holder))
@@ -1,14 +1,17 @@
 from sqlalchemy import (
+    JSON,
     Boolean,
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     MetaData,
     String,
     Table,
     UniqueConstraint,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 
 meta = MetaData()
 
@@ -22,6 +25,7 @@ incarnations = Table(
     Column("template_repository", String, nullable=False),
     UniqueConstraint("incarnation_repository", "target_directory", name="incarnation_identity"),
 )
+Index("incarnation_template_repository", incarnations.c.template_repository)
 
 change = Table(
     "change",
@@ -31,13 +35,57 @@ change = Table(
     Column("revision", Integer, nullable=False),
     Column("type", String, nullable=False),
     Column("created_at", DateTime(timezone=True), nullable=False),
+    # refreshed by every step of carrying out the change - incomplete changes are only completed once it's stale
+    Column("updated_at", DateTime(timezone=True), nullable=False),
     Column("requested_version_hash", String, nullable=False),
     Column("requested_version", String, nullable=False),
-    Column("requested_data", String, nullable=False),
+    Column("requested_data", JSON().with_variant(JSONB(), "postgresql"), nullable=False),
     Column("commit_sha", String, nullable=False),
     Column("commit_pushed", Boolean, nullable=False),
     # fields for merge request changes
     Column("merge_request_id", String),
     Column("merge_request_branch_name", String),
+    # the merge request to create, so that an interrupted creation can be completed the same way
+    Column("merge_request_title", String),
+    Column("merge_request_description", String),
+    Column("merge_request_automerge", Boolean),
     UniqueConstraint("incarnation_id", "revision", name="change_incarnation_revision"),
 )
+# support filtering the inventory by the latest change of the incarnations (see `ChangeRepository`)
+Index(
+    "change_requested_version",
+    change.c.requested_version,
+    # also supports prefix queries on postgres, regardless of the collation
+    postgresql_ops={"requested_version": "text_pattern_ops"},
+)
+Index("change_created_at", change.c.created_at)
+# supports searching for changes by their template data on postgres (see `ChangeRepository`)
+Index(
+    "change_requested_data",
+    change.c.requested_data,
+    postgresql_using="gin",
+    postgresql_ops={"requested_data": "jsonb_path_ops"},
+)
+
+incarnation_drift = Table(
+    "incarnation_drift",
+    meta,
+    Column("incarnation_id", Integer, ForeignKey("incarnation.id", ondelete="CASCADE"), primary_key=True),
+    Column("incarnation_commit_sha", String, nullable=False),
+    Column("template_repository_version_hash", String, nullable=False),
+    Column("drifted", Boolean, nullable=False),
+    # JSON encoded lists of file paths (relative to the target directory of the incarnation)
+    Column("added_files", String, nullable=False),
+    Column("modified_files", String, nullable=False),
+    Column("removed_files", String, nullable=False),
+    Column("scanned_at", DateTime(timezone=True), nullable=False),
+)
+
+# leases make sure that periodic background jobs only run on one foxops replica at a time
+lease = Table(
+    "lease",
+    meta,
+    Column("name", String, primary_key=True),
+    Column("holder", String, nullable=False),
+    Column("expires_at", DateTime(timezone=True), nullable=False),
+)
@@ -0,0 +1,87 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+#: Holds the connection of the active unit of work, together with the task that owns it
+_active_connection: ContextVar[tuple[AsyncConnection, asyncio.Task | None] | None] = ContextVar(
+    "foxops_database_connection", default=None
+)
+
+
+@dataclass
+class _ReadYourWritesScope:
+    used_primary: bool = False
+
+
+#: Holds the scope in which reads may go to a replica, until the primary was used
+_read_your_writes_scope: ContextVar[_ReadYourWritesScope | None] = ContextVar(
+    "foxops_database_read_your_writes_scope", default=None
+)
+
+
+@contextmanager
+def read_your_writes() -> Iterator[None]:
+    """Allows read-only queries within the block to go to a read replica (see `read_only_unit_of_work()`).
+
+    As soon as the primary database is used within the block - including in tasks started from it - all further
+    reads go to the primary as well, so that they see what was written before despite the replication lag.
+    """
+    token = _read_your_writes_scope.set(_ReadYourWritesScope())
+    try:
+        yield
+    finally:
+        _read_your_writes_scope.reset(token)
+
+
+@asynccontextmanager
+async def unit_of_work(engine: AsyncEngine) -> AsyncIterator[AsyncConnection]:
+    """Shares a single connection and transaction between all database calls within the block.
+
+    The transaction is committed when the outermost block is left (and rolled back if it raises).
+    Nested blocks - like the ones of every repository method - join the active unit of work,
+    unless it belongs to another engine or another task (tasks inherit the context of their parent,
+    but must not use its connection concurrently).
+
+    Don't keep a unit of work open while waiting for anything else than the database,
+    because it holds on to a connection of the pool all the time.
+    """
+    current_task = asyncio.current_task()
+    if (active := _active_connection.get()) is not None:
+        conn, owner = active
+        if conn.engine is engine and owner is current_task:
+            yield conn
+            return
+
+    if (scope := _read_your_writes_scope.get()) is not None:
+        scope.used_primary = True
+
+    async with engine.begin() as conn:
+        token = _active_connection.set((conn, current_task))
+        try:
+            yield conn
+        finally:
+            _active_connection.reset(token)
+
+
+@asynccontextmanager
+async def read_only_unit_of_work(
+    engine: AsyncEngine, replica_engine: AsyncEngine | None
+) -> AsyncIterator[AsyncConnection]:
+    """Like `unit_of_work()`, but may use a connection of the read replica for queries which don't write.
+
+    The replica is only used within a `read_your_writes()` block that didn't use the primary yet,
+    and if no unit of work is active - which may have written something already.
+    Everywhere else the primary is used, because the replica lags behind.
+    """
+    scope = _read_your_writes_scope.get()
+    if replica_engine is None or scope is None or scope.used_primary or _active_connection.get() is not None:
+        async with unit_of_work(engine) as conn:
+            yield conn
+        return
+
+    async with replica_engine.connect() as conn:
+        yield conn
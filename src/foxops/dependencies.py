@@ -3,20 +3,29 @@ from functools import lru_cache
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.openapi.models import APIKey, APIKeyIn
 from fastapi.security.base import SecurityBase
-from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 
+from foxops.database.engine import create_database_engine
 from foxops.database.repositories.change import ChangeRepository
+from foxops.database.repositories.drift import DriftRepository
 from foxops.database.repositories.incarnation.repository import IncarnationRepository
 from foxops.hosters import Hoster, HosterSettings
 from foxops.hosters.gitlab import GitLab, GitLabSettings, get_gitlab_settings
 from foxops.services.change import ChangeService
+from foxops.services.drift import DriftService
+from foxops.services.events import EventBus, StatusRefresher
 from foxops.services.incarnation import IncarnationService
+from foxops.services.preview import ChangePreviewCache
+from foxops.services.revision import RevisionResolver
+from foxops.services.status import ChangeStatusCache
 from foxops.settings import DatabaseSettings, Settings
 
 # NOTE: Yes, you may absolutely use proper dependency injection at some point.
 
 #: Holds a singleton of the database engine
 async_engine: AsyncEngine | None = None
+#: Holds a singleton of the database read replica engine, if a replica is configured
+async_replica_engine: AsyncEngine | None = None
 
 
 @lru_cache
@@ -34,21 +43,84 @@ def get_hoster_settings() -> HosterSettings:
     return GitLabSettings()  # type: ignore
 
 
+@lru_cache
+def get_revision_resolver() -> RevisionResolver:
+    # shared between requests, so that resolved template revisions are cached across them
+    return RevisionResolver()
+
+
+@lru_cache
+def get_change_preview_cache() -> ChangePreviewCache:
+    # shared between requests, so that previews are cached across them
+    return ChangePreviewCache()
+
+
+@lru_cache
+def get_change_status_cache() -> ChangeStatusCache:
+    # shared between requests, so that polling clients don't cause requests to the hoster every time
+    return ChangeStatusCache()
+
+
+@lru_cache
+def get_event_bus() -> EventBus:
+    return EventBus()
+
+
+@lru_cache
+def get_status_refresher() -> StatusRefresher:
+    # shared between requests, so that every watched incarnation is looked up only once
+    return StatusRefresher(get_event_bus())
+
+
 def get_database_engine(settings: DatabaseSettings = Depends(get_database_settings)) -> AsyncEngine:
     global async_engine
 
     if async_engine is None:
-        async_engine = create_async_engine(settings.url.get_secret_value(), future=True, echo=False, pool_pre_ping=True)
+        async_engine = create_database_engine(settings)
 
     return async_engine
 
 
-def get_incarnation_repository(database_engine: AsyncEngine = Depends(get_database_engine)) -> IncarnationRepository:
-    return IncarnationRepository(database_engine)
+def get_database_replica_engine(settings: DatabaseSettings = Depends(get_database_settings)) -> AsyncEngine | None:
+    global async_replica_engine
+
+    if async_replica_engine is None and settings.replica_url is not None:
+        async_replica_engine = create_database_engine(settings, replica=True)
+
+    return async_replica_engine
+
+
+async def dispose_database_engine() -> None:
+    """Closes all connections of the database engine singletons. New engines are created when they are needed again."""
+    global async_engine, async_replica_engine
+
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
+        async_replica_engine = None
+
 
+def get_incarnation_repository(
+    database_engine: AsyncEngine = Depends(get_database_engine),
+    database_replica_engine: AsyncEngine | None = Depends(get_database_replica_engine),
+) -> IncarnationRepository:
+    return IncarnationRepository(database_engine, database_replica_engine)
 
-def get_change_repository(database_engine: AsyncEngine = Depends(get_database_engine)) -> ChangeRepository:
-    return ChangeRepository(database_engine)
+
+def get_change_repository(
+    database_engine: AsyncEngine = Depends(get_database_engine),
+    database_replica_engine: AsyncEngine | None = Depends(get_database_replica_engine),
+) -> ChangeRepository:
+    return ChangeRepository(database_engine, database_replica_engine)
+
+
+def get_drift_repository(
+    database_engine: AsyncEngine = Depends(get_database_engine),
+    database_replica_engine: AsyncEngine | None = Depends(get_database_replica_engine),
+) -> DriftRepository:
+    return DriftRepository(database_engine, database_replica_engine)
 
 
 def get_hoster(settings: HosterSettings = Depends(get_gitlab_settings)) -> Hoster:
@@ -71,12 +143,30 @@ def get_change_service(
     hoster: Hoster = Depends(get_hoster),
     change_repository: ChangeRepository = Depends(get_change_repository),
     incarnation_repository: IncarnationRepository = Depends(get_incarnation_repository),
+    revision_resolver: RevisionResolver = Depends(get_revision_resolver),
+    preview_cache: ChangePreviewCache = Depends(get_change_preview_cache),
+    status_cache: ChangeStatusCache = Depends(get_change_status_cache),
+    event_bus: EventBus = Depends(get_event_bus),
 ) -> ChangeService:
     return ChangeService(
-        hoster=hoster, incarnation_repository=incarnation_repository, change_repository=change_repository
+        hoster=hoster,
+        incarnation_repository=incarnation_repository,
+        change_repository=change_repository,
+        revision_resolver=revision_resolver,
+        preview_cache=preview_cache,
+        status_cache=status_cache,
+        event_bus=event_bus,
     )
 
 
+def get_drift_service(
+    hoster: Hoster = Depends(get_hoster),
+    incarnation_repository: IncarnationRepository = Depends(get_incarnation_repository),
+    drift_repository: DriftRepository = Depends(get_drift_repository),
+) -> DriftService:
+    return DriftService(hoster=hoster, incarnation_repository=incarnation_repository, drift_repository=drift_repository)
+
+
 class StaticTokenHeaderAuth(SecurityBase):
     def __init__(self):
         self.model = APIKey(**{"in": APIKeyIn.header}, name="Authorization")
@@ -12,6 +12,7 @@ from foxops.engine.models import load_incarnation_state  # noqa
 from foxops.engine.models import load_incarnation_state_from_string  # noqa
 from foxops.engine.models import save_incarnation_state  # noqa
 from foxops.engine.patching.git_diff_patch import diff_and_patch  # noqa
+from foxops.engine.patching.patch_cache import get_patch_cache  # noqa
 from foxops.engine.update import (  # noqa
     update_incarnation,
     update_incarnation_from_git_template_repository,
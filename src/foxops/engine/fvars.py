@@ -1,3 +1,5 @@
+import hashlib
+from collections import OrderedDict
 from pathlib import Path
 
 from foxops.engine.models import TemplateData
@@ -9,6 +11,12 @@ logger = get_logger(__name__)
 #: Holds the filename for the fvars file.
 FVARS_FILENAME = "default.fvars"
 
+#: Holds the maximum number of fvars files that are cached
+FVARS_CACHE_SIZE = 256
+
+#: Holds the cached variables of fvars files by the hash of their content
+_fvars_cache: OrderedDict[bytes, TemplateData] = OrderedDict()
+
 
 def merge_template_data_with_fvars(
     template_data: TemplateData,
@@ -30,11 +38,24 @@ def read_variables_from_fvars_file(path: Path) -> TemplateData:
     """Read variables from a fvars file.
 
     If the file does not exist an empty `TemplateData` is returned.
+    The parsed variables are cached by the hash of the file content.
     """
-    if not path.exists():
+    try:
+        content = path.read_bytes()
+    except FileNotFoundError:
         return {}
 
-    raw_variables = path.read_text().strip()
-    variables: TemplateData = dict(line.strip().split("=", maxsplit=1) for line in raw_variables.splitlines())  # type: ignore
+    key = hashlib.sha256(content).digest()
+    if (variables := _fvars_cache.get(key)) is not None:
+        _fvars_cache.move_to_end(key)
+        # every caller gets its own copy, the variables are merged with other template data
+        return dict(variables)
+
+    raw_variables = content.decode().strip()
+    variables = dict(line.strip().split("=", maxsplit=1) for line in raw_variables.splitlines())  # type: ignore
     logger.debug(f"read fvars from {path}: {variables}")
-    return variables
+    _fvars_cache[key] = variables
+    while len(_fvars_cache) > FVARS_CACHE_SIZE:
+        _fvars_cache.popitem(last=False)
+
+    return dict(variables)
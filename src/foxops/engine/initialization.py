@@ -11,7 +11,7 @@ from foxops.engine.models import (
 )
 from foxops.engine.rendering import render_template
 from foxops.errors import ReconciliationUserError
-from foxops.external.git import GitRepository
+from foxops.external.git import open_git_repository
 from foxops.logger import get_logger
 
 #: Holds the module logger
@@ -50,6 +50,7 @@ async def _initialize_incarnation(
     template_repository_version: str,
     template_data: TemplateData,
     incarnation_root_dir: Path,
+    only_paths: set[Path] | None = None,
 ) -> IncarnationState:
     # verify that the template data in the desired incarnation state match the required template variables
     template_config = load_template_config(template_root_dir / "fengine.yaml")
@@ -90,9 +91,10 @@ async def _initialize_incarnation(
         incarnation_root_dir,
         template_data_with_defaults_and_metadata,
         rendering_filename_exclude_patterns=template_config.rendering.excluded_files,
+        only_paths=only_paths,
     )
 
-    template_repository_version_hash = await GitRepository(template_root_dir).head()
+    template_repository_version_hash = await open_git_repository(template_root_dir).head()
     incarnation_state = IncarnationState(
         template_repository=template_repository,
         template_repository_version=template_repository_version,
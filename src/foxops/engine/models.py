@@ -1,4 +1,6 @@
 import copy
+import hashlib
+from collections import OrderedDict
 from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import Annotated, Mapping
@@ -11,9 +13,18 @@ from foxops.logger import get_logger
 #: Holds the module logger
 logger = get_logger(__name__)
 
-yaml = YAML(typ="safe")
+# the safe loader uses the C parser of `ruamel.yaml.clib` when it's available (which it is for CPython).
+# PyYAML's `CSafeLoader` would be faster, but implements YAML 1.1 (e.g. `yes` is a boolean) and would change
+# how existing configs and incarnation states are read.
+yaml = YAML(typ="safe", pure=False)
 yaml.default_flow_style = False
 
+#: Holds the maximum number of template configs that are cached
+TEMPLATE_CONFIG_CACHE_SIZE = 128
+
+#: Holds the cached template configs by the hash of their `fengine.yaml` content
+_template_config_cache: OrderedDict[bytes, "TemplateConfig"] = OrderedDict()
+
 
 #: Holds the type for all `template_data` dictionary values
 TemplateDataValue = str | int | float
@@ -129,13 +140,28 @@ class TemplateConfig(BaseModel):
 
 
 def load_template_config(template_config_path: Path) -> TemplateConfig:
+    """Loads the template config from the given `fengine.yaml` file, or the default config if the file doesn't exist.
+
+    The parsed configs are cached by the hash of the file content,
+    because every update loads the config of the same template versions several times.
+    """
     try:
-        with template_config_path.open("r") as f:
-            raw_state = yaml.load(f)
-        return TemplateConfig(**raw_state)
+        content = template_config_path.read_bytes()
     except FileNotFoundError:
         return TemplateConfig()
 
+    key = hashlib.sha256(content).digest()
+    if (template_config := _template_config_cache.get(key)) is not None:
+        _template_config_cache.move_to_end(key)
+        return template_config
+
+    template_config = TemplateConfig(**yaml.load(content.decode()))
+    _template_config_cache[key] = template_config
+    while len(_template_config_cache) > TEMPLATE_CONFIG_CACHE_SIZE:
+        _template_config_cache.popitem(last=False)
+
+    return template_config
+
 
 def fill_missing_optionals_with_defaults(
     provided_template_data: TemplateData,
@@ -1,20 +1,22 @@
+import asyncio
 import filecmp
 import os
 import re
-import shutil
-import typing
-from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from tempfile import TemporaryDirectory, mkstemp
+from tempfile import mkstemp
 
-from foxops.external.git import GitRepository
+from foxops.engine.patching.merge3 import merge3
+from foxops.engine.patching.scratch_repository import get_scratch_repository_pool
 from foxops.logger import get_logger
 from foxops.utils import CalledProcessError, check_call
 
 #: Holds the module logger
 logger = get_logger(__name__)
 
+#: Holds the number of files with rejections that are analyzed together on a worker thread
+REJECTION_ANALYSIS_BATCH_SIZE = 16
+
 
 @dataclass
 class PatchResult:
@@ -38,88 +40,40 @@ async def diff_and_patch(
                 patch_path,
                 patch_directory,
                 diff_b_directory,
+                diff_a_directory,
             )
         finally:
             patch_path.unlink()
     return None
 
 
-@asynccontextmanager
-async def setup_diff_git_repository(old_directory: Path, new_directory: Path) -> typing.AsyncGenerator[Path, None]:
-    # FIXME(TF): in case the *git way* provides as the viable long-term solution we could directly
-    #            bootstrap that intermediate git repository instead of this copy-paste roundtrip.
-    git_tmpdir: str
-    with TemporaryDirectory() as git_tmpdir:
-        await check_call("git", "init", ".", "--initial-branch", "main", cwd=git_tmpdir)
-        await check_call(
-            "git",
-            "config",
-            "user.name",
-            "fengine",
-            cwd=git_tmpdir,
-        )
-        await check_call(
-            "git",
-            "config",
-            "user.email",
-            "noreply@fengine.io",
-            cwd=git_tmpdir,
-        )
-        await check_call(
-            "git",
-            "commit",
-            "--allow-empty",
-            "-m",
-            "empty initial commit",
-            cwd=git_tmpdir,
-        )
-        await check_call("git", "switch", "--create", "old", "main", cwd=git_tmpdir)
-        shutil.copytree(old_directory, git_tmpdir, dirs_exist_ok=True)
-        await check_call("git", "add", ".", cwd=git_tmpdir)
-        await check_call("git", "commit", "-m", "old template status", cwd=git_tmpdir)
-        await check_call("git", "switch", "--create", "new", "main", cwd=git_tmpdir)
-        shutil.copytree(new_directory, git_tmpdir, dirs_exist_ok=True)
-        await check_call("git", "add", ".", cwd=git_tmpdir)
-        await check_call("git", "commit", "-m", "new template status", cwd=git_tmpdir)
-
-        yield Path(git_tmpdir)
-
-
 async def diff(old_directory: Path, new_directory: Path) -> Path | None:
-    async with setup_diff_git_repository(old_directory, new_directory) as git_tmpdir:
-        logger.debug(f"create git diff between branch old and new in {git_tmpdir}")
+    async with get_scratch_repository_pool().acquire() as scratch_repository:
+        old_tree = await scratch_repository.write_tree(old_directory)
+        new_tree = await scratch_repository.write_tree(new_directory)
 
-        repo = GitRepository(git_tmpdir)
-        diff_output = await repo.diff("old", "new")
+        logger.debug(f"create git diff between tree {old_tree} and {new_tree} in {scratch_repository.git_dir}")
+        diff_output = await scratch_repository.diff(old_tree, new_tree)
 
-        if diff_output == "":
-            logger.info("The update didn't change anything, no patch to create")
-            return None
+    if diff_output == "":
+        logger.info("The update didn't change anything, no patch to create")
+        return None
 
-        logger.debug("create patch from git diff", diff_output=diff_output)
-        fd, patch_path = mkstemp(prefix="fengine-update-", suffix=".patch")
-        os.close(fd)
+    logger.debug("create patch from git diff", diff_output=diff_output)
+    fd, patch_path = mkstemp(prefix="fengine-update-", suffix=".patch")
+    os.close(fd)
 
-        (p := Path(patch_path)).write_text(diff_output)
-        return p
+    (p := Path(patch_path)).write_text(diff_output)
+    return p
 
 
 async def patch(
     patch_path: Path,
     incarnation_root_dir: Path,
     rendered_updated_template_directory: Path,
+    rendered_pristine_template_directory: Path | None = None,
 ) -> PatchResult:
-    # NOTE(TF): it's crucial that the paths are fully resolved here,
-    #           because we are going to fiddle around how they
-    #           are relative to each other.
-    resolved_incarnation_root_dir = incarnation_root_dir.resolve()
-    proc = await check_call("git", "rev-parse", "--show-toplevel", cwd=str(resolved_incarnation_root_dir))
-    incarnation_repository_dir = Path((await proc.stdout.read()).decode("utf-8").strip()).resolve()  # type: ignore
-    incarnation_subdir = (
-        resolved_incarnation_root_dir.relative_to(incarnation_repository_dir)
-        if resolved_incarnation_root_dir != incarnation_repository_dir
-        else None
-    )
+    incarnation_repository_dir, incarnation_subdir = await _locate_incarnation(incarnation_root_dir)
 
     # FIXME(TF): may check git status to check if something has been modified or not ...
     logger.debug(f"applying patch {patch_path} to {incarnation_subdir} inside {incarnation_root_dir}")
@@ -152,16 +106,55 @@ async def patch(
             incarnation_repository_dir,
             incarnation_subdir,
             rendered_updated_template_directory,
+            rendered_pristine_template_directory,
         )
     else:
         return PatchResult(conflicts=[], deleted=[])
 
 
+async def apply_patch_cleanly(patch_path: Path, incarnation_root_dir: Path) -> bool:
+    """
+    Applies the patch to the incarnation, but only if all of it applies cleanly.
+
+    Returns:
+        bool: `True` if the patch was applied, `False` if nothing was changed because of conflicts.
+    """
+    incarnation_repository_dir, incarnation_subdir = await _locate_incarnation(incarnation_root_dir)
+
+    git_apply_options = []
+    if incarnation_subdir is not None:
+        git_apply_options.extend(["--directory", str(incarnation_subdir)])
+
+    try:
+        await check_call("git", "apply", *git_apply_options, str(patch_path), cwd=str(incarnation_repository_dir))
+    except CalledProcessError as exc:
+        logger.debug("patch doesn't apply cleanly", patch_path=patch_path, stderr=exc.stderr)
+        return False
+    return True
+
+
+async def _locate_incarnation(incarnation_root_dir: Path) -> tuple[Path, Path | None]:
+    """Returns the root directory of the git repository containing the incarnation and the incarnation subdirectory."""
+    # NOTE(TF): it's crucial that the paths are fully resolved here,
+    #           because we are going to fiddle around how they
+    #           are relative to each other.
+    resolved_incarnation_root_dir = incarnation_root_dir.resolve()
+    proc = await check_call("git", "rev-parse", "--show-toplevel", cwd=str(resolved_incarnation_root_dir))
+    incarnation_repository_dir = Path((await proc.stdout.read()).decode("utf-8").strip()).resolve()  # type: ignore
+    incarnation_subdir = (
+        resolved_incarnation_root_dir.relative_to(incarnation_repository_dir)
+        if resolved_incarnation_root_dir != incarnation_repository_dir
+        else None
+    )
+    return incarnation_repository_dir, incarnation_subdir
+
+
 async def analyze_patch_rejections(
     apply_rejection_output: bytes,
     incarnation_repository_dir: Path,
     incarnation_subdir: Path | None,
     rendered_updated_template_directory: Path,
+    rendered_pristine_template_directory: Path | None = None,
 ) -> PatchResult:
     if incarnation_subdir is None:
         incarnation_dir = incarnation_repository_dir
@@ -170,26 +163,58 @@ async def analyze_patch_rejections(
 
     patch_outcome = parse_git_apply_rejection_output(apply_rejection_output)
 
-    files_with_conflicts: list[Path] = []
-    for file_with_rejection in patch_outcome.conflicts:
-        conflict_fixed = await attempt_fixing_rejection(
-            (incarnation_repository_dir / file_with_rejection).relative_to(incarnation_dir),
-            incarnation_dir,
-            rendered_updated_template_directory,
+    # the analysis only does (blocking) file I/O, which is done in batches on worker threads
+    # to not block the event loop for updates with lots of rejections.
+    files_with_rejections = [
+        (incarnation_repository_dir / f).relative_to(incarnation_dir) for f in patch_outcome.conflicts
+    ]
+    batches = [
+        files_with_rejections[i : i + REJECTION_ANALYSIS_BATCH_SIZE]
+        for i in range(0, len(files_with_rejections), REJECTION_ANALYSIS_BATCH_SIZE)
+    ]
+    fixed_batches = await asyncio.gather(
+        *(
+            asyncio.to_thread(
+                attempt_fixing_rejections,
+                batch,
+                incarnation_dir,
+                rendered_updated_template_directory,
+                rendered_pristine_template_directory,
+            )
+            for batch in batches
         )
+    )
+
+    files_with_conflicts: list[Path] = []
+    for file_with_rejection, conflict_fixed in zip(
+        patch_outcome.conflicts, (fixed for fixed_batch in fixed_batches for fixed in fixed_batch)
+    ):
         if not conflict_fixed:
             logger.debug(f"file {file_with_rejection} still has conflicts")
             files_with_conflicts.append(file_with_rejection)
     return PatchResult(conflicts=files_with_conflicts, deleted=patch_outcome.deleted)
 
 
-async def attempt_fixing_rejection(
+def attempt_fixing_rejections(
+    files_with_rejection: list[Path],
+    patch_directory: Path,
+    diff_b_directory: Path,
+    diff_a_directory: Path | None = None,
+) -> list[bool]:
+    return [
+        attempt_fixing_rejection(f, patch_directory, diff_b_directory, diff_a_directory) for f in files_with_rejection
+    ]
+
+
+def attempt_fixing_rejection(
     file_with_rejection: Path,
     patch_directory: Path,
     diff_b_directory: Path,
+    diff_a_directory: Path | None = None,
 ) -> bool:
     diff_b_file = diff_b_directory / file_with_rejection
     patch_file = patch_directory / file_with_rejection
+    rejection_file = patch_file.with_suffix(patch_file.suffix + ".rej")
     if not diff_b_file.exists() or not patch_file.exists():
         logger.info("could not fix rejection - file doesn't exist anymore", file=file_with_rejection)
         return False
@@ -199,15 +224,103 @@ async def attempt_fixing_rejection(
     if filecmp.cmp(diff_b_file, patch_file, shallow=True):
         # the rejected hunk tried to apply a change which was already applied,
         # we can safely remove the rejection file.
-        (patch_file.with_suffix(patch_file.suffix + ".rej")).unlink()
+        rejection_file.unlink()
         logger.debug(
             f"the rejection was caused because the two files are identical, mark {file_with_rejection} as fixed"
         )
         return True
 
+    if discard_already_applied_hunks(patch_file, rejection_file):
+        logger.debug(f"all rejected hunks were already applied, mark {file_with_rejection} as fixed")
+        return True
+
+    if diff_a_directory is not None and (diff_a_file := diff_a_directory / file_with_rejection).exists():
+        return merge_rejected_file(diff_a_file, patch_file, diff_b_file, rejection_file)
+
+    return False
+
+
+def merge_rejected_file(base_file: Path, patch_file: Path, diff_b_file: Path, rejection_file: Path) -> bool:
+    """
+    Merges the changes between the base and the diff b file into the (partially) patched file, replacing the
+    rejection file with diff3 style conflict markers around the changes that truly overlap.
+
+    Binary files are left alone.
+
+    Returns:
+        bool: `True` if the file was merged without any conflicts.
+    """
+    base, ours, theirs = base_file.read_bytes(), patch_file.read_bytes(), diff_b_file.read_bytes()
+    if any(b"\0" in content for content in (base, ours, theirs)):
+        return False
+
+    result = merge3(
+        base, ours, theirs, ours_label="incarnation", base_label="template (old)", theirs_label="template (new)"
+    )
+    patch_file.write_bytes(result.content)
+    rejection_file.unlink(missing_ok=True)
+
+    logger.debug(f"merged the rejected changes into {patch_file.name}", conflicts=result.conflicts)
+    return result.conflicts == 0
+
+
+def discard_already_applied_hunks(patch_file: Path, rejection_file: Path) -> bool:
+    """
+    Removes the hunks from the rejection file which have already been applied to the patched file.
+
+    A hunk is considered to be applied if its post-image (context and added lines) is contained in the file,
+    but its pre-image (context and removed lines) isn't. This is e.g. the case if the same change
+    has been made in the incarnation and the template, but other parts of the files differ.
+
+    Returns:
+        bool: `True` if all hunks were already applied and the rejection file has been removed.
+    """
+    try:
+        header, *hunks = re.split(rb"^(?=@@ )", rejection_file.read_bytes(), flags=re.MULTILINE)
+    except FileNotFoundError:
+        return False
+
+    lines = patch_file.read_bytes().split(b"\n")
+    remaining_hunks = [h for h in hunks if not _is_hunk_applied(h, lines)]
+    if not remaining_hunks:
+        rejection_file.unlink()
+        return True
+
+    if len(remaining_hunks) < len(hunks):
+        rejection_file.write_bytes(header + b"".join(remaining_hunks))
     return False
 
 
+def _is_hunk_applied(hunk: bytes, lines: list[bytes]) -> bool:
+    pre_image: list[bytes] = []
+    post_image: list[bytes] = []
+    for line in hunk.split(b"\n")[1:]:
+        if line.startswith(b"\\"):
+            # `\ No newline at end of file`
+            continue
+        if line.startswith(b"-"):
+            pre_image.append(line[1:])
+        elif line.startswith(b"+"):
+            post_image.append(line[1:])
+        elif line.startswith(b" "):
+            pre_image.append(line[1:])
+            post_image.append(line[1:])
+
+    if not post_image:
+        # without any context and added lines there is nothing to look for
+        return False
+
+    return _contains(lines, post_image) and not _contains(lines, pre_image)
+
+
+def _contains(lines: list[bytes], block: list[bytes]) -> bool:
+    if not block:
+        return True
+
+    first, size = block[0], len(block)
+    return any(lines[i : i + size] == block for i, line in enumerate(lines) if line == first)
+
+
 def parse_git_apply_rejection_output(output: bytes) -> PatchResult:
     """
     Parse the output of `git apply --reject` to extract the list of files.
@@ -0,0 +1,135 @@
+"""
+In-process three-way merge of text files, similar to `git merge-file --diff3`.
+
+The merge is line based: changes of `ours` and `theirs` (compared to `base`) are merged automatically
+as long as they don't touch the same (or directly adjacent) lines. Overlapping changes are marked
+with diff3 style conflict markers, which contain the lines of all three versions.
+"""
+
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Iterator
+
+#: Holds the length of the conflict markers, same as git uses by default
+CONFLICT_MARKER_SIZE = 7
+
+
+@dataclass(frozen=True)
+class MergeResult:
+    content: bytes
+    conflicts: int
+
+
+def merge3(
+    base: bytes,
+    ours: bytes,
+    theirs: bytes,
+    ours_label: str = "ours",
+    base_label: str = "base",
+    theirs_label: str = "theirs",
+) -> MergeResult:
+    base_lines = base.splitlines(keepends=True)
+    ours_lines = ours.splitlines(keepends=True)
+    theirs_lines = theirs.splitlines(keepends=True)
+
+    merged: list[bytes] = []
+    conflicts = 0
+    for kind, base_start, base_end, ours_start, ours_end, theirs_start, theirs_end in _merge_regions(
+        base_lines, ours_lines, theirs_lines
+    ):
+        if kind == "unchanged":
+            merged.extend(base_lines[base_start:base_end])
+        elif kind == "ours":
+            merged.extend(ours_lines[ours_start:ours_end])
+        elif kind == "theirs":
+            merged.extend(theirs_lines[theirs_start:theirs_end])
+        else:
+            conflicts += 1
+            merged.extend(_conflict_marker(b"<", ours_label))
+            merged.extend(_terminated(ours_lines[ours_start:ours_end]))
+            merged.extend(_conflict_marker(b"|", base_label))
+            merged.extend(_terminated(base_lines[base_start:base_end]))
+            merged.extend(_conflict_marker(b"=", None))
+            merged.extend(_terminated(theirs_lines[theirs_start:theirs_end]))
+            merged.extend(_conflict_marker(b">", theirs_label))
+
+    return MergeResult(content=b"".join(merged), conflicts=conflicts)
+
+
+def _conflict_marker(char: bytes, label: str | None) -> list[bytes]:
+    marker = char * CONFLICT_MARKER_SIZE
+    return [marker + b" " + label.encode() + b"\n" if label else marker + b"\n"]
+
+
+def _terminated(lines: list[bytes]) -> list[bytes]:
+    # a conflict marker must always start on a new line
+    if lines and not lines[-1].endswith((b"\n", b"\r")):
+        return lines[:-1] + [lines[-1] + b"\n"]
+    return lines
+
+
+def _merge_regions(
+    base: list[bytes], ours: list[bytes], theirs: list[bytes]
+) -> Iterator[tuple[str, int, int, int, int, int, int]]:
+    """Yields the regions of the merge result.
+
+    Every region is a tuple of its kind and the line ranges it covers in
+    `(base_start, base_end, ours_start, ours_end, theirs_start, theirs_end)`. The kind is one of
+    `unchanged` (nobody changed the lines), `ours`/`theirs` (only one side changed the lines - or both identically)
+    or `conflict`.
+    """
+    base_index = ours_index = theirs_index = 0
+    for base_match, base_end, ours_match, ours_end, theirs_match, theirs_end in _sync_regions(base, ours, theirs):
+        if ours_match > ours_index or theirs_match > theirs_index or base_match > base_index:
+            changed_base = base[base_index:base_match]
+            changed_ours = ours[ours_index:ours_match]
+            changed_theirs = theirs[theirs_index:theirs_match]
+
+            if changed_ours == changed_theirs or changed_theirs == changed_base:
+                kind = "ours"
+            elif changed_ours == changed_base:
+                kind = "theirs"
+            else:
+                kind = "conflict"
+            yield kind, base_index, base_match, ours_index, ours_match, theirs_index, theirs_match
+
+        if base_end > base_match:
+            yield "unchanged", base_match, base_end, ours_match, ours_end, theirs_match, theirs_end
+
+        base_index, ours_index, theirs_index = base_end, ours_end, theirs_end
+
+
+def _sync_regions(
+    base: list[bytes], ours: list[bytes], theirs: list[bytes]
+) -> Iterator[tuple[int, int, int, int, int, int]]:
+    """Yields the regions in which neither side changed the base.
+
+    Every region is a tuple of `(base_start, base_end, ours_start, ours_end, theirs_start, theirs_end)`.
+    The last region is always the empty region at the end of all files.
+    """
+    ours_matches = SequenceMatcher(None, base, ours, autojunk=False).get_matching_blocks()
+    theirs_matches = SequenceMatcher(None, base, theirs, autojunk=False).get_matching_blocks()
+
+    i = j = 0
+    while i < len(ours_matches) and j < len(theirs_matches):
+        ours_base, ours_start, ours_length = ours_matches[i]
+        theirs_base, theirs_start, theirs_length = theirs_matches[j]
+
+        start = max(ours_base, theirs_base)
+        end = min(ours_base + ours_length, theirs_base + theirs_length)
+        if start < end:
+            yield (
+                start,
+                end,
+                ours_start + (start - ours_base),
+                ours_start + (end - ours_base),
+                theirs_start + (start - theirs_base),
+                theirs_start + (end - theirs_base),
+            )
+
+        if ours_base + ours_length < theirs_base + theirs_length:
+            i += 1
+        else:
+            j += 1
+
+    yield len(base), len(base), len(ours), len(ours), len(theirs), len(theirs)
@@ -0,0 +1,105 @@
+import asyncio
+import copy
+import hashlib
+import json
+import typing
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from foxops.engine.models import IncarnationState, TemplateData
+from foxops.logger import get_logger
+from foxops.settings import get_engine_settings
+from foxops.utils import LoopLocal
+
+#: Holds the module logger
+logger = get_logger(__name__)
+
+
+class PatchCacheKey(NamedTuple):
+    #: the template version the incarnation is currently at
+    old_template_repository_version_hash: str
+    #: the template version the incarnation is updated to
+    new_template_repository_version_hash: str
+    #: the hash of everything else that goes into the renderings (see `template_data_hash()`)
+    template_data_hash: str
+
+
+@dataclass(frozen=True)
+class CachedPatch:
+    #: the diff between the pristine and the updated rendering, `None` if they are identical
+    patch: str | None
+    updated_incarnation_state: IncarnationState
+
+
+def template_data_hash(
+    current_incarnation_state: bytes,
+    updated_template_repository_version: str,
+    updated_template_data: TemplateData,
+) -> str:
+    """Hashes the inputs of the pristine and updated renderings, other than the template versions.
+
+    `current_incarnation_state` is the content of the `.fengine.yaml` file of the incarnation,
+    which contains the template data of the pristine rendering (and ends up in the pristine rendering as is).
+    """
+    h = hashlib.sha256(current_incarnation_state)
+    h.update(
+        json.dumps([updated_template_repository_version, updated_template_data], sort_keys=True, default=str).encode()
+    )
+    return h.hexdigest()
+
+
+class PatchCache:
+    """Caches the patches between the pristine and the updated renderings of template version transitions.
+
+    All incarnations of a template that are updated from and to the same template versions
+    with the same template data end up with byte-identical renderings - and therefore the same patch.
+    Concurrent lookups of the same key wait for the first one to compute the patch.
+
+    Instances are bound to the event loop they are first used in.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+
+        self._cache: OrderedDict[PatchCacheKey, CachedPatch] = OrderedDict()
+        self._locks: dict[PatchCacheKey, tuple[asyncio.Lock, int]] = {}
+
+    def get(self, key: PatchCacheKey) -> CachedPatch | None:
+        if (cached := self._cache.get(key)) is None:
+            return None
+
+        self._cache.move_to_end(key)
+        # the incarnation state is mutable, every caller gets its own copy
+        return copy.deepcopy(cached)
+
+    def put(self, key: PatchCacheKey, cached: CachedPatch) -> None:
+        self._cache[key] = copy.deepcopy(cached)
+        self._cache.move_to_end(key)
+
+        while len(self._cache) > self.maxsize:
+            evicted_key, _ = self._cache.popitem(last=False)
+            logger.debug("evicted patch from cache", key=evicted_key)
+
+    @asynccontextmanager
+    async def lock(self, key: PatchCacheKey) -> typing.AsyncGenerator[None, None]:
+        """Serializes the computation of the patch for the given key."""
+        lock, users = self._locks.get(key, (asyncio.Lock(), 0))
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+
+_patch_cache = LoopLocal(lambda: PatchCache(maxsize=get_engine_settings().patch_cache_size))
+
+
+def get_patch_cache() -> PatchCache:
+    return _patch_cache.get()
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import typing
+from contextlib import asynccontextmanager
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from foxops.external.git import GitRepository
+from foxops.logger import get_logger
+from foxops.settings import get_engine_settings
+from foxops.utils import LoopLocal, check_call
+
+#: Holds the module logger
+logger = get_logger(__name__)
+
+
+class ScratchRepository:
+    """A slot of a `ScratchRepositoryPool`.
+
+    Every slot has its own index file on top of the (bare) object store shared by all slots of the pool,
+    which means that directories can be staged into trees without copying them into a working tree first.
+    """
+
+    def __init__(self, git_dir: Path, index_file: Path):
+        self.git_dir = git_dir
+        self.index_file = index_file
+
+    async def write_tree(self, directory: Path) -> str:
+        """Stages all (not ignored) files of the given directory and returns the id of the resulting tree."""
+        self.reset()
+        await self._git("--work-tree", str(directory), "add", "--all", ".", cwd=directory)
+        proc = await self._git("write-tree", cwd=self.git_dir)
+        return (await proc.stdout.read()).decode().strip()  # type: ignore
+
+    async def diff(self, old_tree: str, new_tree: str) -> str:
+        return await GitRepository(self.git_dir).diff(old_tree, new_tree)
+
+    def reset(self) -> None:
+        self.index_file.unlink(missing_ok=True)
+
+    async def _git(self, *args: str, cwd: Path) -> asyncio.subprocess.Process:
+        return await check_call(
+            "git",
+            "--git-dir",
+            str(self.git_dir),
+            *args,
+            cwd=cwd,
+            env={**os.environ, "GIT_INDEX_FILE": str(self.index_file)},
+        )
+
+
+class _ObjectStore:
+    """A generation of the object store of a `ScratchRepositoryPool`, together with the slots on top of it."""
+
+    def __init__(self) -> None:
+        self.tmpdir = TemporaryDirectory(prefix="fengine-scratch-")
+        self.free: list[ScratchRepository] = []
+        self.slots = 0
+        self.in_use = 0
+        self.uses = 0
+
+    @property
+    def git_dir(self) -> Path:
+        return Path(self.tmpdir.name) / "objects.git"
+
+    def slot(self) -> ScratchRepository:
+        if self.free:
+            return self.free.pop()
+
+        self.slots += 1
+        return ScratchRepository(self.git_dir, self.git_dir.parent / f"index-{self.slots}")
+
+    def cleanup(self) -> None:
+        logger.debug("removing scratch repository object store", uses=self.uses)
+        self.tmpdir.cleanup()
+
+
+class ScratchRepositoryPool:
+    """Bounded pool of pre-initialised scratch repositories, which are used to diff rendered templates.
+
+    All slots share a single object store, so files that didn't change between two diffs
+    don't have to be written again. Because nothing ever references the written objects,
+    the object store is rotated after it has been used `recycle_after` times: new acquisitions get a fresh one,
+    and the old one is removed as soon as its last slot is released.
+
+    Instances are bound to the event loop they are first used in.
+    """
+
+    def __init__(self, max_size: int, recycle_after: int = 256):
+        self.max_size = max_size
+        self.recycle_after = recycle_after
+
+        self._semaphore = asyncio.Semaphore(max_size)
+        self._lock = asyncio.Lock()
+        self._object_store: _ObjectStore | None = None
+        self._in_use = 0
+
+    @property
+    def git_dir(self) -> Path | None:
+        return None if self._object_store is None else self._object_store.git_dir
+
+    @asynccontextmanager
+    async def acquire(self) -> typing.AsyncGenerator[ScratchRepository, None]:
+        """Acquires a slot of the pool, waiting for one to be released if all of them are in use."""
+        async with self._semaphore:
+            object_store = await self._healthy_object_store()
+            slot = object_store.slot()
+
+            object_store.in_use += 1
+            self._in_use += 1
+            try:
+                yield slot
+            finally:
+                object_store.in_use -= 1
+                self._in_use -= 1
+                object_store.uses += 1
+                slot.reset()
+                object_store.free.append(slot)
+
+                if object_store is self._object_store and object_store.uses >= self.recycle_after:
+                    self._retire(object_store)
+                elif object_store is not self._object_store and object_store.in_use == 0:
+                    object_store.cleanup()
+
+    def close(self) -> None:
+        """Removes the object store and all slots, once they aren't in use anymore.
+
+        The pool can still be used afterwards.
+        """
+        if self._object_store is not None:
+            self._retire(self._object_store)
+
+    def _retire(self, object_store: _ObjectStore) -> None:
+        self._object_store = None
+        if object_store.in_use == 0:
+            object_store.cleanup()
+
+    async def _healthy_object_store(self) -> _ObjectStore:
+        async with self._lock:
+            if self._object_store is None:
+                self._object_store = _ObjectStore()
+
+            object_store = self._object_store
+            git_dir = object_store.git_dir
+            if not (git_dir / "HEAD").is_file() or not (git_dir / "objects").is_dir():
+                # initialising an existing repository again is safe and restores missing parts
+                logger.debug("initialising scratch repository object store", git_dir=git_dir)
+                await check_call("git", "init", "--quiet", "--bare", str(git_dir), cwd=object_store.tmpdir.name)
+
+        return object_store
+
+
+_scratch_repository_pool = LoopLocal(
+    lambda: ScratchRepositoryPool(max_size=get_engine_settings().max_scratch_repositories)
+)
+
+
+def get_scratch_repository_pool() -> ScratchRepositoryPool:
+    return _scratch_repository_pool.get()
@@ -1,5 +1,9 @@
+import asyncio
+import errno
 import functools
 import os
+import re
+import shutil
 import typing
 from pathlib import Path
 
@@ -10,10 +14,15 @@ from jinja2.sandbox import SandboxedEnvironment
 from foxops.engine.custom_filters import ip_add_integer
 from foxops.engine.models import TemplateData
 from foxops.logger import get_logger
+from foxops.settings import get_engine_settings
+from foxops.utils import LoopLocal
 
 #: Holds the module logger
 logger = get_logger(__name__)
 
+#: Holds the semaphore which limits the number of concurrently rendered templates
+_render_semaphore = LoopLocal(lambda: asyncio.Semaphore(get_engine_settings().max_concurrent_renders))
+
 
 def create_template_environment(template_root_dir: Path) -> SandboxedEnvironment:
     """Create a virtual environment to render a template into an incarnation.
@@ -39,6 +48,7 @@ async def render_template(
     incarnation_root_dir: Path,
     template_data: TemplateData,
     rendering_filename_exclude_patterns: list[str],
+    only_paths: set[Path] | None = None,
 ) -> None:
     """Render a template into an incarnation.
 
@@ -47,13 +57,30 @@ async def render_template(
 
     :param rendering_filename_exclude_patterns: A list of glob patterns matching files which contents should not be
     rendered. Can be empty.
+    :param only_paths: If given, only the files and symlinks with these paths (relative to the `template_root_dir`)
+    are rendered. Directories are then only created as far as they contain any of these.
     """
     if not template_root_dir.is_absolute():
         raise ValueError(f"template_root_dir must be an absolute path, got {template_root_dir}")
 
-    files_to_render = set(template_root_dir.glob("**/*"))
-    for pattern in rendering_filename_exclude_patterns:
-        files_to_render -= set(template_root_dir.glob(pattern))
+    async with _render_semaphore.get():
+        await _render_template(
+            template_root_dir,
+            incarnation_root_dir,
+            template_data,
+            rendering_filename_exclude_patterns,
+            only_paths,
+        )
+
+
+async def _render_template(
+    template_root_dir: Path,
+    incarnation_root_dir: Path,
+    template_data: TemplateData,
+    rendering_filename_exclude_patterns: list[str],
+    only_paths: set[Path] | None,
+) -> None:
+    is_excluded = compile_exclude_patterns(tuple(rendering_filename_exclude_patterns))
 
     environment = create_template_environment(template_root_dir)
 
@@ -90,25 +117,106 @@ async def render_template(
             render_content=render_content,
         )
 
+    def _is_skipped(path: Path) -> bool:
+        return only_paths is not None and path.relative_to(template_root_dir) not in only_paths
+
     for root_dir, dirs, files in os.walk(template_root_dir):
         for d in dirs:
             template_dir_path = Path(root_dir) / d
             if template_dir_path.is_symlink():
-                await _render_template_symlink(template_dir_path)
-            else:
+                if not _is_skipped(template_dir_path):
+                    await _render_template_symlink(template_dir_path)
+            elif only_paths is None:
                 await _render_template_dir(template_dir_path)
 
         for f in files:
             template_file_path = Path(root_dir) / f
+            if _is_skipped(template_file_path):
+                continue
             if template_file_path.is_symlink():
                 await _render_template_symlink(template_file_path)
             else:
                 await _render_template_file(
                     template_file_path,
-                    render_content=template_file_path in files_to_render,
+                    render_content=not is_excluded(template_file_path.relative_to(template_root_dir).as_posix()),
                 )
 
 
+@functools.lru_cache(maxsize=128)
+def compile_exclude_patterns(patterns: tuple[str, ...]) -> typing.Callable[[str], bool]:
+    """Compile glob patterns into a single matcher for (template root relative, POSIX) file paths.
+
+    The patterns have the same semantics as `pathlib.Path.glob()`:
+    `*`, `?` and `[...]` match within a single path component, and a `**` component matches
+    zero or more directories. A pattern that ends with `**` (or a separator) only matches directories,
+    and therefore no files.
+    """
+    regexes = [regex for p in patterns if (regex := _translate_glob_pattern(p)) is not None]
+    if not regexes:
+        return lambda _: False
+
+    return typing.cast(typing.Callable[[str], bool], re.compile("|".join(regexes)).fullmatch)
+
+
+def _translate_glob_pattern(pattern: str) -> str | None:
+    if not pattern:
+        raise ValueError(f"Unacceptable pattern: {pattern!r}")
+    if pattern.startswith("/"):
+        raise NotImplementedError("Non-relative patterns are unsupported")
+
+    components = [c for c in pattern.split("/") if c not in {"", "."}]
+    if not components or pattern.endswith("/") or components[-1] == "**" or ".." in components:
+        # these can only ever match directories (or paths outside the template)
+        return None
+
+    regex_parts = []
+    for component in components[:-1]:
+        regex_parts.append("(?:[^/]+/)*" if component == "**" else f"{_translate_glob_component(component)}/")
+    regex_parts.append(_translate_glob_component(components[-1]))
+    return f"(?:{''.join(regex_parts)})"
+
+
+def _translate_glob_component(component: str) -> str:
+    """Translate a single glob path component to a regex which never matches a `/`.
+
+    This follows the implementation of `fnmatch.translate()`.
+    """
+    if "**" in component:
+        raise ValueError("Invalid pattern: '**' can only be an entire path component")
+
+    i, n = 0, len(component)
+    res = []
+    while i < n:
+        c = component[i]
+        i += 1
+        if c == "*":
+            res.append("[^/]*")
+        elif c == "?":
+            res.append("[^/]")
+        elif c == "[":
+            j = i
+            if j < n and component[j] == "!":
+                j += 1
+            if j < n and component[j] == "]":
+                j += 1
+            while j < n and component[j] != "]":
+                j += 1
+            if j >= n:
+                res.append("\\[")
+            else:
+                stuff = component[i:j].replace("\\", "\\\\")
+                stuff = re.sub(r"([&~|])", r"\\\1", stuff)
+                i = j + 1
+                if stuff[0] == "!":
+                    stuff = "^/" + stuff[1:]
+                elif stuff[0] in ("^", "["):
+                    stuff = "\\" + stuff
+                res.append(f"[{stuff}]")
+        else:
+            res.append(re.escape(c))
+    return "".join(res)
+
+
 async def render_template_file(
     environment: SandboxedEnvironment,
     template_file_path: Path,
@@ -124,13 +232,6 @@ async def render_template_file(
     loader: FileSystemLoader = typing.cast(FileSystemLoader, environment.loader)
     relative_template_path = template_file_path.relative_to(loader.searchpath[0])
 
-    if render_content:
-        # get and render template file contents
-        content_template = environment.get_template(str(relative_template_path))
-        rendered_content = await content_template.render_async(**template_data)
-    else:
-        rendered_content = template_file_path.read_text()
-
     # get and render template file path
     # NOTE (AH): Even when file content rendering is disabled, we still need to render the file path.
     #            This is because we always render folder names - so the file wouldn't end up in the correct location
@@ -147,7 +248,14 @@ async def render_template_file(
     template_file_stat = template_file_path.stat(follow_symlinks=False)  # type: ignore
     incarnation_file_path = AsyncPath(incarnation_root_dir, rendered_path)
     await incarnation_file_path.parent.mkdir(parents=True, exist_ok=True)
-    await incarnation_file_path.write_text(rendered_content)
+    if render_content:
+        # get and render template file contents
+        content_template = environment.get_template(str(relative_template_path))
+        rendered_content = await content_template.render_async(**template_data)
+        await incarnation_file_path.write_text(rendered_content)
+    else:
+        # files which are not rendered are copied byte by byte, without ever loading them into memory
+        await asyncio.to_thread(copy_file, template_file_path, Path(incarnation_file_path))
     apply_path_stats(Path(incarnation_file_path), template_file_stat)
     return incarnation_file_path
 
@@ -206,6 +314,30 @@ async def render_template_symlink(
     return incarnation_symlink_path
 
 
+def copy_file(source: Path, destination: Path) -> None:
+    """Copy the contents of a file, without reading it into (Python) memory.
+
+    Where available, `copy_file_range` is used, which lets the kernel copy the data
+    (or even share the data blocks on filesystems with reflink support, like btrfs or XFS).
+    Otherwise, it falls back to `shutil.copyfile`, which uses `sendfile` where possible.
+
+    Hardlinks are intentionally not used, because the incarnation files are modified afterwards
+    (e.g. by applying stats or patches), which would also modify the template file.
+    """
+    if hasattr(os, "copy_file_range"):
+        with open(source, "rb") as fsrc, open(destination, "wb") as fdst:
+            try:
+                while os.copy_file_range(fsrc.fileno(), fdst.fileno(), 2**30):
+                    pass
+                return
+            except OSError as exc:
+                # not supported for this file(system) - e.g. across different filesystems on older kernels
+                if exc.errno not in {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}:
+                    raise
+
+    shutil.copyfile(source, destination)
+
+
 def apply_path_stats(path: Path, target_stat: os.stat_result) -> None:
     """Apply the stats obtained from one path to another path.
 
@@ -1,11 +1,28 @@
+import os
+import typing
+from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
-from tempfile import TemporaryDirectory
+from tempfile import TemporaryDirectory, mkstemp
 
 from foxops import utils
 from foxops.engine.fvars import merge_template_data_with_fvars
 from foxops.engine.initialization import _initialize_incarnation
-from foxops.engine.models import IncarnationState, TemplateData, load_incarnation_state
-from foxops.engine.patching.git_diff_patch import PatchResult
+from foxops.engine.models import (
+    IncarnationState,
+    TemplateData,
+    fill_missing_optionals_with_defaults,
+    load_incarnation_state,
+    load_template_config,
+)
+from foxops.engine.patching.git_diff_patch import PatchResult, apply_patch_cleanly, diff
+from foxops.engine.patching.patch_cache import (
+    CachedPatch,
+    PatchCache,
+    PatchCacheKey,
+    template_data_hash,
+)
+from foxops.engine.variable_index import VariableIndex, get_variable_index
+from foxops.external.git import open_git_repository
 from foxops.logger import get_logger
 
 #: Holds the module logger
@@ -18,7 +35,14 @@ async def update_incarnation_from_git_template_repository(
     update_template_data: TemplateData,
     incarnation_root_dir: Path,
     diff_patch_func,
+    patch_cache: PatchCache | None = None,
 ) -> tuple[bool, IncarnationState, PatchResult | None]:
+    """Update an incarnation with a new version of a template from a (local) git repository.
+
+    If a `patch_cache` is given, the patch between the pristine and the updated incarnation is only computed
+    once per template version transition and template data - and applied with `git apply` directly.
+    The `diff_patch_func` is only used if the patch doesn't apply cleanly.
+    """
     if update_template_repository_version.startswith("-"):
         raise ValueError(
             f"update_template_repository_version must ba a valid git refspec and "
@@ -29,17 +53,157 @@ async def update_incarnation_from_git_template_repository(
     current_incarnation_state_path = incarnation_root_dir / ".fengine.yaml"
     current_incarnation_state = load_incarnation_state(current_incarnation_state_path)
 
+    if patch_cache is not None:
+        if (
+            result := await _update_incarnation_with_patch_cache(
+                patch_cache,
+                template_git_repository,
+                update_template_repository_version,
+                update_template_data,
+                incarnation_root_dir,
+                diff_patch_func,
+            )
+        ) is not None:
+            return result
+
+    async with _template_worktrees(
+        template_git_repository,
+        current_incarnation_state.template_repository_version_hash,
+        update_template_repository_version,
+    ) as (original_template_root_dir, updated_template_root_dir, variable_index):
+        return await update_incarnation(
+            original_template_root_dir=original_template_root_dir,
+            updated_template_root_dir=updated_template_root_dir,
+            updated_template_repository_version=update_template_repository_version,
+            updated_template_data=update_template_data,
+            incarnation_root_dir=incarnation_root_dir,
+            diff_patch_func=diff_patch_func,
+            variable_index=variable_index,
+        )
+
+
+async def _update_incarnation_with_patch_cache(
+    patch_cache: PatchCache,
+    template_git_repository: Path,
+    update_template_repository_version: str,
+    update_template_data: TemplateData,
+    incarnation_root_dir: Path,
+    diff_patch_func,
+) -> tuple[bool, IncarnationState, PatchResult | None] | None:
+    """Updates the incarnation with the cached patch (computing it if necessary).
+
+    If the patch doesn't apply cleanly and it was just computed, the `diff_patch_func` is applied
+    to the renderings the patch was computed from.
+    Returns `None` if a cached patch doesn't apply cleanly, in which case the incarnation is left untouched.
+    """
+    current_incarnation_state_path = incarnation_root_dir / ".fengine.yaml"
+    current_incarnation_state = load_incarnation_state(current_incarnation_state_path)
+    updated_template_data = merge_template_data_with_fvars(update_template_data, incarnation_root_dir)
+
+    proc = await utils.check_call(
+        "git", "rev-parse", "--verify", f"{update_template_repository_version}^{{commit}}", cwd=template_git_repository
+    )
+    key = PatchCacheKey(
+        old_template_repository_version_hash=current_incarnation_state.template_repository_version_hash,
+        new_template_repository_version_hash=(await proc.stdout.read()).decode().strip(),  # type: ignore
+        template_data_hash=template_data_hash(
+            current_incarnation_state_path.read_bytes(), update_template_repository_version, updated_template_data
+        ),
+    )
+
+    # the renderings are kept until the update is done (but not the lock), they are needed to resolve conflicts
+    async with AsyncExitStack() as renderings:
+        rendered: tuple[Path, Path, IncarnationState] | None = None
+
+        # concurrent updates of the same transition wait for the first one to compute the patch
+        async with patch_cache.lock(key):
+            if (cached := patch_cache.get(key)) is None:
+                (
+                    original_template_root_dir,
+                    updated_template_root_dir,
+                    variable_index,
+                ) = await renderings.enter_async_context(
+                    _template_worktrees(
+                        template_git_repository,
+                        current_incarnation_state.template_repository_version_hash,
+                        update_template_repository_version,
+                    )
+                )
+                rendered = await renderings.enter_async_context(
+                    _rendered_incarnations(
+                        original_template_root_dir,
+                        updated_template_root_dir,
+                        update_template_repository_version,
+                        updated_template_data,
+                        incarnation_root_dir,
+                        variable_index,
+                    )
+                )
+                pristine_incarnation_dir, updated_incarnation_dir, updated_incarnation_state = rendered
+                patch_path = await diff(pristine_incarnation_dir, updated_incarnation_dir)
+
+                try:
+                    cached = CachedPatch(
+                        patch=None if patch_path is None else patch_path.read_text(),
+                        updated_incarnation_state=updated_incarnation_state,
+                    )
+                finally:
+                    if patch_path is not None:
+                        patch_path.unlink()
+                patch_cache.put(key, cached)
+            else:
+                logger.debug("found patch of template version transition in cache", key=key)
+
+        if cached.patch is None:
+            logger.debug("Update didn't change anything")
+            return False, cached.updated_incarnation_state, None
+
+        fd, patch_path_str = mkstemp(prefix="fengine-update-", suffix=".patch")
+        os.close(fd)
+        try:
+            (patch_path := Path(patch_path_str)).write_text(cached.patch)
+            if await apply_patch_cleanly(patch_path, incarnation_root_dir):
+                return True, cached.updated_incarnation_state, PatchResult(conflicts=[], deleted=[])
+        finally:
+            Path(patch_path_str).unlink()
+
+        if rendered is None:
+            logger.debug("cached patch doesn't apply cleanly, updating with conflict resolution instead", key=key)
+            return None
+
+        logger.debug("patch doesn't apply cleanly, resolving conflicts on its renderings", key=key)
+        pristine_incarnation_dir, updated_incarnation_dir, updated_incarnation_state = rendered
+        patch_result = await diff_patch_func(
+            diff_a_directory=pristine_incarnation_dir,
+            diff_b_directory=updated_incarnation_dir,
+            patch_directory=incarnation_root_dir,
+        )
+
+    if patch_result is None:
+        logger.debug("Update didn't change anything")
+        return False, updated_incarnation_state, None
+    return True, updated_incarnation_state, patch_result
+
+
+@asynccontextmanager
+async def _template_worktrees(
+    template_git_repository: Path, original_template_repository_version: str, update_template_repository_version: str
+) -> typing.AsyncGenerator[tuple[Path, Path, VariableIndex | None], None]:
+    """Checks out the original and the updated template versions in worktrees of the template repository.
+
+    If the template itself doesn't change, the variable index of the template is yielded as well.
+    """
     with TemporaryDirectory() as original_template_root_dir, TemporaryDirectory() as updated_template_root_dir:
         logger.debug(
             f"creating git worktree from current template repository "
-            f"(version: {current_incarnation_state.template_repository_version_hash}) at {original_template_root_dir}"
+            f"(version: {original_template_repository_version}) at {original_template_root_dir}"
         )
         await utils.check_call(
             "git",
             "worktree",
             "add",
             original_template_root_dir,
-            current_incarnation_state.template_repository_version_hash,
+            original_template_repository_version,
             cwd=template_git_repository,
         )
         logger.debug(
@@ -55,14 +219,18 @@ async def update_incarnation_from_git_template_repository(
             cwd=template_git_repository,
         )
 
-        return await update_incarnation(
-            original_template_root_dir=Path(original_template_root_dir),
-            updated_template_root_dir=Path(updated_template_root_dir),
-            updated_template_repository_version=update_template_repository_version,
-            updated_template_data=update_template_data,
-            incarnation_root_dir=incarnation_root_dir,
-            diff_patch_func=diff_patch_func,
-        )
+        # if the template itself doesn't change, only the files depending on changed variables need to be rendered
+        variable_index = None
+        updated_template_repository_version_hash = await open_git_repository(Path(updated_template_root_dir)).head()
+        if updated_template_repository_version_hash == original_template_repository_version:
+            template_config = load_template_config(Path(updated_template_root_dir) / "fengine.yaml")
+            variable_index = get_variable_index(
+                Path(updated_template_root_dir) / "template",
+                updated_template_repository_version_hash,
+                template_config.rendering.excluded_files,
+            )
+
+        yield Path(original_template_root_dir), Path(updated_template_root_dir), variable_index
 
 
 async def update_incarnation(
@@ -72,61 +240,36 @@ async def update_incarnation(
     updated_template_data: TemplateData,
     incarnation_root_dir: Path,
     diff_patch_func,
+    variable_index: VariableIndex | None = None,
 ) -> tuple[bool, IncarnationState, PatchResult | None]:
-    """Update an incarnation with a new version of a template."""
-    # initialize pristine incarnation from current incarnation state
-    current_incarnation_state_path = incarnation_root_dir / ".fengine.yaml"
-    current_incarnation_state = load_incarnation_state(current_incarnation_state_path)
+    """Update an incarnation with a new version of a template.
 
-    with TemporaryDirectory() as tmp_pristine_incarnation_dir, TemporaryDirectory() as tmp_updated_incarnation_dir:
-        logger.debug(
-            "initialize pristine incarnation from current incarnation state",
-            template_dir=original_template_root_dir,
-            incarnation_dir=tmp_pristine_incarnation_dir,
-        )
-        await _initialize_incarnation(
-            template_root_dir=original_template_root_dir,
-            template_repository=current_incarnation_state.template_repository,
-            template_repository_version=current_incarnation_state.template_repository_version,
-            template_data=current_incarnation_state.template_data,
-            incarnation_root_dir=Path(tmp_pristine_incarnation_dir),
-        )
-
-        # copy over .fengine.yaml from the actual incarnation, just to make sure there are no formatting differences
-        # that would be messing up the patching.
-        #
-        # there were unclear cases where the YAML rending was slightly different (e.g. strings starting on a newline)
-        # during updates, compared to the original incarnation rendering (reason unclear)
-        (Path(tmp_pristine_incarnation_dir) / ".fengine.yaml").write_bytes(current_incarnation_state_path.read_bytes())
-
-        logger.debug(
-            "initialize new incarnation from update incarnation state",
-            template_dir=updated_template_root_dir,
-            incarnation_dir=tmp_updated_incarnation_dir,
-        )
-        updated_incarnation_state = await _initialize_incarnation(
-            template_root_dir=updated_template_root_dir,
-            template_repository=current_incarnation_state.template_repository,
-            template_repository_version=updated_template_repository_version,
-            template_data=merge_template_data_with_fvars(
-                updated_template_data,
-                incarnation_root_dir,
-            ),
-            incarnation_root_dir=Path(tmp_updated_incarnation_dir),
-        )
+    If the original and updated template directories contain the exact same template version,
+    the `variable_index` of that version can be given. Then, only the files that depend on changed
+    template data are rendered and diffed - which yields the same patch, just faster.
+    """
+    updated_template_data = merge_template_data_with_fvars(updated_template_data, incarnation_root_dir)
 
+    async with _rendered_incarnations(
+        original_template_root_dir,
+        updated_template_root_dir,
+        updated_template_repository_version,
+        updated_template_data,
+        incarnation_root_dir,
+        variable_index,
+    ) as (pristine_incarnation_dir, updated_incarnation_dir, updated_incarnation_state):
         # diff pristine and new incarnations
         # apply patch on incarnation to update
         logger.debug(
             "applying patch on pristine and new incarnations",
-            diff_a_directory=tmp_pristine_incarnation_dir,
-            diff_b_directory=tmp_updated_incarnation_dir,
+            diff_a_directory=pristine_incarnation_dir,
+            diff_b_directory=updated_incarnation_dir,
             patch_directory=incarnation_root_dir,
         )
         if (
             patch_result := await diff_patch_func(
-                diff_a_directory=tmp_pristine_incarnation_dir,
-                diff_b_directory=tmp_updated_incarnation_dir,
+                diff_a_directory=pristine_incarnation_dir,
+                diff_b_directory=updated_incarnation_dir,
                 patch_directory=incarnation_root_dir,
             )
         ) is not None:
@@ -134,3 +277,98 @@ async def update_incarnation(
         else:
             logger.debug("Update didn't change anything")
             return False, updated_incarnation_state, None
+
+
+@asynccontextmanager
+async def _rendered_incarnations(
+    original_template_root_dir: Path,
+    updated_template_root_dir: Path,
+    updated_template_repository_version: str,
+    updated_template_data: TemplateData,
+    incarnation_root_dir: Path,
+    variable_index: VariableIndex | None,
+) -> typing.AsyncGenerator[tuple[Path, Path, IncarnationState], None]:
+    """Renders the pristine and the updated incarnation into temporary directories.
+
+    The `updated_template_data` must already be merged with the fvars of the incarnation.
+    """
+    # initialize pristine incarnation from current incarnation state
+    current_incarnation_state_path = incarnation_root_dir / ".fengine.yaml"
+    current_incarnation_state = load_incarnation_state(current_incarnation_state_path)
+
+    only_paths = None
+    if variable_index is not None:
+        changed_variables = _changed_template_variables(
+            current_incarnation_state,
+            updated_template_root_dir,
+            updated_template_repository_version,
+            updated_template_data,
+        )
+        only_paths = variable_index.paths_affected_by(changed_variables)
+        logger.debug(
+            "rendering only the paths affected by changed template data",
+            changed_variables=sorted(changed_variables),
+            paths=len(only_paths),
+        )
+
+    with TemporaryDirectory() as tmp_pristine_incarnation_dir, TemporaryDirectory() as tmp_updated_incarnation_dir:
+        logger.debug(
+            "initialize pristine and new incarnation from current and update incarnation state",
+            original_template_dir=original_template_root_dir,
+            pristine_incarnation_dir=tmp_pristine_incarnation_dir,
+            updated_template_dir=updated_template_root_dir,
+            updated_incarnation_dir=tmp_updated_incarnation_dir,
+        )
+        # both renderings are independent of each other, so they can run concurrently
+        _, updated_incarnation_state = await utils.gather_or_cancel(
+            _initialize_incarnation(
+                template_root_dir=original_template_root_dir,
+                template_repository=current_incarnation_state.template_repository,
+                template_repository_version=current_incarnation_state.template_repository_version,
+                template_data=current_incarnation_state.template_data,
+                incarnation_root_dir=Path(tmp_pristine_incarnation_dir),
+                only_paths=only_paths,
+            ),
+            _initialize_incarnation(
+                template_root_dir=updated_template_root_dir,
+                template_repository=current_incarnation_state.template_repository,
+                template_repository_version=updated_template_repository_version,
+                template_data=updated_template_data,
+                incarnation_root_dir=Path(tmp_updated_incarnation_dir),
+                only_paths=only_paths,
+            ),
+        )
+
+        # copy over .fengine.yaml from the actual incarnation, just to make sure there are no formatting differences
+        # that would be messing up the patching.
+        #
+        # there were unclear cases where the YAML rending was slightly different (e.g. strings starting on a newline)
+        # during updates, compared to the original incarnation rendering (reason unclear)
+        (Path(tmp_pristine_incarnation_dir) / ".fengine.yaml").write_bytes(current_incarnation_state_path.read_bytes())
+
+        yield Path(tmp_pristine_incarnation_dir), Path(tmp_updated_incarnation_dir), updated_incarnation_state
+
+
+def _changed_template_variables(
+    current_incarnation_state: IncarnationState,
+    updated_template_root_dir: Path,
+    updated_template_repository_version: str,
+    updated_template_data: TemplateData,
+) -> set[str]:
+    """Returns the names of all variables that have a different value during the rendering of the updated template.
+
+    That includes the metadata variables, which are passed to every rendering.
+    """
+    template_config = load_template_config(updated_template_root_dir / "fengine.yaml")
+    current: dict[str, object] = {
+        **current_incarnation_state.template_data,
+        "_fengine_template_repository": current_incarnation_state.template_repository,
+        "_fengine_template_repository_version": current_incarnation_state.template_repository_version,
+    }
+    updated: dict[str, object] = {
+        **fill_missing_optionals_with_defaults(updated_template_data, template_config),
+        "_fengine_template_repository": current_incarnation_state.template_repository,
+        "_fengine_template_repository_version": updated_template_repository_version,
+    }
+
+    return {name for name in current.keys() | updated.keys() if current.get(name) != updated.get(name)}
@@ -0,0 +1,154 @@
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+from jinja2 import TemplateError, meta
+from jinja2.sandbox import SandboxedEnvironment
+
+from foxops.engine.rendering import (
+    compile_exclude_patterns,
+    create_template_environment,
+)
+from foxops.logger import get_logger
+
+#: Holds the module logger
+logger = get_logger(__name__)
+
+#: Holds the maximum number of variable indexes that are cached
+VARIABLE_INDEX_CACHE_SIZE = 32
+
+#: Holds the cached variable indexes by template version hash and exclude patterns
+_variable_index_cache: OrderedDict[tuple[str, tuple[str, ...]], "VariableIndex"] = OrderedDict()
+
+
+@dataclass(frozen=True)
+class VariableIndex:
+    """Holds the template variables that the rendering of each file and symlink of a template depends on.
+
+    The keys are the paths relative to the template root directory.
+    A value of `None` means that the dependencies couldn't be determined statically
+    (e.g. because of a dynamic include) and the path has to be considered to depend on every variable.
+    """
+
+    dependencies: dict[Path, frozenset[str] | None]
+
+    def paths_affected_by(self, variables: set[str]) -> set[Path]:
+        """Returns the paths which may render differently if the given variables change."""
+        return {
+            path
+            for path, dependencies in self.dependencies.items()
+            if dependencies is None or not dependencies.isdisjoint(variables)
+        }
+
+
+def get_variable_index(
+    template_root_dir: Path, template_version_hash: str, rendering_filename_exclude_patterns: list[str]
+) -> VariableIndex:
+    """Returns the variable index of the template at the given version - building it if it's not yet cached.
+
+    The caller must make sure that the `template_root_dir` contains exactly the given version of the template.
+    """
+    key = (template_version_hash, tuple(rendering_filename_exclude_patterns))
+    if (index := _variable_index_cache.get(key)) is not None:
+        _variable_index_cache.move_to_end(key)
+        return index
+
+    index = build_variable_index(template_root_dir, rendering_filename_exclude_patterns)
+    _variable_index_cache[key] = index
+    while len(_variable_index_cache) > VARIABLE_INDEX_CACHE_SIZE:
+        _variable_index_cache.popitem(last=False)
+
+    return index
+
+
+def build_variable_index(template_root_dir: Path, rendering_filename_exclude_patterns: list[str]) -> VariableIndex:
+    """Build the variable index for the given template root directory (the one containing the files to render).
+
+    Paths and symlink targets are always rendered and therefore always indexed.
+    Contents are indexed for all files which are not excluded from rendering,
+    including all templates that are (transitively) included or imported by them.
+    """
+    environment = create_template_environment(template_root_dir)
+    is_excluded = compile_exclude_patterns(tuple(rendering_filename_exclude_patterns))
+    template_dependencies: dict[str, frozenset[str] | None] = {}
+
+    dependencies: dict[Path, frozenset[str] | None] = {}
+    for root_dir, dirs, files in os.walk(template_root_dir):
+        for name in dirs + files:
+            path = Path(root_dir) / name
+            relative_path = path.relative_to(template_root_dir)
+
+            if path.is_symlink():
+                sources = [str(relative_path), str(path.readlink())]
+            elif path.is_dir():
+                continue
+            else:
+                sources = [str(relative_path)]
+
+            path_dependencies = _union([_source_variables(environment, source) for source in sources])
+            if not path.is_symlink() and not is_excluded(relative_path.as_posix()):
+                path_dependencies = _union(
+                    [
+                        path_dependencies,
+                        _template_variables(environment, relative_path.as_posix(), template_dependencies, set()),
+                    ]
+                )
+            dependencies[relative_path] = path_dependencies
+
+    logger.debug(
+        "built variable index of template",
+        template_root_dir=template_root_dir,
+        paths=len(dependencies),
+        dynamic_paths=sum(1 for d in dependencies.values() if d is None),
+    )
+    return VariableIndex(dependencies=dependencies)
+
+
+def _template_variables(
+    environment: SandboxedEnvironment, name: str, cache: dict[str, frozenset[str] | None], visiting: set[str]
+) -> frozenset[str] | None:
+    if name in cache:
+        return cache[name]
+    if name in visiting:
+        # (potentially infinitely) recursive includes
+        return None
+
+    visiting.add(name)
+    try:
+        assert environment.loader is not None
+        source, _, _ = environment.loader.get_source(environment, name)
+        ast = environment.parse(source)
+    except TemplateError:
+        # rendering will fail anyways (or do something we can't predict)
+        variables = None
+    else:
+        referenced_names = list(meta.find_referenced_templates(ast))
+        if None in referenced_names:
+            # dynamic include or import, which may reference any template
+            variables = None
+        else:
+            variables = _union(
+                [
+                    frozenset(meta.find_undeclared_variables(ast)),
+                    *(_template_variables(environment, n, cache, visiting) for n in referenced_names if n is not None),
+                ]
+            )
+    visiting.discard(name)
+
+    cache[name] = variables
+    return variables
+
+
+def _source_variables(environment: SandboxedEnvironment, source: str) -> frozenset[str] | None:
+    try:
+        return frozenset(meta.find_undeclared_variables(environment.parse(source)))
+    except TemplateError:
+        return None
+
+
+def _union(variable_sets: Sequence[frozenset[str] | None]) -> frozenset[str] | None:
+    if any(v is None for v in variable_sets):
+        return None
+    return frozenset().union(*variable_sets)  # type: ignore
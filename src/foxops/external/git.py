@@ -1,11 +1,14 @@
 import asyncio
+import enum
 import re
 from pathlib import Path
+from typing import NamedTuple
 from urllib.parse import quote, urlparse, urlunparse
 
 from foxops.errors import FoxopsError, FoxopsUserError, RetryableError
 from foxops.logger import get_logger
-from foxops.utils import CalledProcessError, check_call
+from foxops.settings import GitBackend, get_git_settings
+from foxops.utils import CalledProcessError, SubprocessKind, check_call
 
 logger = get_logger("git")
 
@@ -42,9 +45,14 @@ GIT_ERROR_ORACLE = {
 }
 
 
+#: Holds the git subcommands which talk to a remote
+NETWORK_GIT_COMMANDS = frozenset({"clone", "fetch", "pull", "push", "ls-remote"})
+
+
 async def git_exec(*args, **kwargs) -> asyncio.subprocess.Process:
+    kind = SubprocessKind.NETWORK if args and args[0] in NETWORK_GIT_COMMANDS else SubprocessKind.LOCAL
     try:
-        return await check_call("git", *args, **kwargs)
+        return await check_call("git", *args, kind=kind, **kwargs)
     except CalledProcessError as exc:
         if oracle_hit_exc := next(
             (e(**m.groupdict()) for p, e in GIT_ERROR_ORACLE.items() if (m := p.search(exc.stderr))), None
@@ -71,13 +79,64 @@ def add_authentication_to_git_clone_url(source: str, username: str, password: st
     return urlunparse(url_parts)
 
 
+class RevisionKind(enum.Enum):
+    COMMIT = "commit"
+    TAG = "tag"
+    BRANCH = "branch"
+    #: any other ref, like `HEAD` or a fully qualified ref that is neither a tag nor a branch
+    OTHER = "other"
+
+
+class ResolvedRevision(NamedTuple):
+    sha: str
+    kind: RevisionKind
+
+
+async def ls_remote_revision(
+    remote: str, revision: str, cwd: Path, queue_key: str | None = None
+) -> ResolvedRevision | None:
+    """Resolves the given revision of a remote repository to a commit SHA, without cloning it.
+
+    The revision is resolved with the same precedence as git itself uses (e.g. tags before branches)
+    and annotated tags are peeled to the commit they point to.
+    Full commit SHAs are returned as is. `None` is returned if the revision cannot be resolved from
+    the advertised refs of the remote (e.g. for an abbreviated commit SHA).
+    """
+    if re.fullmatch(r"[0-9a-f]{40}", revision):
+        return ResolvedRevision(revision, RevisionKind.COMMIT)
+
+    candidates = [revision, f"refs/{revision}", f"refs/tags/{revision}", f"refs/heads/{revision}"]
+    patterns = [p for c in candidates for p in (c, f"{c}^{{}}")]
+
+    proc = await git_exec("ls-remote", remote, *patterns, cwd=cwd, timeout=30, queue_key=queue_key)
+    stdout = await proc.stdout.read() if proc.stdout is not None else b""
+
+    refs: dict[str, str] = {}
+    for line in stdout.decode().splitlines():
+        sha, ref = line.split("\t", maxsplit=1)
+        refs[ref] = sha
+
+    for candidate in candidates:
+        # prefer the peeled commit of an annotated tag over the tag object itself
+        if commit_sha := refs.get(f"{candidate}^{{}}") or refs.get(candidate):
+            if candidate.startswith("refs/tags/"):
+                return ResolvedRevision(commit_sha, RevisionKind.TAG)
+            if candidate.startswith("refs/heads/"):
+                return ResolvedRevision(commit_sha, RevisionKind.BRANCH)
+            return ResolvedRevision(commit_sha, RevisionKind.OTHER)
+
+    return None
+
+
 class GitRepository:
-    def __init__(self, directory: Path, push_delay_seconds: int = 0):
+    def __init__(self, directory: Path, push_delay_seconds: int = 0, queue_key: str | None = None):
         """
         :param directory: the path to the git repository
         :param push_delay_seconds: the number of seconds to wait before pushing changes to the remote. This is
             especially useful for testing the behavior of foxops when two incarnations in one repo are modified
             concurrently.
+        :param queue_key: the key (usually the identifier of the remote repository) by which the git subprocesses
+            are queued fairly, if too many of them run concurrently (see `foxops.utils.check_call()`).
         """
 
         if not directory.exists():
@@ -87,9 +146,10 @@ class GitRepository:
 
         self.directory = directory
         self.push_delay_seconds = push_delay_seconds
+        self.queue_key = queue_key
 
     async def _run(self, *args, timeout: int | float | None = 30, **kwargs) -> asyncio.subprocess.Process:
-        return await git_exec(*args, cwd=self.directory, timeout=timeout, **kwargs)
+        return await git_exec(*args, cwd=self.directory, timeout=timeout, queue_key=self.queue_key, **kwargs)
 
     async def has_commit(self, commit_sha: str) -> bool:
         try:
@@ -127,25 +187,10 @@ class GitRepository:
         return await self._run("commit", "-m", message)
 
     async def diff(self, ref_old: str, ref_new: str) -> str:
-        cmdline = f"git --no-pager diff {ref_old}..{ref_new}".split()
-        proc = await asyncio.create_subprocess_exec(
-            *cmdline,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            stdin=asyncio.subprocess.PIPE,
-            cwd=str(self.directory),
+        proc = await self._run(
+            "--no-pager", "diff", f"{ref_old}..{ref_new}", expected_returncodes=frozenset({0, 1}), timeout=None
         )
-        stdout, stderr = await proc.communicate()
-
-        if proc.returncode not in {0, 1}:
-            raise CalledProcessError(
-                proc.returncode if proc.returncode is not None else -1,
-                cmdline,
-                stdout,
-                stderr,
-            )
-
-        return stdout.decode()
+        return (await proc.stdout.read()).decode()  # type: ignore
 
     async def origin_default_branch(self) -> str | None:
         """Returns "main" if the remote repo is empty."""
@@ -207,6 +252,16 @@ class GitRepository:
             raise GitError("unable to determine the current git HEAD")
         return (await proc.stdout.read()).decode().strip()
 
+    async def resolve_commit(self, revision: str) -> str:
+        """Returns the commit SHA that the given revision (e.g. a tag or branch) points to."""
+        try:
+            proc = await self._run("rev-parse", "--verify", "--end-of-options", f"{revision}^{{commit}}")
+        except GitError as exc:
+            raise RevisionNotFoundError(revision.encode()) from exc
+        if proc.stdout is None:
+            raise GitError(f"unable to resolve the revision {revision}")
+        return (await proc.stdout.read()).decode().strip()
+
     async def fetch(self, refspec: str | None = None) -> None:
         args = []
         if refspec is not None:
@@ -230,3 +285,27 @@ class GitRepository:
             raise GitError("unable to determine the last commit that changed a file")
 
         return (await proc.stdout.read()).decode().strip()
+
+
+def open_git_repository(
+    directory: Path, push_delay_seconds: int = 0, backend: GitBackend | None = None, queue_key: str | None = None
+) -> GitRepository:
+    """Returns a `GitRepository` for the given directory, implemented by the given git backend.
+
+    If no backend is given, the one configured in the git settings (`FOXOPS_GIT_BACKEND`) is used.
+    """
+    if backend is None:
+        backend = get_git_settings().backend
+
+    if backend == GitBackend.DULWICH:
+        try:
+            from foxops.external.git_dulwich import DulwichGitRepository
+        except ImportError as exc:
+            raise FoxopsError(
+                "the dulwich git backend requires the optional `dulwich` dependency. "
+                "Install foxops with the `dulwich` extra to use it."
+            ) from exc
+
+        return DulwichGitRepository(directory, push_delay_seconds=push_delay_seconds, queue_key=queue_key)
+
+    return GitRepository(directory, push_delay_seconds=push_delay_seconds, queue_key=queue_key)
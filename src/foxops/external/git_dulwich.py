@@ -0,0 +1,229 @@
+"""
+In-process implementation of the local operations of a `GitRepository`, using dulwich.
+
+Operations which only read or write the local object database, index and refs (reading trees and blobs,
+committing, creating branches and tags, computing diffs) are executed in-process on a worker thread.
+Everything that talks to a remote (fetch, pull, push) or has to rewrite the working tree (checkout
+of another branch, merge, rebase) is still delegated to the `git` CLI by the `GitRepository` base class.
+"""
+
+import asyncio
+import os
+from io import BytesIO
+from pathlib import Path
+
+from dulwich import porcelain
+from dulwich.errors import NotGitRepository
+from dulwich.objects import Commit
+from dulwich.objectspec import parse_commit
+from dulwich.patch import write_tree_diff
+from dulwich.refs import SYMREF, Ref, check_ref_format
+from dulwich.repo import Repo
+
+from foxops.external.git import GitError, GitRepository, RevisionNotFoundError
+
+HEAD = Ref(b"HEAD")
+BRANCH_REF_PREFIX = b"refs/heads/"
+TAG_REF_PREFIX = b"refs/tags/"
+ORIGIN_HEAD = Ref(b"refs/remotes/origin/HEAD")
+
+
+class DulwichGitRepository(GitRepository):
+    def _open(self) -> Repo:
+        # like the git CLI, the repository is discovered from the directory upwards
+        try:
+            return Repo.discover(str(self.directory))
+        except NotGitRepository as exc:
+            raise GitError(f"fatal: not a git repository: {self.directory}") from exc
+
+    def _paths_within_directory(self, repo: Repo, paths: list[str]) -> list[str]:
+        """Filters the given (repository root relative) paths to those within `self.directory`."""
+        prefix = os.path.relpath(self.directory, repo.path)
+        if prefix == ".":
+            return paths
+
+        return [p for p in paths if p.startswith(f"{prefix}/")]
+
+    async def has_commit(self, commit_sha: str) -> bool:
+        return await asyncio.to_thread(self._has_commit, commit_sha)
+
+    def _has_commit(self, commit_sha: str) -> bool:
+        with self._open() as repo:
+            try:
+                parse_commit(repo, commit_sha.encode())
+            except (KeyError, ValueError):
+                return False
+
+        return True
+
+    async def has_any_commits(self) -> bool:
+        return await asyncio.to_thread(self._has_any_commits)
+
+    def _has_any_commits(self) -> bool:
+        with self._open() as repo:
+            for ref in repo.refs.allkeys():
+                try:
+                    sha = repo.refs[ref]
+                except KeyError:
+                    # a symbolic ref pointing to an unborn branch
+                    continue
+
+                if sha in repo.object_store:
+                    return True
+
+        return False
+
+    async def create_and_checkout_branch(self, branch: str, exist_ok=False):
+        created = await asyncio.to_thread(self._create_and_checkout_branch, branch, exist_ok)
+        if not created:
+            # the branch already existed (and `exist_ok` is set), which means that the working tree
+            # potentially needs to be updated. Leave that to the git CLI.
+            await self.checkout_branch(branch)
+
+    def _create_and_checkout_branch(self, branch: str, exist_ok: bool) -> bool:
+        ref = Ref(BRANCH_REF_PREFIX + branch.encode())
+        if not check_ref_format(ref):
+            raise GitError(f"fatal: '{branch}' is not a valid branch name")
+
+        with self._open() as repo:
+            if ref in repo.refs:
+                if exist_ok:
+                    return False
+                raise GitError(f"fatal: a branch named '{branch}' already exists")
+
+            # the new branch points to the current HEAD, therefore the working tree and index stay untouched.
+            # On an unborn HEAD there is nothing to point to, so we only switch the symbolic HEAD ref.
+            try:
+                repo.refs.add_if_new(ref, repo.refs[HEAD])
+            except KeyError:
+                pass
+            repo.refs.set_symbolic_ref(HEAD, ref)
+
+        return True
+
+    async def has_uncommitted_changes(self) -> bool:
+        return await asyncio.to_thread(self._has_uncommitted_changes)
+
+    def _has_uncommitted_changes(self) -> bool:
+        with self._open() as repo:
+            status = porcelain.status(repo, untracked_files="all")
+
+        return any(status.staged.values()) or len(status.unstaged) > 0 or len(status.untracked) > 0
+
+    async def commit_all(self, message: str):
+        await asyncio.to_thread(self._commit_all, message)
+
+    def _commit_all(self, message: str) -> None:
+        with self._open() as repo:
+            # equivalent of `git add .`: stage new, modified and deleted files
+            status = porcelain.status(repo, untracked_files="all")
+            changed_paths = self._paths_within_directory(
+                repo, [os.fsdecode(p) for p in status.unstaged] + [os.fsdecode(p) for p in status.untracked]
+            )
+
+            root = Path(repo.path)
+            existing_paths = [p for p in changed_paths if os.path.lexists(root / p)]
+            if existing_paths:
+                porcelain.add(repo, [str(root / p) for p in existing_paths])
+
+            if deleted_paths := [p for p in changed_paths if p not in existing_paths]:
+                index = repo.open_index()
+                for path in deleted_paths:
+                    del index[os.fsencode(path)]
+                index.write()
+
+            tree_id = repo.open_index().commit(repo.object_store)
+            try:
+                head_tree_id = self._parse_commit(repo, "HEAD").tree
+            except RevisionNotFoundError:
+                head_tree_id = None
+            if tree_id == head_tree_id:
+                raise GitError("nothing to commit, working tree clean")
+
+            porcelain.commit(repo, message=message.encode())
+
+    async def diff(self, ref_old: str, ref_new: str) -> str:
+        return await asyncio.to_thread(self._diff, ref_old, ref_new)
+
+    def _diff(self, ref_old: str, ref_new: str) -> str:
+        with self._open() as repo:
+            old_commit = self._parse_commit(repo, ref_old)
+            new_commit = self._parse_commit(repo, ref_new)
+
+            output = BytesIO()
+            write_tree_diff(output, repo.object_store, old_commit.tree, new_commit.tree)
+
+        return output.getvalue().decode()
+
+    async def origin_default_branch(self) -> str | None:
+        return await asyncio.to_thread(self._origin_default_branch)
+
+    def _origin_default_branch(self) -> str | None:
+        with self._open() as repo:
+            contents = repo.refs.read_ref(ORIGIN_HEAD)
+
+        if contents is None or not contents.startswith(SYMREF):
+            return None
+
+        # same output as `git symbolic-ref --short`, e.g. `origin/main`
+        return contents[len(SYMREF) :].decode().removeprefix("refs/remotes/")
+
+    async def current_branch(self) -> str:
+        return await asyncio.to_thread(self._current_branch)
+
+    def _current_branch(self) -> str:
+        with self._open() as repo:
+            contents = repo.refs.read_ref(HEAD)
+
+        if contents is None or not contents.startswith(SYMREF + BRANCH_REF_PREFIX):
+            # detached HEAD
+            return ""
+
+        return contents[len(SYMREF + BRANCH_REF_PREFIX) :].decode()
+
+    async def head(self) -> str:
+        return await asyncio.to_thread(self._head)
+
+    def _head(self) -> str:
+        with self._open() as repo:
+            try:
+                return repo.head().decode()
+            except KeyError as exc:
+                raise GitError("unable to determine the current git HEAD") from exc
+
+    async def tag(self, tag: str):
+        await asyncio.to_thread(self._tag, tag)
+
+    def _tag(self, tag: str) -> None:
+        ref = Ref(TAG_REF_PREFIX + tag.encode())
+        if not check_ref_format(ref):
+            raise GitError(f"fatal: '{tag}' is not a valid tag name.")
+
+        with self._open() as repo:
+            if not repo.refs.add_if_new(ref, self._parse_commit(repo, "HEAD").id):
+                raise GitError(f"fatal: tag '{tag}' already exists")
+
+    async def last_commit_id_that_changed_file(self, path: str) -> str:
+        return await asyncio.to_thread(self._last_commit_id_that_changed_file, path)
+
+    def _last_commit_id_that_changed_file(self, path: str) -> str:
+        with self._open() as repo:
+            # relative paths are interpreted relative to the directory, like the git CLI does
+            relative_path = Path(os.path.relpath(self.directory / path, repo.path))
+            try:
+                walker = repo.get_walker(paths=[relative_path.as_posix().encode()], max_entries=1)
+            except KeyError:
+                # no commits yet
+                return ""
+
+            for entry in walker:
+                return entry.commit.id.decode()
+
+        return ""
+
+    @staticmethod
+    def _parse_commit(repo: Repo, ref: str) -> Commit:
+        try:
+            return parse_commit(repo, ref.encode())
+        except KeyError as exc:
+            raise RevisionNotFoundError(ref.encode()) from exc
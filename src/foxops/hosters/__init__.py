@@ -1,4 +1,5 @@
 from foxops.hosters.types import (  # noqa: F401
+    ChangeStatusQuery,
     GitSha,
     Hoster,
     HosterSettings,
@@ -7,7 +7,7 @@ from http import HTTPStatus
 from pathlib import Path
 from ssl import SSLZeroReturnError
 from tempfile import mkdtemp
-from typing import AsyncIterator, TypedDict
+from typing import AsyncIterator, Literal, NamedTuple, Sequence, TypedDict
 from urllib.parse import quote_plus
 
 import httpx
@@ -18,25 +18,56 @@ from tenacity.wait import wait_fixed
 
 from foxops.engine import IncarnationState
 from foxops.engine.models import load_incarnation_state_from_string
-from foxops.errors import IncarnationRepositoryNotFound
+from foxops.errors import FoxopsError, IncarnationRepositoryNotFound
 from foxops.external.git import (
     GitRepository,
+    ResolvedRevision,
     add_authentication_to_git_clone_url,
     git_exec,
+    ls_remote_revision,
+    open_git_repository,
 )
 from foxops.hosters.types import (
+    ChangeStatusQuery,
     GitSha,
     Hoster,
     MergeRequestId,
     MergeRequestStatus,
     ReconciliationStatus,
     RepositoryMetadata,
+    TreeEntry,
 )
 from foxops.logger import bound, get_logger
 
 #: Holds the module logger
 logger = get_logger(__name__)
 
+#: Holds the maximum number of lookups which are sent to the GraphQL API in a single request,
+#: which keeps the requests below the query complexity limit of GitLab
+GRAPHQL_BATCH_SIZE = 20
+
+#: Holds the statuses of commits and pipelines which are still running (or about to)
+PENDING_PIPELINE_STATUSES = frozenset({"created", "pending", "waiting_for_resource", "running"})
+#: Holds the statuses of commits and pipelines which didn't succeed
+FAILED_PIPELINE_STATUSES = frozenset({"failed", "canceled"})
+
+#: Holds the merge request statuses by merge request state
+MERGE_REQUEST_STATUSES = {
+    "opened": MergeRequestStatus.OPEN,
+    "locked": MergeRequestStatus.OPEN,  # assumed to be a transitional, internal Gitlab state
+    "closed": MergeRequestStatus.CLOSED,
+    "merged": MergeRequestStatus.MERGED,
+}
+
+#: Holds the GraphQL argument types and field selections of the lookups in a project, by kind of lookup
+GRAPHQL_PROJECT_LOOKUPS = {
+    "merge_request": (
+        "String!",
+        "mergeRequest(iid: $argument) { state mergeStatusEnum mergeCommitSha diffHeadSha headPipeline { status } }",
+    ),
+    "commit": ("String", "pipelines(sha: $argument, first: 1) { nodes { status } }"),
+}
+
 
 class MergeRequest(TypedDict):
     iid: int
@@ -59,6 +90,13 @@ class Commit(TypedDict):
     status: str
 
 
+class ProjectLookup(NamedTuple):
+    project: str
+    kind: Literal["merge_request", "commit"]
+    #: the iid of the merge request or the sha of the commit
+    argument: str
+
+
 def evaluate_gitlab_address(address: str) -> tuple[str, str]:
     """Evaluate the given GitLab address and return a tuple containing the GitLab Web UI URL and the GitLab API URL."""
     if address.endswith("/api/v4"):
@@ -163,14 +201,8 @@ class GitLab(Hoster):
     async def cloned_repository(
         self, repository: str, *, refspec: str | None = None, bare: bool = False
     ) -> AsyncIterator[GitRepository]:
-        if not repository.startswith(("https://", "http://")):
-            # it's not a URL, but a `path_with_namespace`, so, let's think it a URL
-            metadata = await self.get_repository_metadata(repository)
-            repository = metadata["http_url"]
+        clone_url = await self._authenticated_clone_url(repository)
 
-        clone_url = add_authentication_to_git_clone_url(repository, "__token__", self.token)
-
-        # we assume that `repository` is already a proper HTTP(S) URL
         local_clone_directory = Path(mkdtemp())
 
         try:
@@ -182,6 +214,7 @@ class GitLab(Hoster):
                         clone_url,
                         local_clone_directory,
                         cwd=Path.home(),
+                        queue_key=repository,
                     )
                 else:
                     await git_exec(
@@ -190,6 +223,7 @@ class GitLab(Hoster):
                         clone_url,
                         local_clone_directory,
                         cwd=Path.home(),
+                        queue_key=repository,
                     )
             else:
                 # NOTE(TF): this only works for git hosters which have enabled `uploadpack.allowReachableSHA1InWant`
@@ -197,8 +231,8 @@ class GitLab(Hoster):
                 #           In addition, it seems that if the refspec is a tag, it won't be created locally
                 #           and we later on cannot address it in e.g. a `switch`.
                 #           So we need to fetch all tag refs, which should be fine.
-                await git_exec("init", local_clone_directory, cwd=Path.home())
-                await git_exec("remote", "add", "origin", clone_url, cwd=local_clone_directory)
+                await git_exec("init", local_clone_directory, cwd=Path.home(), queue_key=repository)
+                await git_exec("remote", "add", "origin", clone_url, cwd=local_clone_directory, queue_key=repository)
                 await git_exec(
                     "fetch",
                     "--depth=1",
@@ -206,8 +240,9 @@ class GitLab(Hoster):
                     "--tags",
                     refspec,
                     cwd=local_clone_directory,
+                    queue_key=repository,
                 )
-                await git_exec("reset", "--hard", "FETCH_HEAD", cwd=local_clone_directory)
+                await git_exec("reset", "--hard", "FETCH_HEAD", cwd=local_clone_directory, queue_key=repository)
 
             # NOTE(TF): set author data
             await git_exec(
@@ -215,13 +250,52 @@ class GitLab(Hoster):
                 "user.name",
                 "foxops",
                 cwd=local_clone_directory,
+                queue_key=repository,
             )
-            await git_exec("config", "user.email", "noreply@foxops.io", cwd=local_clone_directory)
+            await git_exec("config", "user.email", "noreply@foxops.io", cwd=local_clone_directory, queue_key=repository)
 
-            yield GitRepository(local_clone_directory)
+            yield open_git_repository(local_clone_directory, queue_key=repository)
         finally:
             shutil.rmtree(local_clone_directory)
 
+    async def _authenticated_clone_url(self, repository: str) -> str:
+        if not repository.startswith(("https://", "http://")):
+            # it's not a URL, but a `path_with_namespace`, so, let's think it a URL
+            metadata = await self.get_repository_metadata(repository)
+            repository = metadata["http_url"]
+
+        # we assume that `repository` is already a proper HTTP(S) URL
+        return add_authentication_to_git_clone_url(repository, "__token__", self.token)
+
+    async def resolve_revision(self, repository: str, revision: str) -> ResolvedRevision | None:
+        clone_url = await self._authenticated_clone_url(repository)
+        return await ls_remote_revision(clone_url, revision, cwd=Path.home(), queue_key=repository)
+
+    async def get_repository_tree(self, repository: str, revision: str, path: str) -> dict[str, TreeEntry]:
+        prefix = "" if path in ("", ".") else f"{path.strip('/')}/"
+        tree = {}
+        page: str | None = "1"
+        while page:
+            response = await self.client.get(
+                f"/projects/{quote_plus(repository)}/repository/tree",
+                params={"ref": revision, "path": prefix, "recursive": True, "per_page": 100, "page": page},
+            )
+            if response.status_code == HTTPStatus.NOT_FOUND:
+                # GitLab responds with 404 if the path doesn't exist at that revision
+                return {}
+            response.raise_for_status()
+
+            for entry in response.json():
+                if entry["type"] == "blob":
+                    tree[entry["path"].removeprefix(prefix)] = TreeEntry(entry["mode"], entry["id"])
+            page = response.headers.get("x-next-page")
+        return tree
+
+    async def get_blob(self, repository: str, sha: GitSha) -> bytes:
+        response = await self.client.get(f"/projects/{quote_plus(repository)}/repository/blobs/{sha}/raw")
+        response.raise_for_status()
+        return response.content
+
     async def has_pending_incarnation_branch(self, project_identifier: str, branch: str) -> GitSha | None:
         response = await self.client.get(
             f"/projects/{quote_plus(project_identifier)}/repository/branches/{quote_plus(branch)}"
@@ -337,11 +411,11 @@ class GitLab(Hoster):
                     logger.debug("Reconciliation status: commit status is success, returning SUCCESS")
                     return ReconciliationStatus.SUCCESS
 
-                if commit["status"] in {"created", "pending", "waiting_for_resource", "running"}:
+                if commit["status"] in PENDING_PIPELINE_STATUSES:
                     logger.debug(f"Reconciliation status: commit status is {commit['status']}, returning PENDING")
                     return ReconciliationStatus.PENDING
 
-                if commit["status"] in {"failed", "canceled"}:
+                if commit["status"] in FAILED_PIPELINE_STATUSES:
                     logger.debug(f"Reconciliation status: commit status is {commit['status']}, returning FAILED")
                     return ReconciliationStatus.FAILED
 
@@ -372,10 +446,10 @@ class GitLab(Hoster):
                     )
                     return ReconciliationStatus.FAILED
 
-                if merge_request["head_pipeline"] is not None and merge_request["head_pipeline"]["status"] in {
-                    "failed",
-                    "canceled",
-                }:
+                if (
+                    merge_request["head_pipeline"] is not None
+                    and merge_request["head_pipeline"]["status"] in FAILED_PIPELINE_STATUSES
+                ):
                     logger.debug(
                         f"Reconciliation status: merge request state is open and pipeline status is "
                         f"{merge_request['head_pipeline']['status']}, returning FAILED"
@@ -439,15 +513,9 @@ class GitLab(Hoster):
 
         merge_request: MergeRequest = response.json()
 
-        mapping = {
-            "opened": MergeRequestStatus.OPEN,
-            "locked": MergeRequestStatus.OPEN,  # assumed to be a transitional, internal Gitlab state
-            "closed": MergeRequestStatus.CLOSED,
-            "merged": MergeRequestStatus.MERGED,
-        }
         state = merge_request["state"]
         try:
-            return mapping[state]
+            return MERGE_REQUEST_STATUSES[state]
         except KeyError:
             logger.warning(
                 f"unknown merge request state '{state}'",
@@ -456,6 +524,130 @@ class GitLab(Hoster):
             )
             return MergeRequestStatus.UNKNOWN
 
+    async def get_change_statuses(
+        self, queries: Sequence[ChangeStatusQuery]
+    ) -> list[tuple[ReconciliationStatus, MergeRequestStatus | None]]:
+        # the merge requests and the commits of direct changes are looked up first,
+        # the merge commits of merged merge requests (which aren't known before) in a second round
+        projects = await self._graphql_project_lookups(
+            [
+                ProjectLookup(query.incarnation_repository, "commit", query.commit_sha)
+                if query.merge_request_id is None
+                else ProjectLookup(query.incarnation_repository, "merge_request", query.merge_request_id)
+                for query in queries
+            ]
+        )
+
+        statuses: list[tuple[ReconciliationStatus, MergeRequestStatus | None]] = []
+        merge_commit_lookups: dict[int, ProjectLookup] = {}
+        for i, (query, project) in enumerate(zip(queries, projects)):
+            with bound(incarnation_repository=query.incarnation_repository, commit_sha=query.commit_sha):
+                if project is None:
+                    logger.warning("project not found, the statuses of the change are unknown")
+                    merge_request_status = None if query.merge_request_id is None else MergeRequestStatus.UNKNOWN
+                    statuses.append((ReconciliationStatus.UNKNOWN, merge_request_status))
+                elif query.merge_request_id is None:
+                    statuses.append((self._graphql_commit_status(project), None))
+                elif (merge_request := project["mergeRequest"]) is None:
+                    # if the merge request does not exist, we assume it has been closed (because it was deleted)
+                    statuses.append((ReconciliationStatus.FAILED, MergeRequestStatus.CLOSED))
+                else:
+                    statuses.append(self._graphql_merge_request_statuses(merge_request))
+                    if merge_request["state"] == "merged" and (
+                        merge_commit_sha := merge_request["mergeCommitSha"] or merge_request["diffHeadSha"]
+                    ):
+                        merge_commit_lookups[i] = ProjectLookup(
+                            query.incarnation_repository, "commit", merge_commit_sha
+                        )
+
+        merge_commit_projects = await self._graphql_project_lookups(list(merge_commit_lookups.values()))
+        for i, project in zip(merge_commit_lookups, merge_commit_projects):
+            status = ReconciliationStatus.UNKNOWN if project is None else self._graphql_commit_status(project)
+            statuses[i] = (status, statuses[i][1])
+
+        return statuses
+
+    def _graphql_commit_status(self, project: dict) -> ReconciliationStatus:
+        pipelines = project["pipelines"]["nodes"]
+        if not pipelines:
+            # just like `get_reconciliation_status` without pipeline timeout
+            return ReconciliationStatus.SUCCESS
+
+        pipeline_status = pipelines[0]["status"].lower()
+        if pipeline_status == "success":
+            return ReconciliationStatus.SUCCESS
+        if pipeline_status in PENDING_PIPELINE_STATUSES:
+            return ReconciliationStatus.PENDING
+        if pipeline_status in FAILED_PIPELINE_STATUSES:
+            return ReconciliationStatus.FAILED
+
+        logger.error(f"unknown pipeline status '{pipeline_status}'")
+        return ReconciliationStatus.UNKNOWN
+
+    def _graphql_merge_request_statuses(
+        self, merge_request: dict
+    ) -> tuple[ReconciliationStatus, MergeRequestStatus | None]:
+        """Returns the statuses of the given merge request, the reconciliation status of merged ones is UNKNOWN."""
+        state = merge_request["state"]
+        if (merge_request_status := MERGE_REQUEST_STATUSES.get(state)) is None:
+            logger.warning(f"unknown merge request state '{state}'")
+            return ReconciliationStatus.UNKNOWN, MergeRequestStatus.UNKNOWN
+
+        if state == "opened":
+            if merge_request["mergeStatusEnum"].lower() in {"cannot_be_merged", "cannot_be_merged_recheck"}:
+                return ReconciliationStatus.FAILED, merge_request_status
+            head_pipeline = merge_request["headPipeline"]
+            if head_pipeline is not None and head_pipeline["status"].lower() in FAILED_PIPELINE_STATUSES:
+                return ReconciliationStatus.FAILED, merge_request_status
+            return ReconciliationStatus.PENDING, merge_request_status
+        if state == "closed":
+            return ReconciliationStatus.FAILED, merge_request_status
+
+        return ReconciliationStatus.UNKNOWN, merge_request_status
+
+    async def _graphql_project_lookups(self, lookups: Sequence[ProjectLookup]) -> list[dict | None]:
+        """Looks up merge requests and commit pipelines of many projects with as few GraphQL requests as possible.
+
+        Returns the looked up project objects in the order of the lookups,
+        `None` for projects which don't exist (or aren't accessible).
+        """
+        projects: list[dict | None] = []
+        for offset in range(0, len(lookups), GRAPHQL_BATCH_SIZE):
+            batch = lookups[offset : offset + GRAPHQL_BATCH_SIZE]
+
+            definitions = []
+            fields = []
+            variables = {}
+            for i, lookup in enumerate(batch):
+                argument_type, selection = GRAPHQL_PROJECT_LOOKUPS[lookup.kind]
+                definitions.append(f"$project{i}: ID!, $argument{i}: {argument_type}")
+                fields.append(
+                    f"p{i}: project(fullPath: $project{i}) {{ {selection.replace('$argument', f'$argument{i}')} }}"
+                )
+                variables[f"project{i}"] = lookup.project
+                variables[f"argument{i}"] = lookup.argument
+
+            data = await self._graphql(f"query({', '.join(definitions)}) {{ {' '.join(fields)} }}", variables)
+            projects.extend(data[f"p{i}"] for i in range(len(batch)))
+
+        return projects
+
+    async def _graphql(self, query: str, variables: dict[str, str]) -> dict:
+        response = await self.client.post(
+            f"{self.web_address}/api/graphql",
+            json={"query": query, "variables": variables},
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+        response.raise_for_status()
+        result = response.json()
+
+        if result.get("data") is None:
+            raise FoxopsError(f"GitLab GraphQL request failed: {result.get('errors')}")
+        if errors := result.get("errors"):
+            # the fields which failed are `null`, the others are still usable
+            logger.warning("GitLab GraphQL request partially failed", errors=errors)
+        return result["data"]
+
     async def _has_gitlab_ci_configuration(self, incarnation_repository: str, ref: str) -> bool:
         response = await self.client.head(
             f"/projects/{quote_plus(incarnation_repository)}/repository/files/{quote_plus('.gitlab-ci.yml')}",
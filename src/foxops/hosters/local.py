@@ -4,14 +4,26 @@ from collections import defaultdict
 from contextlib import asynccontextmanager
 from datetime import timedelta
 from pathlib import Path
-from typing import AsyncIterator
+from typing import AsyncIterator, Sequence
 
 from pydantic import BaseModel
 
 from foxops.engine import IncarnationState, load_incarnation_state
-from foxops.external.git import GitError, GitRepository, git_exec
+from foxops.external.git import (
+    GitError,
+    GitRepository,
+    ResolvedRevision,
+    git_exec,
+    ls_remote_revision,
+    open_git_repository,
+)
 from foxops.hosters import GitSha, Hoster, MergeRequestId, ReconciliationStatus
-from foxops.hosters.types import MergeRequestStatus, RepositoryMetadata
+from foxops.hosters.types import (
+    ChangeStatusQuery,
+    MergeRequestStatus,
+    RepositoryMetadata,
+    TreeEntry,
+)
 
 
 class MergeRequest(BaseModel):
@@ -123,18 +135,47 @@ class LocalHoster(Hoster):
                     repo_path,
                     ".",
                     cwd=tmpdir,
+                    queue_key=repository,
                 )
             else:
-                await git_exec("init", cwd=tmpdir)
-                await git_exec("remote", "add", "origin", repo_path, cwd=tmpdir)
-                await git_exec("fetch", "--depth=1", "origin", "--tags", refspec, cwd=tmpdir)
-                await git_exec("reset", "--hard", "FETCH_HEAD", cwd=tmpdir)
+                await git_exec("init", cwd=tmpdir, queue_key=repository)
+                await git_exec("remote", "add", "origin", repo_path, cwd=tmpdir, queue_key=repository)
+                await git_exec("fetch", "--depth=1", "origin", "--tags", refspec, cwd=tmpdir, queue_key=repository)
+                await git_exec("reset", "--hard", "FETCH_HEAD", cwd=tmpdir, queue_key=repository)
 
             # set author data
-            await git_exec("config", "user.name", "foxops", cwd=tmpdir)
-            await git_exec("config", "user.email", "noreply@foxops.io", cwd=tmpdir)
+            await git_exec("config", "user.name", "foxops", cwd=tmpdir, queue_key=repository)
+            await git_exec("config", "user.email", "noreply@foxops.io", cwd=tmpdir, queue_key=repository)
 
-            yield GitRepository(Path(tmpdir), push_delay_seconds=self.push_delay_seconds)
+            yield open_git_repository(Path(tmpdir), push_delay_seconds=self.push_delay_seconds, queue_key=repository)
+
+    async def resolve_revision(self, repository: str, revision: str) -> ResolvedRevision | None:
+        repo_path = (self.directory / repository).absolute()
+        if not repo_path.is_dir():
+            raise ValueError("Repository does not exist")
+
+        return await ls_remote_revision(str(repo_path), revision, cwd=self.directory, queue_key=repository)
+
+    async def get_repository_tree(self, repository: str, revision: str, path: str) -> dict[str, TreeEntry]:
+        stdout = await self._git_output(repository, "ls-tree", "-r", "-z", "--full-tree", revision, "--", path)
+
+        prefix = "" if path in ("", ".") else f"{path.strip('/')}/"
+        tree = {}
+        for line in stdout.decode().split("\0"):
+            if not line:
+                continue
+            info, file_path = line.split("\t", 1)
+            mode, kind, sha = info.split(" ")
+            if kind == "blob":
+                tree[file_path.removeprefix(prefix)] = TreeEntry(mode, sha)
+        return tree
+
+    async def get_blob(self, repository: str, sha: GitSha) -> bytes:
+        return await self._git_output(repository, "cat-file", "blob", sha)
+
+    async def _git_output(self, repository: str, *args: str) -> bytes:
+        proc = await git_exec(*args, cwd=self.directory / repository, queue_key=repository)
+        return await proc.stdout.read()  # type: ignore
 
     async def has_pending_incarnation_branch(self, project_identifier: str, branch: str) -> GitSha | None:
         try:
@@ -154,7 +195,11 @@ class LocalHoster(Hoster):
     async def has_pending_incarnation_merge_request(
         self, project_identifier: str, branch: str
     ) -> MergeRequestId | None:
-        raise NotImplementedError
+        for mr in self._merge_requests[project_identifier]:
+            if mr.source_branch == branch and mr.status == MergeRequestStatus.OPEN:
+                return str(mr.id)
+
+        return None
 
     async def get_repository_metadata(self, project_identifier: str) -> RepositoryMetadata:
         return {
@@ -199,3 +244,18 @@ class LocalHoster(Hoster):
             raise ValueError("Merge request does not exist")
 
         return existing_merge_requests[merge_request_index].status
+
+    async def get_change_statuses(
+        self, queries: Sequence[ChangeStatusQuery]
+    ) -> list[tuple[ReconciliationStatus, MergeRequestStatus | None]]:
+        return [
+            (
+                await self.get_reconciliation_status(
+                    query.incarnation_repository, ".", query.commit_sha, query.merge_request_id
+                ),
+                None
+                if query.merge_request_id is None
+                else await self.get_merge_request_status(query.incarnation_repository, query.merge_request_id),
+            )
+            for query in queries
+        ]
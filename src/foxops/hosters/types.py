@@ -1,11 +1,11 @@
 from datetime import timedelta
 from enum import Enum
-from typing import AsyncContextManager, Protocol, TypedDict
+from typing import AsyncContextManager, NamedTuple, Protocol, Sequence, TypedDict
 
 from pydantic import BaseSettings
 
 from foxops.engine import IncarnationState
-from foxops.external.git import GitRepository
+from foxops.external.git import GitRepository, ResolvedRevision
 
 
 class RepositoryMetadata(TypedDict):
@@ -17,6 +17,13 @@ GitSha = str
 MergeRequestId = str
 
 
+class TreeEntry(NamedTuple):
+    #: the git file mode, e.g. `100644` for regular files, `100755` for executables and `120000` for symlinks
+    mode: str
+    #: the git object id of the blob
+    sha: GitSha
+
+
 class ReconciliationStatus(Enum):
     UNKNOWN = "unknown"
     PENDING = "pending"
@@ -31,6 +38,14 @@ class MergeRequestStatus(Enum):
     UNKNOWN = "unknown"
 
 
+class ChangeStatusQuery(NamedTuple):
+    """Identifies the commit (and merge request) of a change, whose statuses are looked up at the hoster."""
+
+    incarnation_repository: str
+    commit_sha: GitSha
+    merge_request_id: MergeRequestId | None
+
+
 class Hoster(Protocol):
     async def validate(self) -> None:
         ...
@@ -50,6 +65,26 @@ class Hoster(Protocol):
     ) -> AsyncContextManager[GitRepository]:
         ...
 
+    async def resolve_revision(self, repository: str, revision: str) -> ResolvedRevision | None:
+        """Resolves a revision (branch, tag or commit SHA) of the given repository to a commit SHA without cloning it.
+
+        Besides the commit SHA, the kind of the revision is returned, which tells whether it may move over time.
+
+        Returns `None` if the revision cannot be resolved that way.
+        """
+        ...
+
+    async def get_repository_tree(self, repository: str, revision: str, path: str) -> dict[str, TreeEntry]:
+        """Lists all files below `path` at the given revision of the repository, without cloning it.
+
+        The returned paths are relative to `path`.
+        """
+        ...
+
+    async def get_blob(self, repository: str, sha: GitSha) -> bytes:
+        """Returns the content of a blob (as listed by `get_repository_tree`) of the given repository."""
+        ...
+
     async def has_pending_incarnation_branch(self, project_identifier: str, branch: str) -> GitSha | None:
         ...
 
@@ -83,6 +118,16 @@ class Hoster(Protocol):
     async def get_merge_request_status(self, incarnation_repository: str, merge_request_id: str) -> MergeRequestStatus:
         ...
 
+    async def get_change_statuses(
+        self, queries: Sequence[ChangeStatusQuery]
+    ) -> list[tuple[ReconciliationStatus, MergeRequestStatus | None]]:
+        """Looks up the reconciliation status and the merge request status of many changes at once.
+
+        The statuses are returned in the order of the queries, the merge request status is `None`
+        for changes without merge request. Unlike `get_reconciliation_status`, pending pipelines aren't waited for.
+        """
+        ...
+
 
 class HosterSettings(BaseSettings):
     pass
@@ -5,6 +5,7 @@ from typing import Awaitable, Callable
 from fastapi import Request, Response
 from structlog.contextvars import bind_contextvars, clear_contextvars
 
+from foxops.database.unit_of_work import read_your_writes
 from foxops.logger import get_logger
 
 Middleware = Callable[[Request], Awaitable[Response]]
@@ -31,3 +32,12 @@ async def request_time_middleware(request: Request, call_next: Middleware) -> Re
     duration = time.time() - start
     response.headers["X-Request-Time"] = str(duration)
     return response
+
+
+async def read_your_writes_middleware(request: Request, call_next: Middleware) -> Response:
+    """FastAPI Middleware to let the read-only queries of a request go to the database read replica.
+
+    Once the request used the primary database, its reads go to the primary as well.
+    """
+    with read_your_writes():
+        return await call_next(request)
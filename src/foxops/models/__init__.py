@@ -7,5 +7,6 @@ from foxops.models.helpers import incarnation_identifier  # noqa
 from foxops.models.incarnation import (  # noqa
     Incarnation,
     IncarnationBasic,
+    IncarnationDrift,
     IncarnationWithDetails,
 )
@@ -25,3 +25,18 @@ class ChangeWithMergeRequest(Change):
     merge_request_branch_name: str
 
     merge_request_status: MergeRequestStatus
+
+
+class ChangePreview(BaseModel):
+    incarnation_id: int
+
+    requested_version: str
+    requested_version_hash: str
+    requested_data: TemplateData
+
+    #: the unified diff of all changes that the change would commit to the incarnation repository
+    patch: str
+    #: files that would contain conflicts, relative to the incarnation repository root
+    conflicts: list[str]
+    #: files that were changed in the template, but are deleted in the incarnation repository
+    deleted: list[str]
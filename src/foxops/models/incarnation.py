@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Mapping
 
 from pydantic import BaseModel, Field
@@ -47,3 +48,27 @@ class IncarnationWithDetails(IncarnationBasic):
 
     class Config:
         orm_mode = True
+
+
+class IncarnationDrift(BaseModel):
+    """The result of comparing an incarnation against the pristine rendering of its template."""
+
+    incarnation_id: int
+
+    #: the commit of the incarnation repository that was scanned
+    incarnation_commit_sha: str
+    #: the template version the incarnation was compared against
+    template_repository_version_hash: str
+
+    drifted: bool
+    #: files that don't exist in the pristine rendering, relative to the target directory of the incarnation
+    added_files: list[str]
+    #: files that differ from the pristine rendering (in content or mode)
+    modified_files: list[str]
+    #: files of the pristine rendering that were deleted from the incarnation
+    removed_files: list[str]
+
+    scanned_at: datetime
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,69 @@
+import hashlib
+from typing import Any
+
+import orjson
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONResponse(JSONResponse):
+    """Renders the content with orjson, which also serializes pydantic models (and everything they contain).
+
+    Endpoints which return large payloads should return this response themselves: FastAPI then skips
+    `jsonable_encoder()`, which walks and copies the whole content before it is rendered.
+    Datetimes, enums and dataclasses are serialized natively, the same way `jsonable_encoder()` would.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def conditional_response(request: Request, content: Any, etag: str | None = None) -> Response:
+    """Renders the content with a strong ETag and answers `If-None-Match` requests.
+
+    The ETag is the hash of the rendered content, unless one is given.
+    If the client already has the current content, a `304 Not Modified` response without body is returned.
+    Clients must revalidate on every use, because the content doesn't carry any information on how long it is valid.
+    """
+    if etag is not None and (response := not_modified_response(request, etag)) is not None:
+        return response
+
+    response = ORJSONResponse(content)
+    if etag is None:
+        etag = f'"{hashlib.sha256(response.body).hexdigest()}"'
+        if (not_modified := not_modified_response(request, etag)) is not None:
+            return not_modified
+
+    response.headers.update(_cache_headers(etag))
+    return response
+
+
+def not_modified_response(request: Request, etag: str) -> Response | None:
+    """Returns a `304 Not Modified` response if the client already has the content with the given ETag.
+
+    Endpoints can check this before they look up the content, if they know its ETag up front.
+    """
+    if_none_match = _if_none_match(request)
+    if etag in if_none_match or "*" in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cache_headers(etag))
+
+    return None
+
+
+def _cache_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _if_none_match(request: Request) -> set[str]:
+    if (header := request.headers.get("If-None-Match")) is None:
+        return set()
+
+    # the comparison is weak (see RFC 9110), the ETags of foxops are all strong though
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
@@ -1,19 +1,36 @@
-from fastapi import APIRouter, Depends, Response, status
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from foxops.database.repositories.change import ChangeType
+from foxops.database.repositories.drift import IncarnationDriftNotFoundError
 from foxops.database.repositories.incarnation.errors import IncarnationNotFoundError
-from foxops.dependencies import get_change_service, get_hoster, get_incarnation_service
+from foxops.dependencies import (
+    get_change_service,
+    get_drift_service,
+    get_event_bus,
+    get_hoster,
+    get_incarnation_service,
+    get_status_refresher,
+)
 from foxops.engine import TemplateData
-from foxops.errors import IncarnationNotFoundError as IncarnationNotFoundLegacyError
+from foxops.external.git import RevisionNotFoundError
 from foxops.hosters import Hoster
 from foxops.logger import bind, get_logger
 from foxops.models import (
     DesiredIncarnationState,
     DesiredIncarnationStatePatch,
     IncarnationBasic,
+    IncarnationDrift,
     IncarnationWithDetails,
 )
+from foxops.models.change import ChangePreview
 from foxops.models.errors import ApiError
+from foxops.responses import conditional_response, not_modified_response
 from foxops.routers import changes
 from foxops.services.change import (
     ChangeRejectedDueToNoChanges,
@@ -21,6 +38,8 @@ from foxops.services.change import (
     ChangeService,
     IncarnationAlreadyExists,
 )
+from foxops.services.drift import DriftService
+from foxops.services.events import EventBus, StatusRefresher
 from foxops.services.incarnation import IncarnationService
 
 #: Holds the router for the incarnations API endpoints
@@ -30,6 +49,9 @@ router.include_router(changes.router, prefix="/{incarnation_id}/changes", tags=[
 #: Holds the logger for these routes
 logger = get_logger(__name__)
 
+#: Holds the number of seconds after which an idle event stream sends a keepalive comment
+EVENT_STREAM_KEEPALIVE_SECONDS = 15
+
 
 @router.get(
     "",
@@ -38,6 +60,9 @@ logger = get_logger(__name__)
             "description": "The list of incarnations in the inventory",
             "model": list[IncarnationBasic],
         },
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "The list didn't change since the response with the `ETag` given in `If-None-Match`",
+        },
         status.HTTP_400_BAD_REQUEST: {
             "description": "The `incarnation_repository` and `target_directory` settings where inconsistent",
             "model": ApiError,
@@ -49,28 +74,56 @@ logger = get_logger(__name__)
     },
 )
 async def list_incarnations(
+    request: Request,
     response: Response,
     incarnation_repository: str | None = None,
     target_directory: str = ".",
+    template_repository: str | None = None,
+    requested_version: str | None = None,
+    requested_version_prefix: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+    change_type: ChangeType | None = None,
+    has_merge_request: bool | None = None,
+    with_status: bool = False,
     change_service: ChangeService = Depends(get_change_service),
 ):
     """Returns a list of all known incarnations.
 
     The list is sorted by incarnartion ID, with the oldest incarnation first.
 
+    The list can be filtered by the template repository and by the latest change of the incarnations:
+    its requested template version (exactly or by prefix), its creation time (`created_after` is inclusive,
+    `created_before` exclusive), its type and whether a merge request was created for it.
+
+    If an `incarnation_repository` is given, the incarnation in it (at `target_directory`) is looked up.
+
+    With `with_status`, the (merge request) statuses of the latest changes are included - they are looked up
+    at the hoster in batches, without waiting for pending pipelines.
+
+    The response carries an `ETag`, see `GET /api/incarnations/{incarnation_id}`.
+
     TODO: implement pagination
     """
-    if incarnation_repository is None:
-        return await change_service.list_incarnations()
-
-    try:
-        return [
-            await change_service.get_incarnation_by_repo_and_target_directory(incarnation_repository, target_directory)
-        ]
-    except IncarnationNotFoundLegacyError:
+    incarnations = await change_service.list_incarnations(
+        incarnation_repository=incarnation_repository,
+        target_directory=target_directory if incarnation_repository is not None else None,
+        template_repository=template_repository,
+        requested_version=requested_version,
+        requested_version_prefix=requested_version_prefix,
+        created_after=created_after,
+        created_before=created_before,
+        change_type=change_type,
+        has_merge_request=has_merge_request,
+        with_status=with_status,
+    )
+    if incarnation_repository is not None and not incarnations:
         response.status_code = status.HTTP_404_NOT_FOUND
         return ApiError(message="No incarnation found for the given repository and target directory")
 
+    # the inventory can be large, it's rendered right away instead of going through FastAPI's encoder first
+    return conditional_response(request, incarnations)
+
 
 @router.post(
     "",
@@ -129,6 +182,64 @@ async def create_incarnation(
     return await change_service.get_incarnation_with_details(change.incarnation_id)
 
 
+@router.get(
+    "/search",
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The list of incarnations matching the search",
+            "model": list[IncarnationBasic],
+        },
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "The list didn't change since the response with the `ETag` given in `If-None-Match`",
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "A `template_data` parameter was not given as `key=value`",
+            "model": ApiError,
+        },
+    },
+)
+async def search_incarnations(
+    request: Request,
+    response: Response,
+    template_data: list[str] = Query(default=[]),
+    change_service: ChangeService = Depends(get_change_service),
+):
+    """Returns the incarnations whose latest change requested the given template data.
+
+    Every `template_data` parameter has the form `key=value`. If multiple parameters are given,
+    an incarnation must match all of them. Values are compared as strings.
+    """
+    requested_data = {}
+    for parameter in template_data:
+        key, separator, value = parameter.partition("=")
+        if not key or not separator:
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return ApiError(message=f"Invalid template data parameter, expected `key=value`: {parameter}")
+        requested_data[key] = value
+
+    return conditional_response(request, await change_service.list_incarnations(template_data=requested_data))
+
+
+@router.get(
+    "/drift",
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The results of the last drift scans of all incarnations",
+            "model": list[IncarnationDrift],
+        },
+    },
+)
+async def list_incarnation_drift(
+    drifted: bool | None = None,
+    drift_service: DriftService = Depends(get_drift_service),
+):
+    """Returns the results of the last drift scans, optionally filtered by whether the incarnations drifted.
+
+    Incarnations which were not scanned yet are not included.
+    """
+    return await drift_service.list_drift(drifted=drifted)
+
+
 @router.get(
     "/{incarnation_id}",
     responses={
@@ -136,6 +247,9 @@ async def create_incarnation(
             "description": "The actual state of the incarnation from the inventory",
             "model": IncarnationWithDetails,
         },
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "The incarnation didn't change since the response with the `ETag` given in `If-None-Match`",
+        },
         status.HTTP_404_NOT_FOUND: {
             "description": "The incarnation was not found in the inventory",
             "model": ApiError,
@@ -143,16 +257,181 @@ async def create_incarnation(
     },
 )
 async def read_incarnation(
+    request: Request,
+    response: Response,
+    incarnation_id: int,
+    change_service: ChangeService = Depends(get_change_service),
+):
+    """Returns the details of the incarnation from the inventory.
+
+    The response carries an `ETag`. If it is sent back in the `If-None-Match` header,
+    a `304 Not Modified` response without body is returned as long as the details didn't change.
+    The statuses of the incarnation at the hoster are cached for a few seconds, to serve polling clients cheaply -
+    while they are cached, the ETag is checked without asking the hoster.
+    """
+    try:
+        details, etag = await change_service.get_incarnation_with_details_and_etag(
+            incarnation_id, is_known_etag=lambda etag: not_modified_response(request, etag) is not None
+        )
+    except IncarnationNotFoundError as exc:
+        response.status_code = status.HTTP_404_NOT_FOUND
+        return ApiError(message=str(exc))
+
+    # without details, the client has the current ones already - which results in a `304 Not Modified` response
+    return conditional_response(request, details, etag=etag)
+
+
+@router.get(
+    "/{incarnation_id}/preview",
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The preview of the changes that updating the incarnation would result in",
+            "model": ChangePreview,
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "The given version doesn't exist in the template repository",
+            "model": ApiError,
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "The incarnation was not found in the inventory",
+            "model": ApiError,
+        },
+    },
+)
+async def preview_incarnation_update(
     response: Response,
     incarnation_id: int,
+    version: str | None = None,
     change_service: ChangeService = Depends(get_change_service),
 ):
-    """Returns the details of the incarnation from the inventory."""
+    """Previews the update of the incarnation to the given template version, without pushing anything.
+
+    Returns the patch that would be committed, including the files that would have conflicts.
+    If no `version` is given, the version of the latest change is used (which is useful for moving revisions).
+    """
     try:
-        return await change_service.get_incarnation_with_details(incarnation_id)
+        return await change_service.preview_change(incarnation_id, requested_version=version)
     except IncarnationNotFoundError as exc:
         response.status_code = status.HTTP_404_NOT_FOUND
         return ApiError(message=str(exc))
+    except RevisionNotFoundError as exc:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return ApiError(message=str(exc))
+
+
+@router.get(
+    "/{incarnation_id}/drift",
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The result of the last drift scan of the incarnation",
+            "model": IncarnationDrift,
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "The incarnation was not scanned for drift yet",
+            "model": ApiError,
+        },
+    },
+)
+async def read_incarnation_drift(
+    response: Response,
+    incarnation_id: int,
+    drift_service: DriftService = Depends(get_drift_service),
+):
+    """Returns which files of the incarnation differ from the pristine rendering of its template."""
+    try:
+        return await drift_service.get(incarnation_id)
+    except IncarnationDriftNotFoundError as exc:
+        response.status_code = status.HTTP_404_NOT_FOUND
+        return ApiError(message=str(exc))
+
+
+@router.post(
+    "/{incarnation_id}/drift",
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The incarnation was scanned for drift",
+            "model": IncarnationDrift,
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "The incarnation was not found in the inventory",
+            "model": ApiError,
+        },
+    },
+)
+async def scan_incarnation_drift(
+    response: Response,
+    incarnation_id: int,
+    drift_service: DriftService = Depends(get_drift_service),
+):
+    """Scans the incarnation for drift right away, instead of waiting for the next background scan."""
+    try:
+        drift = await drift_service.scan(incarnation_id, incremental=False)
+    except IncarnationNotFoundError as exc:
+        response.status_code = status.HTTP_404_NOT_FOUND
+        return ApiError(message=str(exc))
+
+    if drift is None:
+        response.status_code = status.HTTP_404_NOT_FOUND
+        return ApiError(message="The incarnation was not found in its repository")
+    return drift
+
+
+@router.get(
+    "/{incarnation_id}/events",
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The stream of the events of the incarnation, as server-sent events",
+            "content": {"text/event-stream": {}},
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "The incarnation was not found in the inventory",
+            "model": ApiError,
+        },
+    },
+)
+async def stream_incarnation_events(
+    response: Response,
+    incarnation_id: int,
+    incarnation_service: IncarnationService = Depends(get_incarnation_service),
+    change_service: ChangeService = Depends(get_change_service),
+    event_bus: EventBus = Depends(get_event_bus),
+    status_refresher: StatusRefresher = Depends(get_status_refresher),
+):
+    """Streams the events of the changes of the incarnation, as server-sent events.
+
+    The `event` field of every event is its type, the `data` field the event as JSON.
+    While the stream is open, the statuses of the latest change (of its merge request and pipelines) are looked up
+    every few seconds, and sent whenever they change - and right after connecting.
+    Clients which would poll `GET /api/incarnations/{incarnation_id}` for status changes should use this instead.
+    """
+    try:
+        await incarnation_service.get_by_id(incarnation_id)
+    except IncarnationNotFoundError as exc:
+        response.status_code = status.HTTP_404_NOT_FOUND
+        return ApiError(message=str(exc))
+
+    return StreamingResponse(
+        _server_sent_events(incarnation_id, change_service, event_bus, status_refresher),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+async def _server_sent_events(
+    incarnation_id: int, change_service: ChangeService, event_bus: EventBus, status_refresher: StatusRefresher
+) -> AsyncIterator[str]:
+    # subscribe first, so that the statuses of the first lookup aren't missed
+    with event_bus.subscribe(incarnation_id) as events:
+        async with status_refresher.watching(incarnation_id, change_service, events):
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout=EVENT_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # comments keep proxies from closing idle connections
+                    yield ": keepalive\n\n"
+                    continue
+
+                yield f"event: {event.type.value}\ndata: {event.json()}\n\n"
 
 
 class IncarnationResetRequest(BaseModel):
@@ -0,0 +1,50 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from foxops.utils import FairScheduler, SubprocessKind, get_subprocess_scheduler
+
+#: Holds the router for the metrics endpoint
+router = APIRouter(tags=["metrics"])
+
+#: Holds the exported metrics of the subprocess schedulers, as name, type, help text and value
+_SCHEDULER_METRICS: list[tuple[str, str, str, str]] = [
+    (
+        "foxops_subprocess_slot_acquisitions_total",
+        "counter",
+        "The number of subprocesses that got a slot to run in.",
+        "acquisitions",
+    ),
+    (
+        "foxops_subprocess_slot_wait_seconds_total",
+        "counter",
+        "The total time subprocesses waited for a slot to run in.",
+        "total_wait_seconds",
+    ),
+    (
+        "foxops_subprocess_slot_wait_seconds_max",
+        "gauge",
+        "The longest time a subprocess waited for a slot to run in.",
+        "max_wait_seconds",
+    ),
+    ("foxops_subprocess_running", "gauge", "The number of subprocesses which are running.", "running"),
+    ("foxops_subprocess_queued", "gauge", "The number of subprocesses which wait for a slot.", "queued"),
+]
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Retrieve the metrics of this instance, in the Prometheus text format.
+
+    They cover the limits of concurrently running subprocesses (see `SubprocessSettings`), per kind of subprocess.
+    """
+    # the schedulers are bound to the event loop, which is why this endpoint must be async
+    schedulers: dict[SubprocessKind, FairScheduler] = {kind: get_subprocess_scheduler(kind) for kind in SubprocessKind}
+
+    lines = []
+    for name, type_, help_text, attribute in _SCHEDULER_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {type_}")
+        for kind, scheduler in schedulers.items():
+            lines.append(f'{name}{{kind="{kind.value}"}} {getattr(scheduler, attribute)}')
+
+    return "\n".join(lines) + "\n"
@@ -3,32 +3,51 @@ import hashlib
 import inspect
 import json
 import shutil
+import typing
 import uuid
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import AsyncIterator
+from typing import AsyncIterator, Callable, Mapping
 
 from pydantic import BaseModel
 
 import foxops.engine as fengine
 from foxops.database.repositories.change import (
+    ChangeInDB,
     ChangeRepository,
     ChangeType,
+    ChangeWithIncarnationInDB,
     IncarnationWithChangesSummary,
 )
 from foxops.database.repositories.incarnation.repository import IncarnationRepository
+from foxops.database.unit_of_work import unit_of_work
 from foxops.engine import TemplateData
 from foxops.engine.patching.git_diff_patch import PatchResult
 from foxops.errors import RetryableError
 from foxops.external.git import GitError, GitRepository
 from foxops.hosters import Hoster
-from foxops.hosters.types import MergeRequestStatus
+from foxops.hosters.types import (
+    ChangeStatusQuery,
+    MergeRequestStatus,
+    ReconciliationStatus,
+)
 from foxops.models import IncarnationWithDetails
-from foxops.models.change import Change, ChangeWithMergeRequest
+from foxops.models.change import Change, ChangePreview, ChangeWithMergeRequest
+from foxops.services.events import ChangeEvent, ChangeEventType, EventBus
+from foxops.services.preview import ChangePreviewCache, ChangePreviewKey
+from foxops.services.revision import RevisionResolver
+from foxops.services.status import ChangeStatus, ChangeStatusCache, ChangeStatusKey
 from foxops.utils import get_logger
 
+#: Holds the time without progress after which an incomplete change is assumed to be interrupted (instead of still
+#: in progress). It exceeds the time the hoster may take to automerge a new merge request.
+INCOMPLETE_CHANGE_GRACE_PERIOD = timedelta(minutes=10)
+
+#: Holds the number of incomplete changes that are updated concurrently
+INCOMPLETE_CHANGES_BATCH_SIZE = 16
+
 
 class IncarnationAlreadyExists(Exception):
     pass
@@ -69,6 +88,10 @@ class IncarnationWithLatestChangeDetails(BaseModel):
     merge_request_id: str | None
     merge_request_url: str | None
 
+    #: the statuses are only looked up at the hoster if they were requested
+    status: ReconciliationStatus | None = None
+    merge_request_status: MergeRequestStatus | None = None
+
 
 class ChangeFailed(Exception):
     pass
@@ -78,6 +101,10 @@ class IncompleteChange(Exception):
     pass
 
 
+class ChangeInProgress(Exception):
+    pass
+
+
 @dataclass
 class _PreparedChangeEnvironment:
     """
@@ -101,9 +128,20 @@ class _PreparedChangeEnvironment:
 
 class ChangeService:
     def __init__(
-        self, hoster: Hoster, incarnation_repository: IncarnationRepository, change_repository: ChangeRepository
+        self,
+        hoster: Hoster,
+        incarnation_repository: IncarnationRepository,
+        change_repository: ChangeRepository,
+        revision_resolver: RevisionResolver | None = None,
+        preview_cache: ChangePreviewCache | None = None,
+        status_cache: ChangeStatusCache | None = None,
+        event_bus: EventBus | None = None,
     ):
         self._hoster = hoster
+        self._revision_resolver = revision_resolver or RevisionResolver()
+        self._preview_cache = preview_cache or ChangePreviewCache()
+        self._status_cache = status_cache or ChangeStatusCache()
+        self._event_bus = event_bus or EventBus()
 
         self._incarnation_repository = incarnation_repository
         self._change_repository = change_repository
@@ -111,7 +149,7 @@ class ChangeService:
         self._log = get_logger("change_service")
 
     async def _incarnation_with_latest_change_details_from_dbobj(
-        self, dbobj: IncarnationWithChangesSummary
+        self, dbobj: IncarnationWithChangesSummary, change_status: ChangeStatus | None = None
     ) -> IncarnationWithLatestChangeDetails:
         merge_request_url = None
         if dbobj.merge_request_id is not None:
@@ -119,7 +157,8 @@ class ChangeService:
                 dbobj.incarnation_repository, dbobj.merge_request_id
             )
 
-        return IncarnationWithLatestChangeDetails(
+        # all values were validated already, when the summary was loaded from the database
+        return IncarnationWithLatestChangeDetails.construct(
             id=dbobj.id,
             incarnation_repository=dbobj.incarnation_repository,
             target_directory=dbobj.target_directory,
@@ -132,20 +171,86 @@ class ChangeService:
             commit_url=await self._hoster.get_commit_url(dbobj.incarnation_repository, dbobj.commit_sha),
             merge_request_id=dbobj.merge_request_id,
             merge_request_url=merge_request_url,
+            status=None if change_status is None else change_status.status,
+            merge_request_status=None if change_status is None else change_status.merge_request_status,
         )
 
-    async def list_incarnations(self) -> list[IncarnationWithLatestChangeDetails]:
+    async def list_incarnations(
+        self,
+        *,
+        with_status: bool = False,
+        incarnation_repository: str | None = None,
+        target_directory: str | None = None,
+        template_repository: str | None = None,
+        requested_version: str | None = None,
+        requested_version_prefix: str | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        change_type: ChangeType | None = None,
+        has_merge_request: bool | None = None,
+        template_data: Mapping[str, str] | None = None,
+    ) -> list[IncarnationWithLatestChangeDetails]:
+        """Lists all incarnations matching the given filters.
+
+        See `ChangeRepository.list_incarnations_with_changes_summary()` for how the filters apply.
+        If `with_status` is set, the statuses of the latest changes are looked up as well (in batches).
+        """
+        summaries = [
+            inc
+            async for inc in self._change_repository.list_incarnations_with_changes_summary(
+                incarnation_repository=incarnation_repository,
+                target_directory=target_directory,
+                template_repository=template_repository,
+                requested_version=requested_version,
+                requested_version_prefix=requested_version_prefix,
+                created_after=created_after,
+                created_before=created_before,
+                change_type=change_type,
+                has_merge_request=has_merge_request,
+                template_data=template_data,
+            )
+        ]
+
+        change_statuses: list[ChangeStatus | None] = [None] * len(summaries)
+        if with_status:
+            change_statuses = list(
+                await self._get_change_statuses(
+                    [
+                        (
+                            inc.incarnation_repository,
+                            ChangeStatusKey(inc.change_id, inc.commit_sha, inc.merge_request_id),
+                        )
+                        for inc in summaries
+                    ]
+                )
+            )
+
         return [
-            await self._incarnation_with_latest_change_details_from_dbobj(inc)
-            async for inc in self._change_repository.list_incarnations_with_changes_summary()
+            await self._incarnation_with_latest_change_details_from_dbobj(inc, change_status)
+            for inc, change_status in zip(summaries, change_statuses)
         ]
 
-    async def get_incarnation_by_repo_and_target_directory(
-        self, repo: str, target_directory: str
-    ) -> IncarnationWithLatestChangeDetails:
-        return await self._incarnation_with_latest_change_details_from_dbobj(
-            await self._change_repository.get_incarnation_by_repo_and_target_dir(repo, target_directory)
-        )
+    async def _get_change_statuses(self, changes: list[tuple[str, ChangeStatusKey]]) -> list[ChangeStatus]:
+        """Returns the statuses of the given changes (by incarnation repository and status key).
+
+        All statuses which aren't cached are looked up at the hoster at once.
+        """
+        change_statuses = [self._status_cache.get(status_key) for _, status_key in changes]
+        missing = [i for i, change_status in enumerate(change_statuses) if change_status is None]
+        if missing:
+            looked_up = await self._hoster.get_change_statuses(
+                [
+                    ChangeStatusQuery(changes[i][0], changes[i][1].commit_sha, changes[i][1].merge_request_id)
+                    for i in missing
+                ]
+            )
+            for i, (status, merge_request_status) in zip(missing, looked_up):
+                change_status = ChangeStatus(status=status, merge_request_status=merge_request_status)
+                self._status_cache.put(changes[i][1], change_status)
+                change_statuses[i] = change_status
+
+        # all statuses are known by now
+        return typing.cast(list[ChangeStatus], change_statuses)
 
     async def create_incarnation(
         self,
@@ -158,8 +263,9 @@ class ChangeService:
         if await self._hoster.get_incarnation_state(incarnation_repository, target_directory) is not None:
             raise IncarnationAlreadyExists("Cannot create incarnation because it already exists")
 
+        template_refspec = await self._pinned_template_refspec(template_repository, template_repository_version)
         async with (
-            self._hoster.cloned_repository(template_repository, refspec=template_repository_version) as template_git,
+            self._hoster.cloned_repository(template_repository, refspec=template_refspec) as template_git,
             self._hoster.cloned_repository(incarnation_repository) as incarnation_git,
         ):
             incarnation_state = await fengine.initialize_incarnation(
@@ -183,16 +289,16 @@ class ChangeService:
                 commit_sha=commit_sha,
                 requested_version_hash=incarnation_state.template_repository_version_hash,
                 requested_version=template_repository_version,
-                requested_data=json.dumps(template_data),
+                requested_data=template_data,
             )
 
             try:
-                await self._push_change_commit_and_update_database(incarnation_git, change.id)
+                change = await self._push_change_commit_and_update_database(incarnation_git, change.id)
             except ChangeFailed:
                 await self._change_repository.delete_incarnation(change.incarnation_id)
                 raise
 
-        return await self.get_change(change.id)
+        return self._change_from_db(change)
 
     async def reset_incarnation(
         self, incarnation_id: int, override_version: str | None = None, override_data: TemplateData | None = None
@@ -207,8 +313,7 @@ class ChangeService:
         Returns the merge request ID that was created.
         """
 
-        incarnation = await self._incarnation_repository.get_by_id(incarnation_id)
-        last_change = await self.get_latest_change_for_incarnation_if_completed(incarnation_id)
+        incarnation, last_change = await self._get_latest_change_with_incarnation_if_completed(incarnation_id)
         if incarnation.template_repository is None:
             raise ValueError("template_repository is None. That should not happen.")
 
@@ -221,10 +326,12 @@ class ChangeService:
         if override_data is not None:
             to_data.update(override_data)
 
+        template_refspec = await self._pinned_template_refspec(incarnation.template_repository, to_version)
         async with (
-            self._hoster.cloned_repository(incarnation.template_repository, refspec=to_version) as template_git,
+            self._hoster.cloned_repository(incarnation.template_repository, refspec=template_refspec) as template_git,
             self._hoster.cloned_repository(incarnation.incarnation_repository) as incarnation_git,
         ):
+            self._publish(incarnation_id, ChangeEventType.CLONED)
             await incarnation_git.create_and_checkout_branch(reset_branch_name)
             delete_all_files_in_local_git_repository(incarnation_git.directory / incarnation.target_directory)
 
@@ -235,6 +342,7 @@ class ChangeService:
                 template_data=to_data,
                 incarnation_root_dir=incarnation_git.directory / incarnation.target_directory,
             )
+            self._publish(incarnation_id, ChangeEventType.RENDERED)
 
             if not await incarnation_git.has_uncommitted_changes():
                 raise ChangeRejectedDueToNoChanges("No changes were made to the incarnation. Nothing to reset.")
@@ -242,6 +350,12 @@ class ChangeService:
             await incarnation_git.commit_all(f"foxops: resetting incarnation to version {to_version}")
             commit_sha = await incarnation_git.head()
 
+            title = f"↩️ - RESET: To version {to_version}"
+            description = (
+                "This MR helps to bring back the incarnation to a 'pristine' state, as if it was "
+                "just created. Feel free to edit the branch to remove the changes and customizations "
+                "which you want to keep before merging!"
+            )
             change_in_db = await self._change_repository.create_change(
                 incarnation_id=incarnation_id,
                 revision=last_change.revision + 1,
@@ -250,18 +364,15 @@ class ChangeService:
                 commit_pushed=False,
                 requested_version_hash=incarnation_state.template_repository_version_hash,
                 requested_version=incarnation_state.template_repository_version,
-                requested_data=json.dumps(incarnation_state.template_data),
+                requested_data=incarnation_state.template_data,
                 merge_request_branch_name=reset_branch_name,
+                merge_request_title=title,
+                merge_request_description=description,
+                merge_request_automerge=False,
             )
 
             await self._push_change_commit_and_update_database(incarnation_git, change_in_db.id)
 
-        title = f"↩️ - RESET: To version {to_version}"
-        description = (
-            "This MR helps to bring back the incarnation to a 'pristine' state, as if it was "
-            "just created. Feel free to edit the branch to remove the changes and customizations "
-            "which you want to keep before merging!"
-        )
         _, merge_request_id = await self._hoster.merge_request(
             incarnation_repository=incarnation.incarnation_repository,
             source_branch=reset_branch_name,
@@ -270,9 +381,18 @@ class ChangeService:
             with_automerge=False,
         )
 
-        await self._change_repository.update_merge_request_id(change_in_db.id, merge_request_id)
+        # the updated change is read in the same transaction
+        async with unit_of_work(self._change_repository.engine):
+            await self._change_repository.update_merge_request_id(change_in_db.id, merge_request_id)
+            change_with_incarnation = await self._change_repository.get_change_with_incarnation(change_in_db.id)
+        self._publish(
+            incarnation_id,
+            ChangeEventType.MERGE_REQUEST_CREATED,
+            change_id=change_in_db.id,
+            merge_request_id=merge_request_id,
+        )
 
-        return await self.get_change_with_merge_request(change_in_db.id)
+        return await self._change_with_merge_request_from_db(change_with_incarnation)
 
     async def create_change_direct(
         self, incarnation_id: int, requested_version: str | None = None, requested_data: TemplateData | None = None
@@ -306,14 +426,16 @@ class ChangeService:
                 commit_pushed=False,
                 requested_version_hash=env.to_version_hash,
                 requested_version=env.to_version,
-                requested_data=json.dumps(env.to_data),
+                requested_data=env.to_data,
             )
 
             # if some failure happens after this point, the database object can be cleaned
             # by the update_incomplete_change() method.
-            await self._push_change_commit_and_update_database(env.incarnation_repository, change_in_db.id)
+            change_in_db = await self._push_change_commit_and_update_database(
+                env.incarnation_repository, change_in_db.id
+            )
 
-        return await self.get_change(change_in_db.id)
+        return self._change_from_db(change_in_db)
 
     async def create_change_merge_request(
         self,
@@ -332,6 +454,17 @@ class ChangeService:
         # https://youtrack.jetbrains.com/issue/PY-36444
         env: _PreparedChangeEnvironment
         async with self._prepared_change_environment(incarnation_id, requested_version, requested_data) as env:
+            if env.patch_result.has_errors():
+                title = f"🚧 - CONFLICT: Update to {env.to_version}"
+                description = _construct_merge_request_conflict_description(
+                    conflict_files=env.patch_result.conflicts,
+                    deleted_files=env.patch_result.deleted,
+                )
+                automerge = False
+            else:
+                title = f"Update to {env.to_version}"
+                description = "Foxops detected no conflicts when applying this change."
+
             change_in_db = await self._change_repository.create_change(
                 incarnation_id=incarnation_id,
                 revision=env.expected_revision,
@@ -340,23 +473,15 @@ class ChangeService:
                 commit_pushed=False,
                 requested_version_hash=env.to_version_hash,
                 requested_version=env.to_version,
-                requested_data=json.dumps(env.to_data),
+                requested_data=env.to_data,
                 merge_request_branch_name=env.branch_name,
+                merge_request_title=title,
+                merge_request_description=description,
+                merge_request_automerge=automerge,
             )
 
             await self._push_change_commit_and_update_database(env.incarnation_repository, change_in_db.id)
 
-        if env.patch_result.has_errors():
-            title = f"🚧 - CONFLICT: Update to {env.to_version}"
-            description = _construct_merge_request_conflict_description(
-                conflict_files=env.patch_result.conflicts,
-                deleted_files=env.patch_result.deleted,
-            )
-            automerge = False
-        else:
-            title = f"Update to {env.to_version}"
-            description = "Foxops detected no conflicts when applying this change."
-
         _, merge_request_id = await self._hoster.merge_request(
             incarnation_repository=env.incarnation_repository_identifier,
             source_branch=env.branch_name,
@@ -365,35 +490,176 @@ class ChangeService:
             with_automerge=automerge,
         )
 
-        await self._change_repository.update_merge_request_id(change_in_db.id, merge_request_id)
+        # the updated change is read in the same transaction
+        async with unit_of_work(self._change_repository.engine):
+            await self._change_repository.update_merge_request_id(change_in_db.id, merge_request_id)
+            change_with_incarnation = await self._change_repository.get_change_with_incarnation(change_in_db.id)
+        self._publish(
+            incarnation_id,
+            ChangeEventType.MERGE_REQUEST_CREATED,
+            change_id=change_in_db.id,
+            merge_request_id=merge_request_id,
+        )
+
+        return await self._change_with_merge_request_from_db(change_with_incarnation)
+
+    async def preview_change(
+        self, incarnation_id: int, requested_version: str | None = None, requested_data: TemplateData | None = None
+    ) -> ChangePreview:
+        """
+        Previews the change that updating the given incarnation would result in - without pushing anything.
+
+        The previews are cached as long as neither the incarnation repository nor the template version move.
+        """
+        last_change = await self._change_repository.get_latest_change_with_incarnation(incarnation_id)
+
+        to_version = last_change.requested_version if requested_version is None else requested_version
+        to_data = dict(last_change.requested_data)
+        if requested_data is not None:
+            to_data.update(requested_data)
+
+        incarnation_head = await self._hoster.resolve_revision(last_change.incarnation_repository, "HEAD")
+        to_version_hash = await self._revision_resolver.resolve(
+            self._hoster, last_change.template_repository, to_version
+        )
+
+        key = None
+        if incarnation_head is not None and to_version_hash is not None:
+            requested_hash = hashlib.sha256(
+                json.dumps([last_change.target_directory, to_version, to_data], sort_keys=True).encode()
+            ).hexdigest()
+            key = ChangePreviewKey(incarnation_head.sha, to_version_hash, requested_hash)
+            if (preview := self._preview_cache.get(key)) is not None:
+                self._log.debug("found change preview in cache", incarnation_id=incarnation_id, key=key)
+                return preview
 
-        return await self.get_change_with_merge_request(change_in_db.id)
+        async with (
+            self._hoster.cloned_repository(last_change.incarnation_repository) as local_incarnation_repository,
+            self._hoster.cloned_repository(last_change.template_repository, bare=True) as local_template_repository,
+        ):
+            base_commit_sha = await local_incarnation_repository.head()
+            # the HEAD of the template clone is its default branch, not necessarily the requested version
+            if to_version_hash is None:
+                to_version_hash = await local_template_repository.resolve_commit(to_version)
+            (
+                update_performed,
+                _,
+                patch_result,
+            ) = await fengine.update_incarnation_from_git_template_repository(
+                template_git_repository=local_template_repository.directory,
+                update_template_repository_version=to_version,
+                update_template_data=to_data,
+                incarnation_root_dir=(local_incarnation_repository.directory / last_change.target_directory),
+                diff_patch_func=fengine.diff_and_patch,
+                patch_cache=fengine.get_patch_cache(),
+            )
+
+            patch = ""
+            if update_performed and await local_incarnation_repository.has_uncommitted_changes():
+                # committing (locally) is the easiest way to include new files in the diff
+                await local_incarnation_repository.commit_all("foxops: preview")
+                patch = await local_incarnation_repository.diff(base_commit_sha, "HEAD")
+
+            preview = ChangePreview(
+                incarnation_id=incarnation_id,
+                requested_version=to_version,
+                requested_version_hash=to_version_hash,
+                requested_data=to_data,
+                patch=patch,
+                conflicts=[str(p) for p in patch_result.conflicts] if patch_result else [],
+                deleted=[str(p) for p in patch_result.deleted] if patch_result else [],
+            )
+
+        if key is not None:
+            self._preview_cache.put(key, preview)
+        return preview
 
     async def update_incomplete_change(self, change_id: int) -> None:
         """
         Updates an incomplete change (commit_pushed=False) to the latest state.
 
         Either by updating the flag (if the commit exists in Git) or by deleting the change object.
-        """
+        For merge request changes, the merge request is also looked up (or created) if that didn't happen yet.
 
-        # FIXME: needs an update to also work with MR changes
+        Raises `ChangeInProgress` if the change made progress recently, because its creation might still be going on.
+        """
 
-        change = await self._change_repository.get_change(change_id)
-        if change.commit_pushed:
+        change = await self._change_repository.get_change_with_incarnation(change_id)
+        if change.commit_pushed and (change.type != ChangeType.MERGE_REQUEST or change.merge_request_id is not None):
             self._log.debug("Change is already complete (commit_pushed=True). Skipping.", change_id=change_id)
             return
 
-        # don't touch if the change is very new - the git push might still be in progress
-        if change.created_at > datetime.now(timezone.utc) - timedelta(minutes=1):
-            return
+        # don't touch if the change made progress recently - its creation might still be in progress
+        # (SQLite doesn't keep the timezone of the stored UTC timestamps)
+        updated_at = change.updated_at if change.updated_at.tzinfo else change.updated_at.replace(tzinfo=timezone.utc)
+        if updated_at > datetime.now(timezone.utc) - INCOMPLETE_CHANGE_GRACE_PERIOD:
+            raise ChangeInProgress(
+                f"change {change_id} made progress at {updated_at.isoformat()}, its creation might still be going on"
+            )
 
-        incarnation = await self._incarnation_repository.get_by_id(change.incarnation_id)
+        await self._complete_change(change)
 
-        commit_exists = await self._hoster.does_commit_exist(incarnation.incarnation_repository, change.commit_sha)
-        if commit_exists:
-            await self._change_repository.update_commit_pushed(change_id, True)
-        else:
-            await self._change_repository.delete_change(change_id)
+    async def update_incomplete_changes(self) -> int:
+        """
+        Updates all incomplete changes like `update_incomplete_change()` does, but in batches of concurrent updates.
+
+        Changes which fail to be updated are logged and retried the next time. Returns the number of updated changes.
+        """
+
+        incomplete_changes = await self._change_repository.list_incomplete_changes(
+            updated_before=datetime.now(timezone.utc) - INCOMPLETE_CHANGE_GRACE_PERIOD
+        )
+
+        updated = 0
+        for i in range(0, len(incomplete_changes), INCOMPLETE_CHANGES_BATCH_SIZE):
+            batch = incomplete_changes[i : i + INCOMPLETE_CHANGES_BATCH_SIZE]
+            results = await asyncio.gather(*[self._complete_change(c) for c in batch], return_exceptions=True)
+            for change, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    self._log.error("Failed to update incomplete change", change_id=change.id, exc_info=result)
+                else:
+                    updated += 1
+
+        return updated
+
+    async def _complete_change(self, change: ChangeWithIncarnationInDB) -> None:
+        log = self._log.bind(change_id=change.id)
+
+        if not change.commit_pushed:
+            if not await self._hoster.does_commit_exist(change.incarnation_repository, change.commit_sha):
+                log.info("Commit of incomplete change does not exist. Removing change from database.")
+                await self._change_repository.delete_change(change.id)
+                return
+
+            log.info("Commit of incomplete change exists. Marking it as pushed.")
+            await self._change_repository.update_commit_pushed(change.id, True)
+
+        if change.type == ChangeType.MERGE_REQUEST and change.merge_request_id is None:
+            if change.merge_request_branch_name is None:
+                raise ValueError(f"Merge request change {change.id} has no branch name. That should not happen.")
+
+            merge_request_id = await self._hoster.has_pending_incarnation_merge_request(
+                change.incarnation_repository, change.merge_request_branch_name
+            )
+            if merge_request_id is None:
+                log.info("Merge request of incomplete change does not exist. Creating it.")
+                # changes created before the merge request was stored along with them get a generic one
+                _, merge_request_id = await self._hoster.merge_request(
+                    incarnation_repository=change.incarnation_repository,
+                    source_branch=change.merge_request_branch_name,
+                    title=change.merge_request_title or f"Update to {change.requested_version}",
+                    description=change.merge_request_description
+                    or "Foxops created this merge request for a change whose creation was interrupted.",
+                    with_automerge=bool(change.merge_request_automerge),
+                )
+
+            await self._change_repository.update_merge_request_id(change.id, merge_request_id)
+            self._publish(
+                change.incarnation_id,
+                ChangeEventType.MERGE_REQUEST_CREATED,
+                change_id=change.id,
+                merge_request_id=merge_request_id,
+            )
 
     async def get_change_type(self, change_id: int) -> ChangeType:
         change = await self._change_repository.get_change(change_id)
@@ -404,37 +670,43 @@ class ChangeService:
         Returns a change object for the given change ID.
         """
 
-        change = await self._change_repository.get_change(change_id)
-        if not change.commit_pushed:
+        return self._change_from_db(await self._change_repository.get_change(change_id))
+
+    async def get_change_with_merge_request(self, change_id: int) -> ChangeWithMergeRequest:
+        return await self._change_with_merge_request_from_db(
+            await self._change_repository.get_change_with_incarnation(change_id)
+        )
+
+    def _change_from_db(self, change_in_db: ChangeInDB) -> Change:
+        if not change_in_db.commit_pushed:
             raise IncompleteChange(
                 "the given change is in an incomplete state (commit_pushed=False). "
                 "Try calling update_incomplete_change(change_id) first."
             )
 
         return Change(
-            id=change.id,
-            incarnation_id=change.incarnation_id,
-            revision=change.revision,
-            requested_version_hash=change.requested_version_hash,
-            requested_version=change.requested_version,
-            requested_data=json.loads(change.requested_data),
-            created_at=change.created_at,
-            commit_sha=change.commit_sha,
+            id=change_in_db.id,
+            incarnation_id=change_in_db.incarnation_id,
+            revision=change_in_db.revision,
+            requested_version_hash=change_in_db.requested_version_hash,
+            requested_version=change_in_db.requested_version,
+            requested_data=change_in_db.requested_data,
+            created_at=change_in_db.created_at,
+            commit_sha=change_in_db.commit_sha,
         )
 
-    async def get_change_with_merge_request(self, change_id: int) -> ChangeWithMergeRequest:
-        change_basic = await self.get_change(change_id)
-
-        change_in_db = await self._change_repository.get_change(change_id)
-        incarnation_in_db = await self._incarnation_repository.get_by_id(change_in_db.incarnation_id)
+    async def _change_with_merge_request_from_db(
+        self, change_in_db: ChangeWithIncarnationInDB
+    ) -> ChangeWithMergeRequest:
+        change_basic = self._change_from_db(change_in_db)
 
         if change_in_db.type != ChangeType.MERGE_REQUEST:
-            raise ValueError(f"Change {change_id} is not a merge request change.")
+            raise ValueError(f"Change {change_in_db.id} is not a merge request change.")
         assert change_in_db.merge_request_id is not None
         assert change_in_db.merge_request_branch_name is not None
 
         status = await self._hoster.get_merge_request_status(
-            incarnation_repository=incarnation_in_db.incarnation_repository,
+            incarnation_repository=change_in_db.incarnation_repository,
             merge_request_id=change_in_db.merge_request_id,
         )
 
@@ -459,71 +731,160 @@ class ChangeService:
     async def get_latest_change_for_incarnation_if_completed(
         self, incarnation_id: int
     ) -> Change | ChangeWithMergeRequest:
-        change_id = await self.get_latest_change_id_for_incarnation(incarnation_id)
+        _, change = await self._get_latest_change_with_incarnation_if_completed(incarnation_id)
+        return change
+
+    async def _get_latest_change_with_incarnation_if_completed(
+        self, incarnation_id: int
+    ) -> tuple[ChangeWithIncarnationInDB, Change | ChangeWithMergeRequest]:
+        """
+        Like `get_latest_change_for_incarnation_if_completed()`, but also returns the database object
+        of the change, which contains the details of the incarnation as well.
+        """
 
-        change_type = await self.get_change_type(change_id)
-        if change_type == ChangeType.MERGE_REQUEST:
-            change = await self.get_change_with_merge_request(change_id)
+        change_in_db = await self._change_repository.get_latest_change_with_incarnation(incarnation_id)
+
+        if change_in_db.type == ChangeType.MERGE_REQUEST:
+            change = await self._change_with_merge_request_from_db(change_in_db)
             if change.merge_request_status not in (MergeRequestStatus.CLOSED, MergeRequestStatus.MERGED):
                 raise ChangeRejectedDueToPreviousUnfinishedChange(
                     "There is still an open MR for the previous change. Please close it first."
                 )
 
-            return change
-        elif change_type == ChangeType.DIRECT:
-            return await self.get_change(change_id)
+            return change_in_db, change
+        elif change_in_db.type == ChangeType.DIRECT:
+            return change_in_db, self._change_from_db(change_in_db)
 
-        raise ValueError(f"Unknown change type {change_type}")
+        raise ValueError(f"Unknown change type {change_in_db.type}")
 
     async def get_incarnation_with_details(self, incarnation_id: int) -> IncarnationWithDetails:
         """
         Returns an IncarnationWithDetails object for the given incarnation ID.
         """
 
-        incarnation = await self._incarnation_repository.get_by_id(incarnation_id)
+        details, _ = await self.get_incarnation_with_details_and_etag(incarnation_id)
+        assert details is not None
+        return details
 
-        change_id = await self.get_latest_change_id_for_incarnation(incarnation_id)
-        change_type = await self.get_change_type(change_id)
+    async def get_incarnation_with_details_and_etag(
+        self, incarnation_id: int, is_known_etag: Callable[[str], bool] | None = None
+    ) -> tuple[IncarnationWithDetails | None, str | None]:
+        """
+        Like `get_incarnation_with_details()`, but also returns the ETag of the details.
 
-        merge_request_id: str | None = None
-        merge_request_url: str | None = None
-        merge_request_status: MergeRequestStatus | None = None
+        The ETag is `None` if the statuses of the latest change aren't cached, because they might have changed.
+        Otherwise, it's known without looking up anything at the hoster - and if `is_known_etag` returns `True`
+        for it (e.g. because the client has the current details already), `None` is returned instead of the details.
+        """
 
-        change: Change | ChangeWithMergeRequest
-        if change_type == ChangeType.MERGE_REQUEST:
-            change = await self.get_change_with_merge_request(change_id)
+        change_in_db = await self._change_repository.get_latest_change_with_incarnation(incarnation_id)
+        if (
+            is_known_etag is not None
+            and (etag := self._incarnation_etag(change_in_db)) is not None
+            and is_known_etag(etag)
+        ):
+            return None, etag
+
+        merge_request_id = self._merge_request_id_from_db(change_in_db)
+
+        # the statuses are only looked up at the hoster if they weren't looked up shortly before
+        status_key = ChangeStatusKey(change_in_db.id, change_in_db.commit_sha, merge_request_id)
+        if (change_status := self._status_cache.get(status_key)) is None:
+            merge_request_status: MergeRequestStatus | None = None
+            if merge_request_id is not None:
+                merge_request_status = await self._hoster.get_merge_request_status(
+                    incarnation_repository=change_in_db.incarnation_repository,
+                    merge_request_id=merge_request_id,
+                )
 
-            merge_request_id = change.merge_request_id
-            merge_request_status = await self._hoster.get_merge_request_status(
-                incarnation.incarnation_repository, merge_request_id
-            )
-            merge_request_url = await self._hoster.get_merge_request_url(
-                incarnation.incarnation_repository, merge_request_id
+            status = await self._hoster.get_reconciliation_status(
+                incarnation_repository=change_in_db.incarnation_repository,
+                target_directory=change_in_db.target_directory,
+                commit_sha=change_in_db.commit_sha,
+                merge_request_id=merge_request_id,
+                pipeline_timeout=timedelta(seconds=10),
             )
-        elif change_type == ChangeType.DIRECT:
-            change = await self.get_change(change_id)
-        else:
-            raise ValueError(f"Unknown change type {change_type}")
 
-        status = await self._hoster.get_reconciliation_status(
-            incarnation_repository=incarnation.incarnation_repository,
-            target_directory=incarnation.target_directory,
-            commit_sha=change.commit_sha,
-            merge_request_id=merge_request_id,
-            pipeline_timeout=timedelta(seconds=10),
+            change_status = ChangeStatus(status=status, merge_request_status=merge_request_status)
+            self._status_cache.put(status_key, change_status)
+
+        etag = self._incarnation_etag(change_in_db)
+        return await self._incarnation_with_details_from_db(change_in_db, change_status), etag
+
+    def _incarnation_etag(self, change_in_db: ChangeWithIncarnationInDB) -> str | None:
+        # besides their statuses, the details only depend on the latest change - whose commit or merge request are
+        # the only things that are updated after its creation
+        merge_request_id = self._merge_request_id_from_db(change_in_db)
+        status_version = self._status_cache.version(
+            ChangeStatusKey(change_in_db.id, change_in_db.commit_sha, merge_request_id)
+        )
+        if status_version is None:
+            return None
+
+        version = (
+            f"{change_in_db.id}:{change_in_db.revision}:{change_in_db.commit_sha}:{merge_request_id}:{status_version}"
+        )
+        return f'"{hashlib.sha256(version.encode()).hexdigest()}"'
+
+    async def get_incarnations_with_details(self, incarnation_ids: list[int]) -> dict[int, IncarnationWithDetails]:
+        """
+        Like `get_incarnation_with_details()`, but for many incarnations at once - their statuses are looked up
+        at the hoster in batches, without waiting for pending pipelines.
+
+        Incarnations which don't exist (anymore) are left out.
+        """
+
+        changes_in_db = await self._change_repository.list_latest_changes_with_incarnation(incarnation_ids)
+
+        change_statuses = await self._get_change_statuses(
+            [
+                (
+                    change_in_db.incarnation_repository,
+                    ChangeStatusKey(
+                        change_in_db.id, change_in_db.commit_sha, self._merge_request_id_from_db(change_in_db)
+                    ),
+                )
+                for change_in_db in changes_in_db
+            ]
         )
 
+        return {
+            change_in_db.incarnation_id: await self._incarnation_with_details_from_db(change_in_db, change_status)
+            for change_in_db, change_status in zip(changes_in_db, change_statuses)
+        }
+
+    def _merge_request_id_from_db(self, change_in_db: ChangeWithIncarnationInDB) -> str | None:
+        if change_in_db.type == ChangeType.MERGE_REQUEST:
+            assert change_in_db.merge_request_id is not None
+            return change_in_db.merge_request_id
+        elif change_in_db.type != ChangeType.DIRECT:
+            raise ValueError(f"Unknown change type {change_in_db.type}")
+
+        return None
+
+    async def _incarnation_with_details_from_db(
+        self, change_in_db: ChangeWithIncarnationInDB, change_status: ChangeStatus
+    ) -> IncarnationWithDetails:
+        change = self._change_from_db(change_in_db)
+
+        merge_request_id = self._merge_request_id_from_db(change_in_db)
+        merge_request_url: str | None = None
+        if merge_request_id is not None:
+            merge_request_url = await self._hoster.get_merge_request_url(
+                change_in_db.incarnation_repository, merge_request_id
+            )
+
         return IncarnationWithDetails(
-            id=incarnation.id,
-            incarnation_repository=incarnation.incarnation_repository,
-            target_directory=incarnation.target_directory,
+            id=change_in_db.incarnation_id,
+            incarnation_repository=change_in_db.incarnation_repository,
+            target_directory=change_in_db.target_directory,
             commit_sha=change.commit_sha,
-            commit_url=await self._hoster.get_commit_url(incarnation.incarnation_repository, change.commit_sha),
+            commit_url=await self._hoster.get_commit_url(change_in_db.incarnation_repository, change.commit_sha),
             merge_request_id=merge_request_id,
             merge_request_url=merge_request_url,
-            merge_request_status=merge_request_status,
-            status=status,
-            template_repository=incarnation.template_repository,
+            merge_request_status=change_status.merge_request_status,
+            status=change_status.status,
+            template_repository=change_in_db.template_repository,
             template_repository_version=change.requested_version,
             template_repository_version_hash=change.requested_version_hash,
             template_data=change.requested_data,
@@ -536,14 +897,12 @@ class ChangeService:
         """
         This method checks out the incarnation repository, prepares a branch that contains the update and commits.
         """
-        incarnation = await self._incarnation_repository.get_by_id(incarnation_id)
+        # if the previous change was of type merge request and is still open, we dont want to continue
+        incarnation, last_change = await self._get_latest_change_with_incarnation_if_completed(incarnation_id)
 
         if incarnation.template_repository is None:
             raise Exception("upgrade failed. Should not happen.")
 
-        # if the previous change was of type merge request and is still open, we dont want to continue
-        last_change = await self.get_latest_change_for_incarnation_if_completed(incarnation_id)
-
         to_version = last_change.requested_version
         if requested_version is not None:
             to_version = requested_version
@@ -552,12 +911,21 @@ class ChangeService:
         if requested_data is not None:
             to_data.update(requested_data)
 
+        if await self._is_change_a_noop(incarnation.template_repository, last_change, to_version, to_data):
+            self._log.debug(
+                "requested version and data match the latest change. Skipping the update.",
+                incarnation_id=incarnation_id,
+                to_version=to_version,
+            )
+            raise ChangeRejectedDueToNoChanges()
+
         incarnation_repo_metadata = await self._hoster.get_repository_metadata(incarnation.incarnation_repository)
 
         async with (
             self._hoster.cloned_repository(incarnation.incarnation_repository) as local_incarnation_repository,
             self._hoster.cloned_repository(incarnation.template_repository, bare=True) as local_template_repository,
         ):
+            self._publish(incarnation_id, ChangeEventType.CLONED)
             branch_name = generate_foxops_branch_name(
                 prefix="update-to",
                 target_directory=incarnation.target_directory,
@@ -575,12 +943,15 @@ class ChangeService:
                 update_template_data=to_data,
                 incarnation_root_dir=(local_incarnation_repository.directory / incarnation.target_directory),
                 diff_patch_func=fengine.diff_and_patch,
+                # bulk updates of many incarnations to the same template version compute the patch only once
+                patch_cache=fengine.get_patch_cache(),
             )
 
             if not update_performed:
                 raise ChangeRejectedDueToNoChanges()
             if patch_result is None:
                 raise ChangeFailed("Patch result was None. That is unexpected at this stage.")
+            self._publish(incarnation_id, ChangeEventType.PATCHED)
 
             await local_incarnation_repository.commit_all(f"foxops: updating incarnation to version {to_version}")
             commit_sha = await local_incarnation_repository.head()
@@ -589,7 +960,7 @@ class ChangeService:
                 incarnation_repository=local_incarnation_repository,
                 incarnation_repository_identifier=incarnation.incarnation_repository,
                 incarnation_repository_default_branch=incarnation_repo_metadata["default_branch"],
-                to_version_hash=await local_template_repository.head(),
+                to_version_hash=await local_template_repository.resolve_commit(to_version),
                 to_version=to_version,
                 to_data=to_data,
                 expected_revision=last_change.revision + 1,
@@ -598,12 +969,67 @@ class ChangeService:
                 patch_result=patch_result,
             )
 
-    async def _push_change_commit_and_update_database(self, incarnation_git: GitRepository, change_id: int) -> None:
+    async def _is_change_a_noop(
+        self,
+        template_repository: str,
+        last_change: Change | ChangeWithMergeRequest,
+        to_version: str,
+        to_data: TemplateData,
+    ) -> bool:
+        """
+        Checks - without cloning any repository - whether updating the incarnation to the given version and data
+        would result in the exact same state as the latest change.
+
+        That is only the case if the latest change is part of the incarnation repository (a closed merge request
+        isn't) and if both the version (and the commit it resolves to) and the data are the same.
+        """
+
+        if isinstance(last_change, ChangeWithMergeRequest) and (
+            last_change.merge_request_status != MergeRequestStatus.MERGED
+        ):
+            return False
+
+        # the version itself is also part of the incarnation state, not only the commit it resolves to
+        if to_version != last_change.requested_version or to_data != last_change.requested_data:
+            return False
+
+        # a branch may have moved just now - the change must not be rejected based on its previous commit
+        to_version_hash = await self._revision_resolver.resolve(
+            self._hoster, template_repository, to_version, fresh=True
+        )
+        return to_version_hash == last_change.requested_version_hash
+
+    async def _pinned_template_refspec(self, template_repository: str, template_repository_version: str) -> str:
+        """
+        Returns the commit SHA that the given template version resolves to, if it can be resolved without cloning.
+
+        Fetching that commit (instead of the version itself) guarantees that the template is rendered
+        from exactly the commit that was resolved - even if a branch moves in the meantime.
+        Branches are resolved at the remote, so that a recently pushed commit isn't missed.
+        """
+
+        return (
+            await self._revision_resolver.resolve(
+                self._hoster, template_repository, template_repository_version, fresh=True
+            )
+            or template_repository_version
+        )
+
+    def _publish(self, incarnation_id: int, event_type: ChangeEventType, **kwargs) -> None:
+        self._event_bus.publish(ChangeEvent(incarnation_id=incarnation_id, type=event_type, **kwargs))
+
+    async def _push_change_commit_and_update_database(
+        self, incarnation_git: GitRepository, change_id: int
+    ) -> ChangeInDB:
         # the push might fail when other changes are pushed in the meantime. We need to rebase/retry in that case
         last_exception = None
         for attempt in range(10):
             log = self._log.bind(change_id=change_id, attempt=attempt)
 
+            # the push may take a while - record that the change is not interrupted
+            if attempt > 0:
+                await self._change_repository.touch_change(change_id)
+
             try:
                 await incarnation_git.push()
             except RetryableError as e:
@@ -626,8 +1052,11 @@ class ChangeService:
 
                 raise ChangeFailed from e
 
-            await self._change_repository.update_commit_pushed(change_id, True)
-            return
+            change = await self._change_repository.update_commit_pushed(change_id, True)
+            self._publish(
+                change.incarnation_id, ChangeEventType.PUSHED, change_id=change_id, commit_sha=change.commit_sha
+            )
+            return change
         else:
             if last_exception:
                 self._log.error("last exception", last_exception=last_exception)
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import os
+import stat
+from dataclasses import asdict
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable
+
+import foxops.engine as fengine
+from foxops.database.repositories.drift import DriftRepository
+from foxops.database.repositories.incarnation.model import IncarnationInDB
+from foxops.database.repositories.incarnation.repository import IncarnationRepository
+from foxops.engine import IncarnationState
+from foxops.hosters import Hoster
+from foxops.hosters.types import TreeEntry
+from foxops.logger import get_logger
+from foxops.models import IncarnationDrift
+
+#: Holds the module logger
+logger = get_logger(__name__)
+
+#: Holds the files of an incarnation which are not compared, because they are inputs of the rendering
+IGNORED_FILES = frozenset({".fengine.yaml", fengine.FVARS_FILENAME})
+
+
+def git_blob_sha(content: bytes) -> str:
+    """Returns the git object id of a blob with the given content (without storing it anywhere)."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def directory_tree(directory: Path) -> dict[str, TreeEntry]:
+    """Lists all files of the given directory the same way `Hoster.get_repository_tree()` lists them in a repository."""
+    tree = {}
+    for root, dirs, files in os.walk(directory):
+        for name in files + [d for d in dirs if Path(root, d).is_symlink()]:
+            path = Path(root, name)
+            if path.is_symlink():
+                tree[path.relative_to(directory).as_posix()] = TreeEntry(
+                    "120000", git_blob_sha(os.readlink(path).encode())
+                )
+            else:
+                mode = "100755" if path.stat().st_mode & stat.S_IXUSR else "100644"
+                tree[path.relative_to(directory).as_posix()] = TreeEntry(mode, git_blob_sha(path.read_bytes()))
+    return tree
+
+
+class DriftService:
+    """Detects incarnations which have been customised away from the pristine rendering of their template.
+
+    The files of an incarnation are compared by their git object ids, which the hoster lists without cloning
+    the incarnation repository. Only the template repository is cloned, to render it - and those renderings are
+    shared between all incarnations of a scan which use the same template version and data.
+    """
+
+    def __init__(
+        self, hoster: Hoster, incarnation_repository: IncarnationRepository, drift_repository: DriftRepository
+    ) -> None:
+        self._hoster = hoster
+        self._incarnation_repository = incarnation_repository
+        self._drift_repository = drift_repository
+
+    async def get(self, incarnation_id: int) -> IncarnationDrift:
+        """Returns the result of the last scan of the given incarnation."""
+        return IncarnationDrift.from_orm(await self._drift_repository.get(incarnation_id))
+
+    async def list_drift(self, drifted: bool | None = None) -> list[IncarnationDrift]:
+        return [IncarnationDrift.from_orm(d) async for d in self._drift_repository.list(drifted=drifted)]
+
+    async def scan_all(self, incremental: bool = True, max_concurrency: int = 4) -> list[IncarnationDrift]:
+        """Scans all incarnations, at most `max_concurrency` at a time.
+
+        Incarnations that fail to be scanned are logged and skipped.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        pristine_trees: dict[str, asyncio.Task[dict[str, TreeEntry]]] = {}
+
+        async def _scan(incarnation: IncarnationInDB) -> IncarnationDrift | None:
+            async with semaphore:
+                try:
+                    return await self._scan(incarnation, incremental, pristine_trees)
+                except Exception:
+                    logger.exception("failed to scan incarnation for drift", incarnation_id=incarnation.id)
+                    return None
+
+        incarnations = [i async for i in self._incarnation_repository.list()]
+        results = await asyncio.gather(*[_scan(i) for i in incarnations])
+        return [r for r in results if r is not None]
+
+    async def scan(self, incarnation_id: int, incremental: bool = True) -> IncarnationDrift | None:
+        """Scans the given incarnation and stores the result.
+
+        With `incremental`, the previous result is returned as is if the incarnation repository didn't change since.
+        Returns `None` if the incarnation repository doesn't contain the incarnation (anymore).
+        """
+        incarnation = await self._incarnation_repository.get_by_id(incarnation_id)
+        return await self._scan(incarnation, incremental, {})
+
+    async def _scan(
+        self,
+        incarnation: IncarnationInDB,
+        incremental: bool,
+        pristine_trees: dict[str, asyncio.Task[dict[str, TreeEntry]]],
+    ) -> IncarnationDrift | None:
+        head = await self._hoster.resolve_revision(incarnation.incarnation_repository, "HEAD")
+        if head is None:
+            logger.info("incarnation repository has no commits, skipping drift scan", incarnation_id=incarnation.id)
+            return None
+
+        if incremental:
+            previous = await self._drift_repository.get_or_none(incarnation.id)
+            if previous is not None and previous.incarnation_commit_sha == head.sha:
+                logger.debug("incarnation didn't change since the last drift scan", incarnation_id=incarnation.id)
+                return IncarnationDrift.from_orm(previous)
+
+        actual_tree = await self._hoster.get_repository_tree(
+            incarnation.incarnation_repository, head.sha, incarnation.target_directory
+        )
+        if (state_entry := actual_tree.get(".fengine.yaml")) is None:
+            logger.info("incarnation state file not found, skipping drift scan", incarnation_id=incarnation.id)
+            return None
+
+        incarnation_state = fengine.load_incarnation_state_from_string(
+            (await self._hoster.get_blob(incarnation.incarnation_repository, state_entry.sha)).decode()
+        )
+
+        # the rendering depends on nothing but the template repository and the incarnation state
+        pristine_key = json.dumps(
+            [incarnation.template_repository, asdict(incarnation_state)], sort_keys=True, default=str
+        )
+        if (pristine_task := pristine_trees.get(pristine_key)) is None:
+            pristine_task = pristine_trees[pristine_key] = asyncio.ensure_future(
+                self._render_pristine_tree(incarnation.template_repository, incarnation_state)
+            )
+        pristine_tree = await pristine_task
+
+        actual_paths = actual_tree.keys() - IGNORED_FILES
+        pristine_paths = pristine_tree.keys() - IGNORED_FILES
+        drift = await self._drift_repository.save(
+            incarnation_id=incarnation.id,
+            incarnation_commit_sha=head.sha,
+            template_repository_version_hash=incarnation_state.template_repository_version_hash,
+            added_files=sorted(actual_paths - pristine_paths),
+            modified_files=sorted(p for p in actual_paths & pristine_paths if actual_tree[p] != pristine_tree[p]),
+            removed_files=sorted(pristine_paths - actual_paths),
+        )
+        return IncarnationDrift.from_orm(drift)
+
+    async def _render_pristine_tree(
+        self, template_repository: str, incarnation_state: IncarnationState
+    ) -> dict[str, TreeEntry]:
+        async with self._hoster.cloned_repository(
+            template_repository, refspec=incarnation_state.template_repository_version_hash
+        ) as template_git:
+            with TemporaryDirectory() as incarnation_dir:
+                await fengine.initialize_incarnation(
+                    template_root_dir=template_git.directory,
+                    template_repository=incarnation_state.template_repository,
+                    template_repository_version=incarnation_state.template_repository_version,
+                    template_data=incarnation_state.template_data,
+                    incarnation_root_dir=Path(incarnation_dir),
+                )
+                return await asyncio.to_thread(directory_tree, Path(incarnation_dir))
+
+
+async def scan_periodically(
+    drift_service_factory: Callable[[], DriftService],
+    interval_seconds: int,
+    max_concurrency: int,
+) -> None:
+    """Scans all incarnations incrementally for drift, every `interval_seconds`, until cancelled."""
+    while True:
+        try:
+            results = await drift_service_factory().scan_all(incremental=True, max_concurrency=max_concurrency)
+            logger.info(
+                "scanned incarnations for drift",
+                scanned=len(results),
+                drifted=sum(1 for r in results if r.drifted),
+            )
+        except Exception:
+            logger.exception("failed to scan incarnations for drift")
+
+        await asyncio.sleep(interval_seconds)
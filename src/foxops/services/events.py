@@ -0,0 +1,202 @@
+import asyncio
+import enum
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, AsyncIterator, Iterator
+
+from pydantic import BaseModel, Field
+
+from foxops.logger import get_logger
+from foxops.models import IncarnationWithDetails
+
+if TYPE_CHECKING:
+    from foxops.services.change import ChangeService
+
+#: Holds the module logger
+logger = get_logger(__name__)
+
+
+class ChangeEventType(enum.Enum):
+    #: the repositories of a change were cloned
+    CLONED = "cloned"
+    #: the template was rendered into the incarnation repository
+    RENDERED = "rendered"
+    #: the update of the template was applied to the incarnation repository
+    PATCHED = "patched"
+    #: the commit of a change was pushed to the incarnation repository
+    PUSHED = "pushed"
+    #: a merge request was created for the commit of a change
+    MERGE_REQUEST_CREATED = "merge_request_created"
+    #: the status of the merge request of the latest change changed (e.g. it was merged)
+    MERGE_REQUEST_STATUS = "merge_request_status"
+    #: the status of the pipelines of the latest change changed
+    PIPELINE_STATUS = "pipeline_status"
+
+
+class ChangeEvent(BaseModel):
+    incarnation_id: int
+    type: ChangeEventType
+
+    change_id: int | None = None
+    commit_sha: str | None = None
+    merge_request_id: str | None = None
+    #: the new status, for status events
+    status: str | None = None
+
+    occurred_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class EventBus:
+    """
+    Distributes the events of changes to the subscribers of the incarnations, within the process.
+
+    Publishing never blocks: every subscriber has a bounded queue, and if a subscriber doesn't keep up,
+    its oldest events are dropped.
+    """
+
+    def __init__(self, max_queued_events: int = 100):
+        self._max_queued_events = max_queued_events
+        self._subscribers: defaultdict[int, set[asyncio.Queue[ChangeEvent]]] = defaultdict(set)
+
+    def publish(self, event: ChangeEvent) -> None:
+        for queue in self._subscribers.get(event.incarnation_id, ()):
+            _put_dropping_oldest(queue, event)
+
+    @contextmanager
+    def subscribe(self, incarnation_id: int) -> Iterator[asyncio.Queue[ChangeEvent]]:
+        """Returns a queue which receives the events of the given incarnation, until the block is left."""
+        queue: asyncio.Queue[ChangeEvent] = asyncio.Queue(maxsize=self._max_queued_events)
+        self._subscribers[incarnation_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[incarnation_id].discard(queue)
+            if not self._subscribers[incarnation_id]:
+                del self._subscribers[incarnation_id]
+
+
+class StatusRefresher:
+    """
+    Looks up the statuses of the incarnations which are watched, and publishes their changes as events.
+
+    A single task looks up the statuses of all watched incarnations together, so that they are looked up
+    at the hoster in batches - and only once, regardless of how many clients watch an incarnation.
+
+    Instances are bound to the event loop they are first used in.
+    """
+
+    def __init__(self, event_bus: EventBus, interval: timedelta = timedelta(seconds=5)):
+        self._event_bus = event_bus
+        self._interval = interval.total_seconds()
+
+        self._watchers: dict[int, int] = {}
+        self._previous: dict[int, IncarnationWithDetails] = {}
+        self._change_service: "ChangeService | None" = None
+        self._task: asyncio.Task | None = None
+        self._new_incarnation_watched = asyncio.Event()
+
+    @asynccontextmanager
+    async def watching(
+        self, incarnation_id: int, change_service: "ChangeService", events: asyncio.Queue[ChangeEvent]
+    ) -> AsyncIterator[None]:
+        """Watches the statuses of the given incarnation, until the block is left.
+
+        The watcher has to be subscribed to the incarnation with the given queue already. It receives the current
+        statuses first - the other watchers of the incarnation received them before already.
+        """
+        if incarnation_id not in self._watchers:
+            # the statuses of newly watched incarnations are looked up right away
+            self._new_incarnation_watched.set()
+        elif (previous := self._previous.get(incarnation_id)) is not None:
+            for event in self._status_change_events(None, previous):
+                _put_dropping_oldest(events, event)
+        self._watchers[incarnation_id] = self._watchers.get(incarnation_id, 0) + 1
+        # the change services of all watchers are equivalent, the latest one is used
+        self._change_service = change_service
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+
+        try:
+            yield
+        finally:
+            if self._watchers[incarnation_id] == 1:
+                del self._watchers[incarnation_id]
+                self._previous.pop(incarnation_id, None)
+            else:
+                self._watchers[incarnation_id] -= 1
+
+            if not self._watchers and self._task is not None:
+                task, self._task = self._task, None
+                task.cancel()
+                # let the lookup wind down, without raising its cancellation
+                await asyncio.wait([task])
+
+    async def _refresh(self) -> None:
+        while True:
+            self._new_incarnation_watched.clear()
+            incarnation_ids = list(self._watchers)
+
+            assert self._change_service is not None
+            try:
+                details = await self._change_service.get_incarnations_with_details(incarnation_ids)
+            except Exception:
+                logger.exception("failed to refresh the statuses of incarnations", incarnation_ids=incarnation_ids)
+            else:
+                for incarnation_id, current in details.items():
+                    # incarnations may have been unwatched in the meantime
+                    if incarnation_id in self._watchers:
+                        for event in self._status_change_events(self._previous.get(incarnation_id), current):
+                            self._event_bus.publish(event)
+                        self._previous[incarnation_id] = current
+
+            try:
+                await asyncio.wait_for(self._new_incarnation_watched.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _status_change_events(
+        self, previous: IncarnationWithDetails | None, current: IncarnationWithDetails
+    ) -> list[ChangeEvent]:
+        if previous is not None and (previous.commit_sha, previous.merge_request_id) == (
+            current.commit_sha,
+            current.merge_request_id,
+        ):
+            merge_request_status_changed = previous.merge_request_status != current.merge_request_status
+            pipeline_status_changed = previous.status != current.status
+        else:
+            # the statuses of a new change are published right away, just as those of the first lookup -
+            # which tell the watchers the current state
+            merge_request_status_changed = pipeline_status_changed = True
+
+        events = []
+        if merge_request_status_changed and current.merge_request_status is not None:
+            events.append(
+                ChangeEvent(
+                    incarnation_id=current.id,
+                    type=ChangeEventType.MERGE_REQUEST_STATUS,
+                    commit_sha=current.commit_sha,
+                    merge_request_id=current.merge_request_id,
+                    status=current.merge_request_status.value,
+                )
+            )
+
+        if pipeline_status_changed:
+            events.append(
+                ChangeEvent(
+                    incarnation_id=current.id,
+                    type=ChangeEventType.PIPELINE_STATUS,
+                    commit_sha=current.commit_sha,
+                    merge_request_id=current.merge_request_id,
+                    status=current.status.value,
+                )
+            )
+
+        return events
+
+
+def _put_dropping_oldest(queue: asyncio.Queue[ChangeEvent], event: ChangeEvent) -> None:
+    if queue.full():
+        dropped = queue.get_nowait()
+        logger.warning("dropped change event of slow subscriber", incarnation_id=dropped.incarnation_id)
+    queue.put_nowait(event)
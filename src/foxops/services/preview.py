@@ -0,0 +1,46 @@
+from collections import OrderedDict
+from typing import NamedTuple
+
+from foxops.logger import get_logger
+from foxops.models.change import ChangePreview
+
+#: Holds the module logger
+logger = get_logger(__name__)
+
+
+class ChangePreviewKey(NamedTuple):
+    #: the commit the incarnation repository is currently at
+    incarnation_repository_head: str
+    #: the commit of the template version to update to
+    template_repository_version_hash: str
+    #: the hash of the incarnation, template version and data to update to
+    requested_hash: str
+
+
+class ChangePreviewCache:
+    """
+    Caches the previews of changes, so that repeatedly previewing the same change (e.g. from a UI)
+    doesn't clone both repositories and render the template every time.
+
+    Previews are only valid as long as neither the incarnation repository nor the template version move,
+    which is why both commits are part of the key. The least recently used previews are evicted first.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self._maxsize = maxsize
+        self._cache: OrderedDict[ChangePreviewKey, ChangePreview] = OrderedDict()
+
+    def get(self, key: ChangePreviewKey) -> ChangePreview | None:
+        if (preview := self._cache.get(key)) is None:
+            return None
+
+        self._cache.move_to_end(key)
+        return preview.copy(deep=True)
+
+    def put(self, key: ChangePreviewKey, preview: ChangePreview) -> None:
+        self._cache[key] = preview.copy(deep=True)
+        self._cache.move_to_end(key)
+
+        while len(self._cache) > self._maxsize:
+            evicted_key, _ = self._cache.popitem(last=False)
+            logger.debug("evicted change preview from cache", key=evicted_key)
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import timedelta
+from typing import Callable
+
+from foxops.database.repositories.lease import LeaseRepository
+from foxops.logger import get_logger
+from foxops.services.change import ChangeService
+
+#: Holds the module logger
+logger = get_logger(__name__)
+
+#: Holds the name of the lease which makes sure that only one replica reconciles incomplete changes
+RECONCILER_LEASE_NAME = "incomplete-change-reconciler"
+
+
+def lease_holder_id() -> str:
+    """Returns an identifier of this process, which is unique across all replicas."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+async def reconcile_periodically(
+    change_service_factory: Callable[[], ChangeService],
+    lease_repository: LeaseRepository,
+    interval_seconds: int,
+    holder: str | None = None,
+) -> None:
+    """Updates all incomplete changes every `interval_seconds`, until cancelled.
+
+    Only the replica which holds the reconciler lease does so. The lease is renewed with every run
+    and released when cancelled - otherwise it expires after two intervals, so that another replica takes over.
+    """
+    holder = holder or lease_holder_id()
+    lease_duration = timedelta(seconds=2 * interval_seconds)
+
+    try:
+        while True:
+            try:
+                if await lease_repository.acquire(RECONCILER_LEASE_NAME, holder, lease_duration):
+                    updated = await change_service_factory().update_incomplete_changes()
+                    logger.info("reconciled incomplete changes", updated=updated)
+                else:
+                    logger.debug("reconciler lease is held by another replica, skipping")
+            except Exception:
+                logger.exception("failed to reconcile incomplete changes")
+
+            await asyncio.sleep(interval_seconds)
+    finally:
+        await lease_repository.release(RECONCILER_LEASE_NAME, holder)
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Callable
+
+from foxops.external.git import ResolvedRevision, RevisionKind
+from foxops.hosters import GitSha, Hoster
+from foxops.logger import get_logger
+
+#: Holds the module logger
+logger = get_logger(__name__)
+
+
+class RevisionResolver:
+    """
+    Resolves revisions (tags, branches, commit SHAs) of template repositories to commit SHAs
+    and caches the results, so that repeated (bulk) operations don't have to ask the template remote every time.
+
+    Every cached entry expires after a time that depends on how likely the revision is to move:
+    commit SHAs never change, tags are expected to be immutable (but can be force-pushed) and branches move frequently.
+    The cache is bounded, the least recently used entries are evicted first.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        tag_ttl: timedelta = timedelta(hours=1),
+        branch_ttl: timedelta = timedelta(seconds=30),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._maxsize = maxsize
+        self._ttls: dict[RevisionKind, float | None] = {
+            RevisionKind.COMMIT: None,
+            RevisionKind.TAG: tag_ttl.total_seconds(),
+            RevisionKind.BRANCH: branch_ttl.total_seconds(),
+            RevisionKind.OTHER: branch_ttl.total_seconds(),
+        }
+        self._clock = clock
+
+        self._cache: OrderedDict[tuple[str, str], tuple[ResolvedRevision, float | None]] = OrderedDict()
+        self._pending: dict[tuple[str, str], asyncio.Task[ResolvedRevision | None]] = {}
+
+    async def resolve(self, hoster: Hoster, repository: str, revision: str, fresh: bool = False) -> GitSha | None:
+        """
+        Returns the commit SHA that the given revision currently points to.
+
+        With `fresh`, only tags and commit SHAs are served from the cache - branches are resolved at the remote,
+        for decisions which must not be based on a branch that moved in the meantime.
+
+        `None` is returned if the revision cannot be resolved without cloning the repository
+        (see `Hoster.resolve_revision()`). Such results are not cached.
+        """
+
+        key = (repository, revision)
+        if (resolved := self._get(key)) is not None and not (
+            fresh and resolved.kind not in (RevisionKind.COMMIT, RevisionKind.TAG)
+        ):
+            return resolved.sha
+
+        # concurrent lookups of the same revision share a single request to the remote
+        if (task := self._pending.get(key)) is None:
+            task = asyncio.create_task(hoster.resolve_revision(repository, revision))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        resolved = await asyncio.shield(task)
+        if resolved is None:
+            return None
+
+        self._put(key, resolved)
+        return resolved.sha
+
+    def _get(self, key: tuple[str, str]) -> ResolvedRevision | None:
+        try:
+            resolved, expires_at = self._cache[key]
+        except KeyError:
+            return None
+
+        if expires_at is not None and expires_at <= self._clock():
+            del self._cache[key]
+            return None
+
+        self._cache.move_to_end(key)
+        return resolved
+
+    def _put(self, key: tuple[str, str], resolved: ResolvedRevision) -> None:
+        ttl = self._ttls[resolved.kind]
+        self._cache[key] = (resolved, None if ttl is None else self._clock() + ttl)
+        self._cache.move_to_end(key)
+
+        while len(self._cache) > self._maxsize:
+            evicted_key, _ = self._cache.popitem(last=False)
+            logger.debug("evicted resolved revision from cache", repository=evicted_key[0], revision=evicted_key[1])
@@ -0,0 +1,99 @@
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, NamedTuple
+
+from foxops.hosters.types import MergeRequestStatus, ReconciliationStatus
+from foxops.logger import get_logger
+
+#: Holds the module logger
+logger = get_logger(__name__)
+
+
+class ChangeStatusKey(NamedTuple):
+    change_id: int
+    #: the commit and merge request of a change are part of the key, because they are set after its creation
+    commit_sha: str
+    merge_request_id: str | None
+
+
+@dataclass(frozen=True)
+class ChangeStatus:
+    status: ReconciliationStatus
+    merge_request_status: MergeRequestStatus | None
+
+    @property
+    def final(self) -> bool:
+        """Whether the status is not expected to change anymore."""
+        return self.status in (ReconciliationStatus.SUCCESS, ReconciliationStatus.FAILED) and (
+            self.merge_request_status in (None, MergeRequestStatus.MERGED, MergeRequestStatus.CLOSED)
+        )
+
+
+class ChangeStatusCache:
+    """
+    Caches the statuses of changes at the hoster, so that clients which poll an incarnation
+    don't cause requests to the hoster every time.
+
+    Statuses which may still change (like a running pipeline or an open merge request) expire quickly,
+    final statuses are kept longer - pipelines can still be retried. The least recently used entries are evicted first.
+
+    Every cached status has a version, which only changes if a different status is put for the same change.
+    It allows to tell whether a status changed without looking it up again.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        ttl: timedelta = timedelta(seconds=5),
+        final_ttl: timedelta = timedelta(minutes=5),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._maxsize = maxsize
+        self._ttl = ttl.total_seconds()
+        self._final_ttl = final_ttl.total_seconds()
+        self._clock = clock
+
+        # expired entries are kept (until they are evicted), so that their versions are kept if the status didn't change
+        self._cache: OrderedDict[ChangeStatusKey, tuple[ChangeStatus, float, str]] = OrderedDict()
+        # the versions of different caches (e.g. of other processes) must not collide
+        self._version_prefix = uuid.uuid4().hex
+        self._version_counter = 0
+
+    def get(self, key: ChangeStatusKey) -> ChangeStatus | None:
+        try:
+            status, expires_at, _ = self._cache[key]
+        except KeyError:
+            return None
+
+        if expires_at <= self._clock():
+            return None
+
+        self._cache.move_to_end(key)
+        return status
+
+    def version(self, key: ChangeStatusKey) -> str | None:
+        """Returns the version of the cached status, if it didn't expire yet."""
+        try:
+            _, expires_at, version = self._cache[key]
+        except KeyError:
+            return None
+
+        return version if expires_at > self._clock() else None
+
+    def put(self, key: ChangeStatusKey, status: ChangeStatus) -> None:
+        previous = self._cache.get(key)
+        if previous is not None and previous[0] == status:
+            version = previous[2]
+        else:
+            self._version_counter += 1
+            version = f"{self._version_prefix}-{self._version_counter}"
+
+        self._cache[key] = (status, self._clock() + (self._final_ttl if status.final else self._ttl), version)
+        self._cache.move_to_end(key)
+
+        while len(self._cache) > self._maxsize:
+            evicted_key, _ = self._cache.popitem(last=False)
+            logger.debug("evicted change status from cache", change_id=evicted_key.change_id)
@@ -1,3 +1,5 @@
+import enum
+from functools import cache
 from pathlib import Path
 
 from pydantic import BaseSettings, SecretStr
@@ -7,12 +9,93 @@ from pydantic import BaseSettings, SecretStr
 # for generating migrations
 class DatabaseSettings(BaseSettings):
     url: SecretStr = SecretStr("sqlite+aiosqlite:///./test.db")
+    #: a read replica of the database, which serves the read-only queries of the API (with the same pool settings)
+    replica_url: SecretStr | None = None
+
+    # the pool settings are ignored for SQLite, which doesn't benefit from pooling
+    #: the number of connections that are kept open
+    pool_size: int = 5
+    #: the number of connections that may be opened on top of `pool_size` under load
+    max_overflow: int = 10
+    #: the number of seconds to wait for a free connection before giving up
+    pool_timeout: float = 30
+    #: the number of seconds after which connections are replaced. -1 never replaces them
+    pool_recycle: int = -1
+    #: test connections with a round-trip before handing them out. Without it, connections which were closed
+    #: by the server are only detected when they fail - consider setting `pool_recycle` instead.
+    pool_pre_ping: bool = True
+
+    #: the number of prepared statements that are cached per connection (asyncpg only). 0 disables the cache
+    statement_cache_size: int = 100
+    #: the number of seconds after which statements time out (asyncpg only)
+    statement_timeout: float | None = None
 
     class Config:
         env_prefix = "foxops_database_"
         secrets_dir = "/var/run/secrets/foxops"
 
 
+class GitBackend(enum.Enum):
+    #: every git operation spawns a `git` subprocess
+    CLI = "cli"
+    #: local git operations run in-process using dulwich. Network operations still use the `git` CLI.
+    DULWICH = "dulwich"
+
+
+# git-related settings are kept separate, as they are also needed by the engine (fengine),
+# which runs without the API server settings
+class GitSettings(BaseSettings):
+    backend: GitBackend = GitBackend.CLI
+
+    class Config:
+        env_prefix = "foxops_git_"
+        secrets_dir = "/var/run/secrets/foxops"
+
+
+class EngineSettings(BaseSettings):
+    #: the maximum number of templates that are rendered concurrently (per process)
+    max_concurrent_renders: int = 4
+    #: the maximum number of scratch git repositories that are used to diff rendered templates (per process)
+    max_scratch_repositories: int = 4
+    #: the maximum number of patches between template versions that are cached (per process)
+    patch_cache_size: int = 128
+
+    class Config:
+        env_prefix = "foxops_engine_"
+        secrets_dir = "/var/run/secrets/foxops"
+
+
+class SubprocessSettings(BaseSettings):
+    #: the maximum number of concurrently running subprocesses which talk to a remote (e.g. `git clone`, `git push`)
+    max_concurrent_network: int = 16
+    #: the maximum number of concurrently running local subprocesses (e.g. `git apply`)
+    max_concurrent_local: int = 32
+
+    class Config:
+        env_prefix = "foxops_subprocess_"
+        secrets_dir = "/var/run/secrets/foxops"
+
+
+class DriftSettings(BaseSettings):
+    #: the interval in which all incarnations are scanned for drift. The scanner is disabled if it's 0.
+    scan_interval_seconds: int = 0
+    #: the maximum number of incarnations that are scanned concurrently
+    max_concurrent_scans: int = 4
+
+    class Config:
+        env_prefix = "foxops_drift_"
+        secrets_dir = "/var/run/secrets/foxops"
+
+
+class ReconcilerSettings(BaseSettings):
+    #: the interval in which incomplete changes are reconciled. The reconciler is disabled if it's 0.
+    interval_seconds: int = 0
+
+    class Config:
+        env_prefix = "foxops_reconciler_"
+        secrets_dir = "/var/run/secrets/foxops"
+
+
 class Settings(BaseSettings):
     static_token: SecretStr
     frontend_dist_dir: Path = Path("ui/dist")
@@ -21,3 +104,28 @@ class Settings(BaseSettings):
     class Config:
         env_prefix = "foxops_"
         secrets_dir = "/var/run/secrets/foxops"
+
+
+@cache
+def get_git_settings() -> GitSettings:
+    return GitSettings()
+
+
+@cache
+def get_engine_settings() -> EngineSettings:
+    return EngineSettings()
+
+
+@cache
+def get_subprocess_settings() -> SubprocessSettings:
+    return SubprocessSettings()
+
+
+@cache
+def get_drift_settings() -> DriftSettings:
+    return DriftSettings()
+
+
+@cache
+def get_reconciler_settings() -> ReconcilerSettings:
+    return ReconcilerSettings()
@@ -1,11 +1,20 @@
 import asyncio
+import enum
 import subprocess
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, Hashable, TypeVar
 
 from .errors import FoxopsError
 from .logger import get_logger
+from .settings import get_subprocess_settings
 
 logger = get_logger("utils")
 
+T = TypeVar("T")
+
 
 class CalledProcessError(subprocess.CalledProcessError, FoxopsError):
     """Error raised when copier fails."""
@@ -15,11 +24,145 @@ class CalledProcessError(subprocess.CalledProcessError, FoxopsError):
         return f"{super().__str__()} with stdout '{self.stdout}' and stderr '{self.stderr}'"
 
 
+class LoopLocal(Generic[T]):
+    """Holds a separate instance of a value for every event loop, created lazily by the given factory.
+
+    This is required for process-wide asyncio primitives (like locks or semaphores),
+    because they are bound to the event loop they are first used in.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instances: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T] = weakref.WeakKeyDictionary()
+
+    def get(self) -> T:
+        loop = asyncio.get_running_loop()
+        try:
+            return self._instances[loop]
+        except KeyError:
+            instance = self._instances[loop] = self._factory()
+            return instance
+
+
+class SubprocessKind(enum.Enum):
+    #: the subprocess only works on local files
+    LOCAL = "local"
+    #: the subprocess talks to a remote (e.g. `git clone`)
+    NETWORK = "network"
+
+
+class FairScheduler:
+    """Limits the number of concurrently running operations, queuing the remaining ones.
+
+    Queued operations are grouped by a key (e.g. a repository) and the free slots are handed out
+    round-robin between the keys, so that a burst of operations for one key can't starve the others.
+
+    Instances are bound to the event loop they are first used in.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+
+        self._running = 0
+        self._queues: OrderedDict[Hashable, deque[asyncio.Future[None]]] = OrderedDict()
+
+        #: the number of operations that got a slot so far
+        self.acquisitions = 0
+        #: the total and maximum time operations had to wait for a slot, in seconds
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable = None) -> AsyncIterator[None]:
+        start = time.monotonic()
+        await self._acquire(key)
+
+        wait_seconds = time.monotonic() - start
+        self.acquisitions += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+        if wait_seconds > 0:
+            logger.debug(
+                "waited for a free slot",
+                scheduler=self.name,
+                key=key,
+                wait_seconds=round(wait_seconds, 3),
+                running=self._running,
+                queued=self.queued,
+            )
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, key: Hashable) -> None:
+        if self._running < self.limit and not self._queues:
+            self._running += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # the slot was already handed over to us - pass it on
+                self._release()
+            elif (queue := self._queues.get(key)) is not None and future in queue:
+                queue.remove(future)
+                if not queue:
+                    del self._queues[key]
+            raise
+
+    def _release(self) -> None:
+        # hand over the slot to the first waiter of the next key, which then moves to the end of the line
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+
+            if not future.done():
+                future.set_result(None)
+                return
+
+        self._running -= 1
+
+
+#: Holds the process-wide schedulers for subprocesses, by kind
+_subprocess_schedulers = {
+    SubprocessKind.LOCAL: LoopLocal(
+        lambda: FairScheduler("local-subprocesses", get_subprocess_settings().max_concurrent_local)
+    ),
+    SubprocessKind.NETWORK: LoopLocal(
+        lambda: FairScheduler("network-subprocesses", get_subprocess_settings().max_concurrent_network)
+    ),
+}
+
+
+def get_subprocess_scheduler(kind: SubprocessKind) -> FairScheduler:
+    return _subprocess_schedulers[kind].get()
+
+
 async def check_call(
     program: str,
     *args,
     expected_returncodes: frozenset = frozenset({0}),
     timeout: int | float | None = None,
+    kind: SubprocessKind = SubprocessKind.LOCAL,
+    queue_key: Hashable = None,
     **kwargs,
 ) -> asyncio.subprocess.Process:
     """Execute the given executable and raise error on non-zero exit code.
@@ -31,7 +174,22 @@ async def check_call(
     The timeout parameter can be used to specify a maximum wait time in seconds. If the timeout expires before the
     called process completes, the subprocess will be killed.
     -> Setting the timeout to None (default) will allow the child process to take forever.
+
+    The number of concurrently running subprocesses is limited per `kind` (see `SubprocessSettings`).
+    Subprocesses which exceed that limit are queued - fairly between different `queue_key`s.
+    The time spent in the queue doesn't count towards the timeout.
     """
+    async with get_subprocess_scheduler(kind).slot(queue_key):
+        return await _check_call(program, *args, expected_returncodes=expected_returncodes, timeout=timeout, **kwargs)
+
+
+async def _check_call(
+    program: str,
+    *args,
+    expected_returncodes: frozenset,
+    timeout: int | float | None,
+    **kwargs,
+) -> asyncio.subprocess.Process:
     proc = await asyncio.create_subprocess_exec(
         program,
         *args,
@@ -40,26 +198,58 @@ async def check_call(
         **kwargs,
     )
 
+    # the output is read while the process is running, because it blocks as soon as the pipe buffers are full
+    stdout_buffer, stderr_buffer = bytearray(), bytearray()
     try:
-        await asyncio.wait_for(proc.wait(), timeout=timeout)
+        await asyncio.wait_for(
+            asyncio.gather(_read_into(proc.stdout, stdout_buffer), _read_into(proc.stderr, stderr_buffer), proc.wait()),
+            timeout=timeout,
+        )
     except asyncio.TimeoutError:
         proc.kill()
-        stdout_buffer = None if proc.stdout is None else bytes(proc.stdout._buffer)  # type: ignore
-        stderr_buffer = None if proc.stderr is None else bytes(proc.stderr._buffer)  # type: ignore
 
         logger.error(
             "killed process as it exceeded the timeout",
-            stdout_buffer=stdout_buffer,
-            stderr_buffer=stderr_buffer,
+            stdout_buffer=bytes(stdout_buffer),
+            stderr_buffer=bytes(stderr_buffer),
         )
         raise
 
     if proc.returncode is not None and proc.returncode not in expected_returncodes:
-        raise CalledProcessError(
-            proc.returncode,
-            [program] + list(args),
-            await proc.stdout.read() if proc.stdout else None,
-            await proc.stderr.read() if proc.stderr else None,
-        )
+        raise CalledProcessError(proc.returncode, [program] + list(args), bytes(stdout_buffer), bytes(stderr_buffer))
 
+    # callers read the output from the process, like they would if it was still running
+    proc.stdout = _exhausted_stream(stdout_buffer)
+    proc.stderr = _exhausted_stream(stderr_buffer)
     return proc
+
+
+async def _read_into(stream: asyncio.StreamReader | None, buffer: bytearray) -> None:
+    if stream is None:
+        return
+
+    while chunk := await stream.read(64 * 1024):
+        buffer += chunk
+
+
+def _exhausted_stream(data: bytes | bytearray) -> asyncio.StreamReader:
+    stream = asyncio.StreamReader()
+    stream.feed_data(bytes(data))
+    stream.feed_eof()
+    return stream
+
+
+async def gather_or_cancel(*aws: Awaitable[Any]) -> list[Any]:
+    """Run the given awaitables concurrently and return their results (like `asyncio.gather()`).
+
+    In contrast to `asyncio.gather()`, all other awaitables are cancelled (and awaited) as soon as one fails,
+    so that none of them outlives the resources (e.g. temporary directories) of the caller.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
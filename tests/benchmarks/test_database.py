@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import os
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+from pydantic import SecretStr
+
+from foxops.database.engine import create_database_engine
+from foxops.database.repositories.change import ChangeRepository, ChangeType
+from foxops.database.schema import meta
+from foxops.settings import DatabaseSettings
+
+pytestmark = [pytest.mark.benchmark]
+
+#: Holds the number of reads per second foxops typically serves
+TYPICAL_READS_PER_SECOND = 200
+
+#: Holds the URL of a Postgres database to benchmark against (e.g. `postgresql+asyncpg://foxops@localhost/bench`).
+#  All tables of the database are dropped!
+POSTGRES_URL = os.environ.get("FOXOPS_BENCHMARK_POSTGRES_URL")
+
+#: Holds the logger which reports the latencies (shown with `--log-cli-level=INFO`)
+logger = logging.getLogger(__name__)
+
+
+async def read_latencies(settings: DatabaseSettings, incarnations: int) -> list[float]:
+    """Returns the latencies of one second worth of the typical read load, in milliseconds.
+
+    The reads are started evenly spread over the second, like the requests of the API would be.
+    """
+    engine = create_database_engine(settings)
+    async with engine.begin() as conn:
+        await conn.run_sync(meta.drop_all)
+        await conn.run_sync(meta.create_all)
+
+    change_repository = ChangeRepository(engine)
+    for i in range(incarnations):
+        await change_repository.create_incarnation_with_first_change(
+            f"incarnation-{i}", ".", "template", "commit", "template-commit", "v1", {}
+        )
+    # start with an idle pool, like after a quiet period
+    await engine.dispose()
+
+    async def read(i: int) -> float:
+        await asyncio.sleep(i / TYPICAL_READS_PER_SECOND)
+        start = time.perf_counter()
+        change = await change_repository.get_latest_change_with_incarnation(i % incarnations + 1)
+        assert change.type == ChangeType.DIRECT
+        return (time.perf_counter() - start) * 1000
+
+    latencies = await asyncio.gather(*[read(i) for i in range(TYPICAL_READS_PER_SECOND)])
+
+    async with engine.begin() as conn:
+        await conn.run_sync(meta.drop_all)
+    await engine.dispose()
+    return latencies
+
+
+def summary(latencies: list[float]) -> str:
+    percentiles = statistics.quantiles(latencies, n=100)
+    return f"p50 {percentiles[49]:.1f}ms, p95 {percentiles[94]:.1f}ms, max {max(latencies):.1f}ms"
+
+
+@pytest.mark.filterwarnings('ignore:directory "/var/run/secrets/foxops" does not exist')
+async def test_sqlite_serves_the_typical_read_load_with_and_without_pre_ping(tmp_path: Path):
+    # GIVEN
+    # SQLite ignores the pool settings, so only pre-ping can be compared
+    settings = {
+        pre_ping: DatabaseSettings(
+            url=SecretStr(f"sqlite+aiosqlite:///{tmp_path}/pre-ping-{pre_ping}.db"), pool_pre_ping=pre_ping
+        )
+        for pre_ping in (True, False)
+    }
+
+    # WHEN
+    latencies = {pre_ping: await read_latencies(s, incarnations=20) for pre_ping, s in settings.items()}
+
+    # THEN
+    for pre_ping, pre_ping_latencies in latencies.items():
+        logger.info(
+            f"SQLite, {TYPICAL_READS_PER_SECOND} reads/s with pre_ping={pre_ping}: {summary(pre_ping_latencies)}"
+        )
+
+
+@pytest.mark.skipif(POSTGRES_URL is None, reason="FOXOPS_BENCHMARK_POSTGRES_URL is not set")
+@pytest.mark.filterwarnings('ignore:directory "/var/run/secrets/foxops" does not exist')
+@pytest.mark.parametrize(
+    "pool_settings",
+    [
+        {"pool_size": 5, "max_overflow": 10, "pool_pre_ping": True},
+        {"pool_size": 5, "max_overflow": 10, "pool_pre_ping": False},
+        {"pool_size": 20, "max_overflow": 10, "pool_pre_ping": True},
+        {"pool_size": 5, "max_overflow": 0, "pool_pre_ping": True},
+    ],
+    ids=["defaults", "without-pre-ping", "larger-pool", "without-overflow"],
+)
+async def test_postgres_connection_pool_serves_the_typical_read_load(pool_settings: dict):
+    # GIVEN
+    assert POSTGRES_URL is not None
+    settings = DatabaseSettings(url=SecretStr(POSTGRES_URL), **pool_settings)
+
+    # WHEN
+    latencies = await read_latencies(settings, incarnations=20)
+
+    # THEN
+    assert len(latencies) == TYPICAL_READS_PER_SECOND
+    logger.info(f"Postgres, {TYPICAL_READS_PER_SECOND} reads/s with {pool_settings}: {summary(latencies)}")
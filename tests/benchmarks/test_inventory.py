@@ -0,0 +1,111 @@
+import logging
+import time
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from httpx import AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from foxops.database.repositories.change import ChangeType
+from foxops.database.schema import change, incarnations
+from foxops.responses import ORJSONResponse
+from foxops.services.change import IncarnationWithLatestChangeDetails
+
+pytestmark = [pytest.mark.benchmark]
+
+#: Holds the number of incarnations of a large inventory
+INVENTORY_SIZE = 10_000
+
+#: Holds the logger which reports the timings (shown with `--log-cli-level=INFO`)
+logger = logging.getLogger(__name__)
+
+
+async def create_inventory(engine: AsyncEngine, size: int) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(incarnations),
+            [
+                {
+                    "id": i,
+                    "incarnation_repository": f"incarnation-{i}",
+                    "target_directory": ".",
+                    "template_repository": "template",
+                }
+                for i in range(1, size + 1)
+            ],
+        )
+        await conn.execute(
+            insert(change),
+            [
+                {
+                    "incarnation_id": i,
+                    "revision": 1,
+                    "type": ChangeType.DIRECT.value,
+                    "created_at": datetime.now(timezone.utc),
+                    "updated_at": datetime.now(timezone.utc),
+                    "requested_version_hash": "template-commit",
+                    "requested_version": "v1",
+                    "requested_data": {},
+                    "commit_sha": "commit",
+                    "commit_pushed": True,
+                }
+                for i in range(1, size + 1)
+            ],
+        )
+
+
+async def test_list_incarnations_latency_with_a_large_inventory(
+    api_client: AsyncClient, test_async_engine: AsyncEngine
+):
+    # GIVEN
+    await create_inventory(test_async_engine, INVENTORY_SIZE)
+
+    # WHEN
+    start = time.perf_counter()
+    response = await api_client.get("/incarnations")
+    duration = time.perf_counter() - start
+
+    # THEN
+    assert response.status_code == 200
+    assert len(response.json()) == INVENTORY_SIZE
+    logger.info(f"listing {INVENTORY_SIZE} incarnations: {duration * 1000:.0f}ms")
+
+
+def test_orjson_response_renders_large_inventories_like_the_default_response():
+    # GIVEN
+    inventory = [
+        IncarnationWithLatestChangeDetails(
+            id=i,
+            incarnation_repository=f"incarnation-{i}",
+            target_directory=".",
+            template_repository="template",
+            revision=1,
+            type=ChangeType.DIRECT,
+            requested_version="v1",
+            created_at=datetime.now(timezone.utc),
+            commit_sha="commit",
+            commit_url=f"https://gitlab.example.com/incarnation-{i}/-/commit/commit",
+            merge_request_id=None,
+            merge_request_url=None,
+        )
+        for i in range(INVENTORY_SIZE)
+    ]
+
+    # WHEN
+    start = time.perf_counter()
+    default_body = JSONResponse(jsonable_encoder(inventory)).body
+    default_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    orjson_body = ORJSONResponse(inventory).body
+    orjson_duration = time.perf_counter() - start
+
+    # THEN
+    logger.info(
+        f"rendering {INVENTORY_SIZE} incarnations: {default_duration * 1000:.0f}ms with jsonable_encoder and json, "
+        f"{orjson_duration * 1000:.0f}ms with orjson"
+    )
+    assert orjson_body.replace(b" ", b"") == default_body.replace(b" ", b"")
@@ -0,0 +1,55 @@
+import logging
+import time
+from pathlib import Path
+
+import pytest
+
+from foxops.engine.rendering import compile_exclude_patterns
+
+pytestmark = [pytest.mark.benchmark]
+
+#: Holds the logger which reports the timings (shown with `--log-cli-level=INFO`)
+logger = logging.getLogger(__name__)
+
+PATTERNS = ["**/*.png", "**/*.jpg", "vendor/**/*", "docs/*.md", "*.lock", "**/fixtures/**/*.json"]
+
+
+def create_template_tree(root: Path, directories: int, files_per_directory: int) -> None:
+    for d in range(directories):
+        directory = root / f"module{d}" / "fixtures" / "nested"
+        directory.mkdir(parents=True)
+        for f in range(files_per_directory):
+            (directory / f"file{f}.{['json', 'png', 'txt'][f % 3]}").touch()
+
+
+def excluded_files_by_globbing(template_root_dir: Path, patterns: list[str]) -> set[Path]:
+    # the previous implementation: one full-tree traversal per pattern
+    files_to_render = set(template_root_dir.glob("**/*"))
+    for pattern in patterns:
+        files_to_render -= set(template_root_dir.glob(pattern))
+
+    return {p for p in template_root_dir.glob("**/*") if p.is_file()} - files_to_render
+
+
+@pytest.mark.parametrize("directories", [10, 100])
+def test_compiled_exclude_patterns_exclude_the_same_files_as_globbing(tmp_path: Path, directories: int):
+    # GIVEN
+    create_template_tree(tmp_path, directories=directories, files_per_directory=20)
+    all_files = [p.relative_to(tmp_path).as_posix() for p in tmp_path.glob("**/*") if p.is_file()]
+
+    # WHEN
+    start = time.perf_counter()
+    expected = excluded_files_by_globbing(tmp_path, PATTERNS)
+    glob_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    is_excluded = compile_exclude_patterns(tuple(PATTERNS))
+    matched = {tmp_path / p for p in all_files if is_excluded(p)}
+    matcher_duration = time.perf_counter() - start
+
+    # THEN
+    logger.info(
+        f"{len(all_files)} files, {len(PATTERNS)} patterns: "
+        f"glob {glob_duration * 1000:.1f}ms, compiled matcher {matcher_duration * 1000:.1f}ms"
+    )
+    assert matched == expected
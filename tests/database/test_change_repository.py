@@ -1,7 +1,10 @@
-import json
+from datetime import datetime, timezone
 
 import pytest
 from pytest import fixture
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 
 from foxops.database.repositories.change import (
     ChangeCommitAlreadyPushedError,
@@ -11,8 +14,10 @@ from foxops.database.repositories.change import (
     ChangeType,
     IncarnationHasNoChangesError,
 )
+from foxops.database.repositories.incarnation.errors import IncarnationNotFoundError
 from foxops.database.repositories.incarnation.model import IncarnationInDB
 from foxops.database.repositories.incarnation.repository import IncarnationRepository
+from foxops.database.schema import change
 
 
 @fixture(scope="function")
@@ -34,7 +39,7 @@ async def test_create_change_persists_all_data(change_repository: ChangeReposito
         commit_pushed=True,
         requested_version_hash="dummy template sha",
         requested_version="v99",
-        requested_data="dummy data (should be json)",
+        requested_data={"foo": "bar"},
         merge_request_id="123",
         merge_request_branch_name="mybranch",
     )
@@ -51,7 +56,7 @@ async def test_create_change_rejects_double_revision(change_repository: ChangeRe
         change_type=ChangeType.DIRECT,
         requested_version_hash="dummy template sha",
         requested_version="v2",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
         commit_sha="dummy sha",
         commit_pushed=False,
     )
@@ -64,7 +69,7 @@ async def test_create_change_rejects_double_revision(change_repository: ChangeRe
             change_type=ChangeType.DIRECT,
             requested_version_hash="dummy template sha2",
             requested_version="v3",
-            requested_data=json.dumps({"foo": "bar"}),
+            requested_data={"foo": "bar"},
             commit_sha="dummy sha",
             commit_pushed=False,
         )
@@ -88,7 +93,7 @@ async def test_get_latest_change_for_incarnation_succeeds(
         commit_pushed=True,
         requested_version_hash="dummy template sha",
         requested_version="v1",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
     await change_repository.create_change(
         incarnation_id=incarnation.id,
@@ -98,7 +103,7 @@ async def test_get_latest_change_for_incarnation_succeeds(
         commit_pushed=False,
         requested_version_hash="dummy template sha2",
         requested_version="v2",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
 
     # WHEN
@@ -116,6 +121,90 @@ async def test_get_latest_change_for_incarnation_throws_exception_when_no_change
         await change_repository.get_latest_change_for_incarnation(incarnation.id)
 
 
+async def test_get_latest_change_with_incarnation_succeeds_in_a_single_query(
+    change_repository: ChangeRepository, incarnation: IncarnationInDB, test_async_engine: AsyncEngine
+):
+    # GIVEN
+    for revision in (1, 2):
+        await change_repository.create_change(
+            incarnation_id=incarnation.id,
+            revision=revision,
+            change_type=ChangeType.DIRECT,
+            commit_sha=f"dummy sha{revision}",
+            commit_pushed=True,
+            requested_version_hash="dummy template sha",
+            requested_version=f"v{revision}",
+            requested_data={"foo": "bar"},
+        )
+    statements = []
+    event.listen(test_async_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    # WHEN
+    change = await change_repository.get_latest_change_with_incarnation(incarnation.id)
+
+    # THEN
+    assert change.revision == 2
+    assert change.incarnation_repository == incarnation.incarnation_repository
+    assert change.target_directory == incarnation.target_directory
+    assert len(statements) == 1
+
+
+async def test_get_latest_change_with_incarnation_distinguishes_missing_incarnations_and_changes(
+    change_repository: ChangeRepository, incarnation: IncarnationInDB
+):
+    # THEN
+    with pytest.raises(IncarnationHasNoChangesError):
+        await change_repository.get_latest_change_with_incarnation(incarnation.id)
+    with pytest.raises(IncarnationNotFoundError):
+        await change_repository.get_latest_change_with_incarnation(incarnation.id + 1)
+
+
+async def test_list_latest_changes_with_incarnation_succeeds_in_a_single_query(
+    change_repository: ChangeRepository,
+    incarnation_repository: IncarnationRepository,
+    incarnation: IncarnationInDB,
+    test_async_engine: AsyncEngine,
+):
+    # GIVEN
+    incarnation_without_changes = await incarnation_repository.create(
+        incarnation_repository="other",
+        target_directory="test",
+        template_repository="test",
+    )
+    for revision in (1, 2):
+        await change_repository.create_change(
+            incarnation_id=incarnation.id,
+            revision=revision,
+            change_type=ChangeType.DIRECT,
+            commit_sha=f"dummy sha{revision}",
+            commit_pushed=True,
+            requested_version_hash="dummy template sha",
+            requested_version=f"v{revision}",
+            requested_data={"foo": "bar"},
+        )
+    other_change = await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="another",
+        target_directory="test",
+        template_repository="test",
+        commit_sha="dummy sha",
+        requested_version_hash="dummy template sha",
+        requested_version="v1",
+        requested_data={},
+    )
+    statements = []
+    event.listen(test_async_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    # WHEN
+    changes = await change_repository.list_latest_changes_with_incarnation(
+        [other_change.incarnation_id, incarnation.id, incarnation_without_changes.id, 4711]
+    )
+
+    # THEN
+    assert [(c.incarnation_id, c.revision) for c in changes] == [(incarnation.id, 2), (other_change.incarnation_id, 1)]
+    assert changes[0].incarnation_repository == incarnation.incarnation_repository
+    assert len(statements) == 1
+
+
 async def test_list_incarnations_with_change_summary_returns_all_incarnations_with_latest_change_data(
     change_repository: ChangeRepository,
 ):
@@ -127,7 +216,7 @@ async def test_list_incarnations_with_change_summary_returns_all_incarnations_wi
         commit_sha="dummy sha",
         requested_version_hash="dummy template sha",
         requested_version="v1",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
     incarnation1_change2 = await change_repository.create_change(
         incarnation_id=incarnation1_change1.id,
@@ -137,7 +226,7 @@ async def test_list_incarnations_with_change_summary_returns_all_incarnations_wi
         commit_pushed=True,
         requested_version_hash="dummy template sha2",
         requested_version="v2",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
         merge_request_id="123",
         merge_request_branch_name="mybranch",
     )
@@ -149,7 +238,7 @@ async def test_list_incarnations_with_change_summary_returns_all_incarnations_wi
         commit_sha="dummy sha",
         requested_version_hash="dummy template sha",
         requested_version="v1",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
 
     # WHEN
@@ -170,6 +259,216 @@ async def test_list_incarnations_with_change_summary_returns_all_incarnations_wi
     assert incarnations[1].commit_sha == incarnation2_change1.commit_sha
 
 
+async def test_list_incarnations_with_change_summary_filters_by_template_data_of_latest_change(
+    change_repository: ChangeRepository,
+):
+    # GIVEN
+    outdated_change = await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="outdated",
+        target_directory="test",
+        template_repository="test-template",
+        commit_sha="dummy sha",
+        requested_version_hash="dummy template sha",
+        requested_version="v1",
+        requested_data={"foo": "bar", "color": "blue"},
+    )
+    await change_repository.create_change(
+        incarnation_id=outdated_change.incarnation_id,
+        revision=2,
+        change_type=ChangeType.DIRECT,
+        commit_sha="dummy sha2",
+        commit_pushed=True,
+        requested_version_hash="dummy template sha2",
+        requested_version="v2",
+        requested_data={"foo": "baz", "color": "blue"},
+    )
+    matching_change = await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="matching",
+        target_directory="test",
+        template_repository="test-template",
+        commit_sha="dummy sha",
+        requested_version_hash="dummy template sha",
+        requested_version="v1",
+        requested_data={"foo": "bar", "color": "blue"},
+    )
+    await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="other",
+        target_directory="test",
+        template_repository="test-template",
+        commit_sha="dummy sha",
+        requested_version_hash="dummy template sha",
+        requested_version="v1",
+        requested_data={"foo": "bar", "color": "red"},
+    )
+
+    # WHEN
+    incarnations = [
+        x
+        async for x in change_repository.list_incarnations_with_changes_summary(
+            template_data={"foo": "bar", "color": "blue"}
+        )
+    ]
+
+    # THEN
+    assert [i.id for i in incarnations] == [matching_change.incarnation_id]
+
+
+async def test_list_incarnations_with_change_summary_filters_by_the_text_of_non_string_template_data(
+    change_repository: ChangeRepository,
+):
+    # GIVEN
+    matching_change = await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="matching",
+        target_directory="test",
+        template_repository="test-template",
+        commit_sha="dummy sha",
+        requested_version_hash="dummy template sha",
+        requested_version="v1",
+        requested_data={"replicas": 3, "debug": True},
+    )
+    await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="other",
+        target_directory="test",
+        template_repository="test-template",
+        commit_sha="dummy sha",
+        requested_version_hash="dummy template sha",
+        requested_version="v1",
+        requested_data={"replicas": 30, "debug": True},
+    )
+
+    # WHEN
+    incarnations = [
+        x
+        async for x in change_repository.list_incarnations_with_changes_summary(
+            template_data={"replicas": "3", "debug": "true"}
+        )
+    ]
+
+    # THEN
+    assert [i.id for i in incarnations] == [matching_change.incarnation_id]
+
+
+def test_template_data_filter_uses_containment_queries_on_postgres():
+    # GIVEN
+    change_repository = ChangeRepository(create_async_engine("postgresql+asyncpg://localhost/foxops"))
+
+    # WHEN
+    query = change_repository._template_data_filter(change.c.requested_data, {"replicas": "3", "name": "foo"})
+
+    # THEN
+    compiled = query.compile(dialect=postgresql.dialect())
+    assert "->>" not in str(compiled)
+    assert str(compiled).count("@>") == 3
+    assert sorted(compiled.params.values(), key=repr) == [
+        {"name": "foo"},
+        {"replicas": "3"},
+        {"replicas": 3},
+    ]
+
+
+@fixture(scope="function")
+async def inventory(change_repository: ChangeRepository) -> None:
+    await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="direct",
+        target_directory=".",
+        template_repository="template-a",
+        commit_sha="dummy sha",
+        requested_version_hash="dummy template sha",
+        requested_version="v1.2.0",
+        requested_data={},
+    )
+
+    for incarnation_repository, template_repository, version, merge_request_id in [
+        ("merge-request", "template-a", "v1.10.0", "1"),
+        ("pending-merge-request", "template-b", "v2.0.0", None),
+    ]:
+        first_change = await change_repository.create_incarnation_with_first_change(
+            incarnation_repository=incarnation_repository,
+            target_directory=".",
+            template_repository=template_repository,
+            commit_sha="dummy sha",
+            requested_version_hash="dummy template sha",
+            requested_version="v1.0.0",
+            requested_data={},
+        )
+        await change_repository.create_change(
+            incarnation_id=first_change.incarnation_id,
+            revision=2,
+            change_type=ChangeType.MERGE_REQUEST,
+            commit_sha="dummy sha2",
+            commit_pushed=True,
+            requested_version_hash="dummy template sha2",
+            requested_version=version,
+            requested_data={},
+            merge_request_id=merge_request_id,
+            merge_request_branch_name="mybranch",
+        )
+
+
+@pytest.mark.parametrize(
+    "filters,expected_incarnation_repositories",
+    [
+        ({}, ["direct", "merge-request", "pending-merge-request"]),
+        ({"incarnation_repository": "direct", "target_directory": "."}, ["direct"]),
+        ({"incarnation_repository": "direct", "target_directory": "subdir"}, []),
+        ({"template_repository": "template-a"}, ["direct", "merge-request"]),
+        # only the latest change counts
+        ({"requested_version": "v1.0.0"}, []),
+        ({"requested_version": "v2.0.0"}, ["pending-merge-request"]),
+        ({"requested_version_prefix": "v1."}, ["direct", "merge-request"]),
+        ({"requested_version_prefix": "v1_"}, []),
+        ({"change_type": ChangeType.DIRECT}, ["direct"]),
+        ({"has_merge_request": True}, ["merge-request"]),
+        ({"has_merge_request": False}, ["direct", "pending-merge-request"]),
+        ({"change_type": ChangeType.MERGE_REQUEST, "has_merge_request": False}, ["pending-merge-request"]),
+    ],
+)
+async def test_list_incarnations_with_change_summary_filters_by_latest_change(
+    change_repository: ChangeRepository,
+    inventory: None,
+    filters: dict,
+    expected_incarnation_repositories: list[str],
+):
+    # WHEN
+    incarnations = [x async for x in change_repository.list_incarnations_with_changes_summary(**filters)]
+
+    # THEN
+    assert [i.incarnation_repository for i in incarnations] == expected_incarnation_repositories
+
+
+async def test_list_incarnations_with_change_summary_filters_by_creation_time_of_latest_change(
+    change_repository: ChangeRepository,
+):
+    # GIVEN
+    await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="old",
+        target_directory=".",
+        template_repository="template",
+        commit_sha="dummy sha",
+        requested_version_hash="dummy template sha",
+        requested_version="v1",
+        requested_data={},
+    )
+    cutoff = datetime.now(timezone.utc)
+    await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="new",
+        target_directory=".",
+        template_repository="template",
+        commit_sha="dummy sha",
+        requested_version_hash="dummy template sha",
+        requested_version="v1",
+        requested_data={},
+    )
+
+    # WHEN
+    old = [x async for x in change_repository.list_incarnations_with_changes_summary(created_before=cutoff)]
+    new = [x async for x in change_repository.list_incarnations_with_changes_summary(created_after=cutoff)]
+
+    # THEN
+    assert [i.incarnation_repository for i in old] == ["old"]
+    assert [i.incarnation_repository for i in new] == ["new"]
+
+
 async def test_update_change_commit_pushed_succeeds(change_repository: ChangeRepository, incarnation: IncarnationInDB):
     # GIVEN
     change = await change_repository.create_change(
@@ -180,7 +479,7 @@ async def test_update_change_commit_pushed_succeeds(change_repository: ChangeRep
         commit_pushed=False,
         requested_version_hash="dummy template sha",
         requested_version="v1",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
 
     # WHEN
@@ -201,7 +500,7 @@ async def test_update_change_commit_sha_succeeds(change_repository: ChangeReposi
         commit_pushed=False,
         requested_version_hash="dummy template sha",
         requested_version="v1",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
 
     # WHEN
@@ -224,7 +523,7 @@ async def test_update_change_commit_sha_fails_when_commit_is_already_pushed(
         commit_pushed=True,
         requested_version_hash="dummy template sha",
         requested_version="v1",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
 
     # WHEN
@@ -242,7 +541,7 @@ async def test_delete_change_succeeds_in_deleting(change_repository: ChangeRepos
         commit_pushed=False,
         requested_version_hash="dummy template sha",
         requested_version="v1",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
 
     # WHEN
@@ -268,7 +567,7 @@ async def test_create_incarnation_with_first_change(change_repository: ChangeRep
         commit_sha="commit_sha",
         requested_version_hash="dummy template sha",
         requested_version="v1",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
 
     # THEN
@@ -277,7 +576,7 @@ async def test_create_incarnation_with_first_change(change_repository: ChangeRep
     assert change.type == ChangeType.DIRECT
     assert change.revision == 1
     assert change.requested_version == "v1"
-    assert json.loads(change.requested_data) == {"foo": "bar"}
+    assert change.requested_data == {"foo": "bar"}
     assert change.commit_sha == "commit_sha"
     assert change.commit_pushed is False
 
@@ -291,7 +590,7 @@ async def test_delete_incarnation_also_deletes_associated_changes(change_reposit
         commit_sha="commit_sha",
         requested_version_hash="dummy template sha",
         requested_version="v1",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
     incarnation_id = change.incarnation_id
 
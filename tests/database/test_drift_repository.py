@@ -0,0 +1,72 @@
+import pytest
+from pytest import fixture
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from foxops.database.repositories.drift import (
+    DriftRepository,
+    IncarnationDriftNotFoundError,
+)
+from foxops.database.repositories.incarnation.model import IncarnationInDB
+from foxops.database.repositories.incarnation.repository import IncarnationRepository
+
+
+@fixture(scope="function")
+def drift_repository(test_async_engine: AsyncEngine) -> DriftRepository:
+    return DriftRepository(test_async_engine)
+
+
+@fixture(scope="function")
+async def incarnation(incarnation_repository: IncarnationRepository) -> IncarnationInDB:
+    return await incarnation_repository.create(
+        incarnation_repository="test",
+        target_directory="test",
+        template_repository="test",
+    )
+
+
+async def test_save_replaces_the_previous_scan(drift_repository: DriftRepository, incarnation: IncarnationInDB):
+    # GIVEN
+    await drift_repository.save(incarnation.id, "sha1", "template-sha", ["added.txt"], [], [])
+
+    # WHEN
+    drift = await drift_repository.save(incarnation.id, "sha2", "template-sha", [], [], [])
+
+    # THEN
+    assert drift == await drift_repository.get(incarnation.id)
+    assert drift.incarnation_commit_sha == "sha2"
+    assert not drift.drifted
+    assert [d.incarnation_id async for d in drift_repository.list()] == [incarnation.id]
+
+
+async def test_list_filters_by_drift(drift_repository: DriftRepository, incarnation_repository: IncarnationRepository):
+    # GIVEN
+    pristine = await incarnation_repository.create("pristine", ".", "template")
+    drifted = await incarnation_repository.create("drifted", ".", "template")
+    await drift_repository.save(pristine.id, "sha", "template-sha", [], [], [])
+    await drift_repository.save(drifted.id, "sha", "template-sha", [], ["README.md"], [])
+
+    # WHEN
+    drifted_ids = [d.incarnation_id async for d in drift_repository.list(drifted=True)]
+
+    # THEN
+    assert drifted_ids == [drifted.id]
+
+
+async def test_get_raises_if_incarnation_was_not_scanned(
+    drift_repository: DriftRepository, incarnation: IncarnationInDB
+):
+    with pytest.raises(IncarnationDriftNotFoundError):
+        await drift_repository.get(incarnation.id)
+
+
+async def test_scans_are_deleted_with_their_incarnation(
+    drift_repository: DriftRepository, incarnation_repository: IncarnationRepository, incarnation: IncarnationInDB
+):
+    # GIVEN
+    await drift_repository.save(incarnation.id, "sha", "template-sha", [], [], [])
+
+    # WHEN
+    await incarnation_repository.delete_by_id(incarnation.id)
+
+    # THEN
+    assert await drift_repository.get_or_none(incarnation.id) is None
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from pytest import fixture
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from foxops.database.repositories.lease import LeaseRepository
+
+
+@fixture(scope="function")
+def lease_repository(test_async_engine: AsyncEngine) -> LeaseRepository:
+    return LeaseRepository(test_async_engine)
+
+
+async def test_acquire_grants_the_lease_to_one_holder_at_a_time(lease_repository: LeaseRepository):
+    # GIVEN
+    assert await lease_repository.acquire("job", "replica-1", timedelta(minutes=1))
+
+    # THEN
+    assert not await lease_repository.acquire("job", "replica-2", timedelta(minutes=1))
+    assert await lease_repository.acquire("job", "replica-1", timedelta(minutes=1))
+    assert await lease_repository.acquire("other-job", "replica-2", timedelta(minutes=1))
+
+
+async def test_acquire_takes_over_an_expired_lease(lease_repository: LeaseRepository):
+    # GIVEN
+    assert await lease_repository.acquire("job", "replica-1", timedelta(seconds=-1))
+
+    # THEN
+    assert await lease_repository.acquire("job", "replica-2", timedelta(minutes=1))
+    assert not await lease_repository.acquire("job", "replica-1", timedelta(minutes=1))
+
+
+async def test_release_frees_the_lease_only_for_its_holder(lease_repository: LeaseRepository):
+    # GIVEN
+    assert await lease_repository.acquire("job", "replica-1", timedelta(minutes=1))
+
+    # WHEN
+    await lease_repository.release("job", "replica-2")
+
+    # THEN
+    assert not await lease_repository.acquire("job", "replica-2", timedelta(minutes=1))
+
+    # WHEN
+    await lease_repository.release("job", "replica-1")
+
+    # THEN
+    assert await lease_repository.acquire("job", "replica-2", timedelta(minutes=1))
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from foxops.database.repositories.incarnation.repository import IncarnationRepository
+from foxops.database.schema import meta
+from foxops.database.unit_of_work import read_your_writes, unit_of_work
+
+
+async def test_repository_calls_within_a_unit_of_work_share_its_connection(
+    test_async_engine: AsyncEngine, incarnation_repository: IncarnationRepository
+):
+    # WHEN
+    async with unit_of_work(test_async_engine) as conn:
+        incarnation = await incarnation_repository.create("repo", ".", "template")
+        async with unit_of_work(test_async_engine) as nested_conn:
+            assert nested_conn is conn
+
+    # THEN
+    assert await incarnation_repository.get_by_id(incarnation.id) == incarnation
+
+
+async def test_unit_of_work_rolls_back_all_repository_calls_on_error(
+    test_async_engine: AsyncEngine, incarnation_repository: IncarnationRepository
+):
+    # WHEN
+    with pytest.raises(RuntimeError):
+        async with unit_of_work(test_async_engine):
+            await incarnation_repository.create("repo", ".", "template")
+            raise RuntimeError("boom")
+
+    # THEN
+    assert [i async for i in incarnation_repository.list()] == []
+
+
+async def test_unit_of_work_is_not_shared_with_other_tasks(test_async_engine: AsyncEngine):
+    # GIVEN
+    async def connection_of_task():
+        async with unit_of_work(test_async_engine) as conn:
+            return conn
+
+    # WHEN
+    async with unit_of_work(test_async_engine) as conn:
+        task_conn = await asyncio.create_task(connection_of_task())
+
+    # THEN
+    assert task_conn is not conn
+
+
+@pytest.fixture
+async def replica_engine():
+    # a separate, empty database - like a replica that didn't receive any of the writes yet
+    engine = create_async_engine("sqlite+aiosqlite://", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(meta.create_all)
+    yield engine
+    await engine.dispose()
+
+
+async def test_reads_only_go_to_the_replica_within_a_read_your_writes_block(
+    test_async_engine: AsyncEngine, replica_engine: AsyncEngine
+):
+    # GIVEN
+    await IncarnationRepository(test_async_engine).create("repo", ".", "template")
+    incarnation_repository = IncarnationRepository(test_async_engine, replica_engine)
+
+    # WHEN
+    with read_your_writes():
+        incarnations_from_replica = [i async for i in incarnation_repository.list()]
+    incarnations_from_primary = [i async for i in incarnation_repository.list()]
+
+    # THEN
+    assert incarnations_from_replica == []
+    assert len(incarnations_from_primary) == 1
+
+
+async def test_reads_go_to_the_primary_once_it_was_used_within_a_read_your_writes_block(
+    test_async_engine: AsyncEngine, replica_engine: AsyncEngine
+):
+    # GIVEN
+    incarnation_repository = IncarnationRepository(test_async_engine, replica_engine)
+
+    with read_your_writes():
+        # WHEN
+        incarnation = await incarnation_repository.create("repo", ".", "template")
+
+        # THEN
+        assert await incarnation_repository.get_by_id(incarnation.id) == incarnation
+        assert await asyncio.create_task(incarnation_repository.get_by_id(incarnation.id)) == incarnation
@@ -78,7 +78,7 @@ async def assert_update_merge_request_with_conflicts_exists(
 
     assert merge_request["title"].startswith("🚧 - CONFLICT: Update to")
 
-    # Assert that there is a rejection file in the Merge Request changes
+    # Assert that the conflicts are marked in the files in the Merge Request changes
     response = await gitlab_test_client.get(
         f"/projects/{quote_plus(repository)}/merge_requests/{merge_request['iid']}/changes"
     )
@@ -87,8 +87,8 @@ async def assert_update_merge_request_with_conflicts_exists(
 
     for f in files_with_conflicts:
         assert any(
-            c["new_path"] == f"{f}.rej" and c["new_file"] for c in changes
-        ), f"No rejection file found for file {f}"
+            c["new_path"] == f and "+<<<<<<< incarnation" in c["diff"] for c in changes
+        ), f"No conflict markers found in file {f}"
 
     assert all(f"- {f}" in merge_request["description"] for f in files_with_conflicts)
 
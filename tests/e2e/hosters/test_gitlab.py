@@ -12,7 +12,7 @@ from tenacity.wait import wait_fixed
 
 from foxops.hosters import Hoster, ReconciliationStatus
 from foxops.hosters.gitlab import GitLab
-from foxops.hosters.types import MergeRequestStatus
+from foxops.hosters.types import ChangeStatusQuery, MergeRequestStatus
 
 # mark all tests in this module as e2e
 pytestmark = pytest.mark.e2e
@@ -352,3 +352,41 @@ async def should_return_failed_reconciliation_status_for_closed_merge_request(
 
     # THEN
     assert status == ReconciliationStatus.FAILED
+
+
+async def should_return_the_statuses_of_many_changes_in_a_batch(
+    test_gitlab_hoster: Hoster, gitlab_test_client: AsyncClient, test_repository: RepositoryTestData
+):
+    # GIVEN
+    response = await gitlab_test_client.get(
+        f"/projects/{test_repository.project['id']}/repository/commits/{test_repository.commit_sha_main}"
+    )
+    response.raise_for_status()
+    commit_sha_main = response.json()["id"]
+
+    response = await gitlab_test_client.post(
+        f"/projects/{test_repository.project['id']}/merge_requests",
+        json={
+            "source_branch": "without-pipeline",
+            "target_branch": test_repository.project["default_branch"],
+            "title": "Some merge request",
+        },
+    )
+    response.raise_for_status()
+    merge_request = response.json()
+
+    # WHEN
+    statuses = await test_gitlab_hoster.get_change_statuses(
+        [
+            ChangeStatusQuery(test_repository.project["path_with_namespace"], commit_sha_main, None),
+            ChangeStatusQuery(
+                test_repository.project["path_with_namespace"], merge_request["sha"], str(merge_request["iid"])
+            ),
+        ]
+    )
+
+    # THEN
+    assert statuses == [
+        (ReconciliationStatus.SUCCESS, None),
+        (ReconciliationStatus.PENDING, MergeRequestStatus.OPEN),
+    ]
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+from foxops.engine.fvars import read_variables_from_fvars_file
+
+
+def test_read_variables_from_fvars_file_returns_independent_copies_of_cached_variables(tmp_path: Path):
+    # GIVEN
+    (tmp_path / "default.fvars").write_text("name=Jon\nage=18\n")
+
+    # WHEN
+    first = read_variables_from_fvars_file(tmp_path / "default.fvars")
+    first["name"] = "Jane"  # type: ignore
+    second = read_variables_from_fvars_file(tmp_path / "default.fvars")
+
+    # THEN
+    assert second == {"name": "Jon", "age": "18"}
+
+
+def test_read_variables_from_fvars_file_reads_changed_content(tmp_path: Path):
+    # GIVEN
+    (tmp_path / "default.fvars").write_text("name=Jon\n")
+    read_variables_from_fvars_file(tmp_path / "default.fvars")
+
+    # WHEN
+    (tmp_path / "default.fvars").write_text("name=Jane\n")
+    variables = read_variables_from_fvars_file(tmp_path / "default.fvars")
+
+    # THEN
+    assert variables == {"name": "Jane"}
@@ -0,0 +1,50 @@
+import pytest
+
+from foxops.engine.patching.merge3 import merge3
+
+BASE = b"a\nb\nc\nd\ne\n"
+
+
+@pytest.mark.parametrize(
+    "ours,theirs,expected",
+    [
+        pytest.param(BASE, b"a\nB\nc\nd\ne\n", b"a\nB\nc\nd\ne\n", id="only-theirs-changed"),
+        pytest.param(b"a\nB\nc\nd\ne\n", BASE, b"a\nB\nc\nd\ne\n", id="only-ours-changed"),
+        pytest.param(b"A\nb\nc\nd\ne\n", b"a\nb\nc\nd\nE\n", b"A\nb\nc\nd\nE\n", id="different-lines-changed"),
+        pytest.param(b"a\nB\nc\nd\ne\n", b"a\nB\nc\nd\nE\n", b"a\nB\nc\nd\nE\n", id="same-change-on-both-sides"),
+        pytest.param(b"a\nc\nd\ne\n", b"a\nb\nc\nd\ne\nf\n", b"a\nc\nd\ne\nf\n", id="deletion-and-addition"),
+    ],
+)
+def test_merge3_merges_non_overlapping_changes(ours: bytes, theirs: bytes, expected: bytes):
+    # WHEN
+    result = merge3(BASE, ours, theirs)
+
+    # THEN
+    assert result.conflicts == 0
+    assert result.content == expected
+
+
+def test_merge3_marks_overlapping_changes_with_diff3_conflict_markers():
+    # WHEN
+    result = merge3(BASE, b"a\nX\nc\nd\ne\n", b"a\nY\nc\nd\nE\n")
+
+    # THEN
+    assert result.conflicts == 1
+    assert result.content == b"a\n<<<<<<< ours\nX\n||||||| base\nb\n=======\nY\n>>>>>>> theirs\nc\nd\nE\n"
+
+
+def test_merge3_starts_conflict_markers_on_a_new_line():
+    # WHEN
+    result = merge3(b"a\n", b"a\nours", b"a\ntheirs")
+
+    # THEN
+    assert result.conflicts == 1
+    assert result.content == b"a\n<<<<<<< ours\nours\n||||||| base\n=======\ntheirs\n>>>>>>> theirs\n"
+
+
+def test_merge3_preserves_line_endings():
+    # WHEN
+    result = merge3(b"a\r\nb\r\nc\r\n", b"A\r\nb\r\nc\r\n", b"a\r\nb\r\nC\r\n")
+
+    # THEN
+    assert result.content == b"A\r\nb\r\nC\r\n"
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+from foxops.engine.models import TemplateConfig, load_template_config
+
+
+def test_load_template_config_returns_the_default_config_if_the_file_does_not_exist(tmp_path: Path):
+    # WHEN
+    template_config = load_template_config(tmp_path / "fengine.yaml")
+
+    # THEN
+    assert template_config == TemplateConfig()
+
+
+def test_load_template_config_reuses_parsed_configs_with_the_same_content(tmp_path: Path):
+    # GIVEN
+    content = "variables:\n  name:\n    type: str\n    description: the name\n    default: yes\n"
+    (tmp_path / "a.yaml").write_text(content)
+    (tmp_path / "b.yaml").write_text(content)
+    (tmp_path / "c.yaml").write_text(content.replace("yes", "no"))
+
+    # WHEN
+    a = load_template_config(tmp_path / "a.yaml")
+    b = load_template_config(tmp_path / "b.yaml")
+    c = load_template_config(tmp_path / "c.yaml")
+
+    # THEN
+    assert a is b
+    assert a.variables["name"].default == "yes"
+    assert c.variables["name"].default == "no"
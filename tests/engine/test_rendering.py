@@ -1,3 +1,4 @@
+import asyncio
 import stat
 from pathlib import Path
 from tempfile import TemporaryDirectory
@@ -5,12 +6,15 @@ from tempfile import TemporaryDirectory
 import jinja2
 import pytest
 
+from foxops.engine import rendering
 from foxops.engine.rendering import (
+    compile_exclude_patterns,
     create_template_environment,
     render_template,
     render_template_file,
     render_template_symlink,
 )
+from foxops.utils import LoopLocal
 
 
 def supports_symlink_permissions():
@@ -183,6 +187,32 @@ async def test_rendering_an_entire_template_directory_with_excluded_file(
     assert (incarnation_dir / "code.c").read_text() == "Hello World"
 
 
+async def test_rendering_an_entire_template_directory_copies_excluded_files_byte_by_byte(
+    tmp_path: Path,
+):
+    # GIVEN
+    template_dir = tmp_path / "template"
+    template_dir.mkdir()
+    binary_content = bytes(range(256)) * 1024
+    (template_dir / "logo.png").write_bytes(binary_content)
+    (template_dir / "windows.bat").write_bytes(b"echo {{ data }}\r\n")
+
+    incarnation_dir = tmp_path / "incarnation"
+    incarnation_dir.mkdir()
+
+    # WHEN
+    await render_template(
+        template_dir,
+        incarnation_dir,
+        {"data": "Hello World"},
+        rendering_filename_exclude_patterns=["logo.png", "windows.bat"],
+    )
+
+    # THEN
+    assert (incarnation_dir / "logo.png").read_bytes() == binary_content
+    assert (incarnation_dir / "windows.bat").read_bytes() == b"echo {{ data }}\r\n"
+
+
 async def test_rendering_an_entire_template_directory_with_excluded_file_in_rendered_subdir(
     tmp_path: Path,
 ):
@@ -376,3 +406,71 @@ async def test_availability_of_custom_filters(tmp_path: Path, orig: str, stateme
     )
     # THEN
     assert (incarnation_dir / "template.txt").read_text() == expected
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "README.md",
+        "*.md",
+        "**/*.md",
+        "docs/*",
+        "docs/**/*.png",
+        "**/assets/**/*",
+        "docs/**",
+        "docs/",
+        "./docs/*.md",
+        "docs/[a-c]*.md",
+        "docs/[!a-c]*.md",
+        ".hidden*",
+        "**/file?.txt",
+        "docs/../README.md",
+    ],
+)
+def test_compile_exclude_patterns_matches_the_same_files_as_pathlib_glob(tmp_path: Path, pattern: str):
+    # GIVEN
+    for path in [
+        "README.md",
+        ".hidden-file",
+        "docs/architecture.md",
+        "docs/usage.md",
+        "docs/images/logo.png",
+        "docs/images/assets/icon.png",
+        "src/assets/nested/deep/file1.txt",
+        "src/file2.txt",
+        "src/README.md",
+    ]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text("content")
+
+    all_files = {p for p in tmp_path.glob("**/*") if p.is_file()}
+
+    # WHEN
+    is_excluded = compile_exclude_patterns((pattern,))
+
+    # THEN
+    expected = {p for p in tmp_path.glob(pattern) if p in all_files}
+    assert {p for p in all_files if is_excluded(p.relative_to(tmp_path).as_posix())} == expected
+
+
+async def test_render_template_limits_the_number_of_concurrent_renders(tmp_path: Path, monkeypatch):
+    # GIVEN
+    monkeypatch.setattr(rendering, "_render_semaphore", LoopLocal(lambda: asyncio.Semaphore(2)))
+
+    running = 0
+    max_running = 0
+
+    async def _render_template(*args, **kwargs):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    monkeypatch.setattr(rendering, "_render_template", _render_template)
+
+    # WHEN
+    await asyncio.gather(*[render_template(tmp_path, tmp_path / str(i), {}, []) for i in range(5)])
+
+    # THEN
+    assert max_running == 2
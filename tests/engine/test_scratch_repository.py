@@ -0,0 +1,126 @@
+import asyncio
+import shutil
+from pathlib import Path
+
+from foxops.engine.patching.git_diff_patch import diff
+from foxops.engine.patching.scratch_repository import ScratchRepositoryPool
+from foxops.utils import check_call
+
+
+async def test_diff_is_identical_to_a_diff_between_commits_of_a_fresh_repository(tmp_path: Path):
+    # GIVEN
+    old_directory = tmp_path / "old"
+    (old_directory / "subdir").mkdir(parents=True)
+    (old_directory / "README.md").write_text("Hello, world!\n")
+    (old_directory / "subdir" / "deleted.txt").write_text("bye\n")
+    (old_directory / ".gitignore").write_text("*.log\n")
+    new_directory = tmp_path / "new"
+    shutil.copytree(old_directory, new_directory)
+    (new_directory / "README.md").write_text("Hello, world!\nand more\n")
+    (new_directory / "subdir" / "deleted.txt").unlink()
+    (new_directory / "subdir" / "added.txt").write_text("no trailing newline")
+    (new_directory / "debug.log").write_text("ignored")
+
+    repository = tmp_path / "repository"
+    repository.mkdir()
+    await check_call("git", "init", "--initial-branch", "main", cwd=repository)
+    for branch, directory in [("old", old_directory), ("new", new_directory)]:
+        await check_call("git", "switch", "--orphan", branch, cwd=repository)
+        shutil.copytree(directory, repository, dirs_exist_ok=True)
+        await check_call("git", "add", ".", cwd=repository)
+        await check_call(
+            "git", "-c", "user.name=test", "-c", "user.email=test@local", "commit", "-m", branch, cwd=repository
+        )
+    proc = await check_call("git", "--no-pager", "diff", "old..new", cwd=repository)
+    expected_diff = (await proc.stdout.read()).decode()  # type: ignore
+
+    # WHEN
+    patch_path = await diff(old_directory, new_directory)
+
+    # THEN
+    assert patch_path is not None
+    assert patch_path.read_text() == expected_diff
+    patch_path.unlink()
+
+
+async def test_pool_reuses_slots_and_never_exceeds_its_size(tmp_path: Path):
+    # GIVEN
+    pool = ScratchRepositoryPool(max_size=2)
+    (tmp_path / "file.txt").write_text("content")
+    max_in_use = 0
+
+    async def use_slot():
+        nonlocal max_in_use
+        async with pool.acquire() as slot:
+            max_in_use = max(max_in_use, pool._in_use)
+            await slot.write_tree(tmp_path)
+            return slot
+
+    # WHEN
+    slots = await asyncio.gather(*[use_slot() for _ in range(6)])
+
+    # THEN
+    assert max_in_use == 2
+    assert len({id(s) for s in slots}) == 2
+    pool.close()
+
+
+async def test_pool_restores_a_broken_object_store(tmp_path: Path):
+    # GIVEN
+    pool = ScratchRepositoryPool(max_size=1)
+    (tmp_path / "file.txt").write_text("content")
+    async with pool.acquire() as slot:
+        tree = await slot.write_tree(tmp_path)
+    assert pool.git_dir is not None
+    shutil.rmtree(pool.git_dir / "objects")
+
+    # WHEN
+    async with pool.acquire() as slot:
+        restored_tree = await slot.write_tree(tmp_path)
+
+    # THEN
+    assert restored_tree == tree
+    pool.close()
+
+
+async def test_pool_recycles_the_object_store_once_idle(tmp_path: Path):
+    # GIVEN
+    pool = ScratchRepositoryPool(max_size=1, recycle_after=2)
+    (tmp_path / "file.txt").write_text("content")
+    async with pool.acquire() as slot:
+        await slot.write_tree(tmp_path)
+    git_dir = pool.git_dir
+    assert git_dir is not None
+
+    # WHEN
+    async with pool.acquire() as slot:
+        await slot.write_tree(tmp_path)
+
+    # THEN
+    assert pool.git_dir is None
+    assert not git_dir.exists()
+
+
+async def test_pool_rotates_the_object_store_while_it_is_in_use(tmp_path: Path):
+    # GIVEN
+    pool = ScratchRepositoryPool(max_size=2, recycle_after=1)
+    (tmp_path / "file.txt").write_text("content")
+
+    async with pool.acquire() as old_slot:
+        old_git_dir = pool.git_dir
+        async with pool.acquire() as slot:
+            await slot.write_tree(tmp_path)
+
+        # WHEN
+        async with pool.acquire() as new_slot:
+            new_git_dir = pool.git_dir
+            tree = await new_slot.write_tree(tmp_path)
+
+            # THEN
+            assert new_git_dir != old_git_dir
+            assert new_slot.git_dir == new_git_dir
+            assert old_git_dir is not None and old_git_dir.exists()
+            assert await old_slot.write_tree(tmp_path) == tree
+
+    assert not old_git_dir.exists()
+    pool.close()
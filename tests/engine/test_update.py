@@ -3,8 +3,15 @@ from pathlib import Path
 
 import pytest
 
+import foxops.engine.initialization
 from foxops import utils
-from foxops.engine import diff_and_patch, initialize_incarnation, update_incarnation
+from foxops.engine import (
+    diff_and_patch,
+    initialize_incarnation,
+    update_incarnation,
+    update_incarnation_from_git_template_repository,
+)
+from foxops.engine.patching.patch_cache import PatchCache
 
 
 async def init_repository(repository_dir: Path) -> None:
@@ -249,13 +256,91 @@ r2 {...}
 
 
 @pytest.mark.parametrize("diff_patch_func", [diff_and_patch])
-async def test_diff_and_patch_conflict_for_nearby_changes_in_template_and_incarnation(
+async def test_diff_and_patch_conflict_for_overlapping_changes_in_template_and_incarnation(
     diff_patch_func,
     tmp_path,
 ):
     """
     Verify that a conflict is detected when updating to a template version
-    which contains a change nearby a change in the incarnation.
+    which changes the same line as the incarnation.
+    """
+    # GIVEN
+    template_directory = tmp_path / "template"
+    template_directory.mkdir()
+
+    (template_directory / "template").mkdir()
+    (template_directory / "template" / "myfile.txt").write_text(
+        """a
+b
+c
+"""
+    )
+    await init_repository(tmp_path)
+    incarnation_directory = tmp_path / "incarnation"
+    incarnation_directory.mkdir()
+
+    incarnation_state = await initialize_incarnation(
+        template_root_dir=template_directory,
+        template_repository="any-repository-url",
+        template_repository_version="any-version",
+        template_data={},
+        incarnation_root_dir=incarnation_directory,
+    )
+
+    # WHEN
+    # same line changed in template and incarnation
+    updated_template_directory = tmp_path / "updated-template"
+    shutil.copytree(template_directory, updated_template_directory)
+    (updated_template_directory / "template" / "myfile.txt").write_text(
+        """a
+b
+a
+"""
+    )
+    (incarnation_directory / "myfile.txt").write_text(
+        """a
+b
+d
+"""
+    )
+    await init_repository(incarnation_directory)
+
+    # WHEN
+    update_performed, _, patch_result = await update_incarnation(
+        original_template_root_dir=template_directory,
+        updated_template_root_dir=updated_template_directory,
+        updated_template_repository_version=incarnation_state.template_repository_version,
+        updated_template_data=incarnation_state.template_data,
+        incarnation_root_dir=incarnation_directory,
+        diff_patch_func=diff_patch_func,
+    )
+
+    # THEN
+    assert update_performed is True
+    assert Path("myfile.txt") in patch_result.conflicts
+    assert not (incarnation_directory / "myfile.txt.rej").exists()
+    assert (incarnation_directory / "myfile.txt").read_text() == (
+        """a
+b
+<<<<<<< incarnation
+d
+||||||| template (old)
+c
+=======
+a
+>>>>>>> template (new)
+"""
+    )
+
+
+@pytest.mark.parametrize("diff_patch_func", [diff_and_patch])
+async def test_diff_and_patch_merges_nearby_changes_in_template_and_incarnation(
+    diff_patch_func,
+    tmp_path,
+):
+    """
+    Verify that changes are merged when updating to a template version
+    which contains a change nearby (but not overlapping) a change in the incarnation.
     """
     # GIVEN
     template_directory = tmp_path / "template"
@@ -310,7 +395,14 @@ c
 
     # THEN
     assert update_performed is True
-    assert Path("myfile.txt") in patch_result.conflicts
+    assert patch_result.conflicts == []
+    assert not (incarnation_directory / "myfile.txt.rej").exists()
+    assert (incarnation_directory / "myfile.txt").read_text() == (
+        """c
+b
+a
+"""
+    )
 
 
 @pytest.mark.parametrize("diff_patch_func", [diff_and_patch])
@@ -569,3 +661,217 @@ async def test_diff_and_patch_success_when_changed_file_is_deleted_in_incarnatio
     assert (incarnation_directory / "myfile1.txt").exists()
     assert not (incarnation_directory / "myfile2.txt").exists()
     # `git apply --reject` does not keep .rej files when the target file was deleted (unfortunately)
+
+
+async def test_diff_and_patch_fixes_rejected_hunks_which_were_already_applied_in_the_incarnation(tmp_path: Path):
+    # GIVEN
+    lines = [f"line {i}" for i in range(1, 21)]
+    old_directory = tmp_path / "old"
+    old_directory.mkdir()
+    (old_directory / "file.txt").write_text("\n".join(lines) + "\n")
+    (old_directory / "other.txt").write_text("\n".join(lines) + "\n")
+    to_patch_directory = tmp_path / "to_patch"
+    shutil.copytree(old_directory, to_patch_directory)
+    await init_repository(to_patch_directory)
+
+    new_directory = tmp_path / "new"
+    shutil.copytree(old_directory, new_directory)
+    # same change in the template and the incarnation, which differ in other places though
+    (new_directory / "file.txt").write_text("\n".join(["line 1", "changed"] + lines[2:]) + "\n")
+    (to_patch_directory / "file.txt").write_text("\n".join(["line 1", "changed"] + lines[2:18] + ["x", "y"]) + "\n")
+    # one already applied and one conflicting change
+    (new_directory / "other.txt").write_text("\n".join(["line 1", "changed"] + lines[2:18] + ["a", "b"]) + "\n")
+    (to_patch_directory / "other.txt").write_text("\n".join(["line 1", "changed"] + lines[2:18] + ["x", "y"]) + "\n")
+
+    # WHEN
+    patch_result = await diff_and_patch(
+        diff_a_directory=old_directory,
+        diff_b_directory=new_directory,
+        patch_directory=to_patch_directory,
+    )
+
+    # THEN
+    assert patch_result is not None
+    assert patch_result.conflicts == [Path("other.txt")]
+    assert not (to_patch_directory / "file.txt.rej").exists()
+    assert not (to_patch_directory / "other.txt.rej").exists()
+    assert (to_patch_directory / "other.txt").read_text() == "\n".join(
+        ["line 1", "changed"]
+        + lines[2:18]
+        + ["<<<<<<< incarnation", "x", "y", "||||||| template (old)"]
+        + lines[18:]
+        + ["=======", "a", "b", ">>>>>>> template (new)"]
+    ) + "\n"
+
+
+async def test_update_incarnation_from_git_template_repository_only_renders_files_affected_by_changed_data(
+    tmp_path: Path, mocker
+):
+    # GIVEN
+    template_directory = tmp_path / "template"
+    template_directory.mkdir()
+    (template_directory / "fengine.yaml").write_text(
+        """
+variables:
+  author:
+    type: str
+    description: dummy
+  package:
+    type: str
+    description: dummy
+"""
+    )
+    (template_directory / "template").mkdir()
+    (template_directory / "template" / "AUTHORS").write_text("{{ author }}\n")
+    (template_directory / "template" / "{{ package }}.py").write_text("print('hello')\n")
+    (template_directory / "template" / "README.md").write_text("Package: {{ package }}\n")
+    await init_repository(template_directory)
+    await utils.check_call("git", "tag", "v1.0.0", cwd=template_directory)
+
+    incarnation_directory = tmp_path / "incarnation"
+    incarnation_directory.mkdir()
+    await initialize_incarnation(
+        template_root_dir=template_directory,
+        template_repository="any-repository-url",
+        template_repository_version="v1.0.0",
+        template_data={"author": "Jon", "package": "foo"},
+        incarnation_root_dir=incarnation_directory,
+    )
+    (incarnation_directory / "AUTHORS").write_text("Jon\ncustomized\n")
+    await init_repository(incarnation_directory)
+
+    render_template_spy = mocker.spy(foxops.engine.initialization, "render_template")
+
+    # WHEN
+    update_performed, incarnation_state, patch_result = await update_incarnation_from_git_template_repository(
+        template_git_repository=template_directory,
+        update_template_repository_version="v1.0.0",
+        update_template_data={"author": "Jon", "package": "bar"},
+        incarnation_root_dir=incarnation_directory,
+        diff_patch_func=diff_and_patch,
+    )
+
+    # THEN
+    assert update_performed
+    assert patch_result is not None and not patch_result.has_errors()
+    assert incarnation_state.template_data == {"author": "Jon", "package": "bar"}
+
+    assert (incarnation_directory / "AUTHORS").read_text() == "Jon\ncustomized\n"
+    assert not (incarnation_directory / "foo.py").exists()
+    assert (incarnation_directory / "bar.py").read_text() == "print('hello')\n"
+    assert (incarnation_directory / "README.md").read_text() == "Package: bar\n"
+
+    assert render_template_spy.call_count == 2
+    for call in render_template_spy.call_args_list:
+        assert call.kwargs["only_paths"] == {Path("{{ package }}.py"), Path("README.md")}
+
+
+async def test_update_incarnation_from_git_template_repository_renders_each_transition_once_with_patch_cache(
+    tmp_path: Path, mocker
+):
+    # GIVEN
+    template_directory = tmp_path / "template"
+    (template_directory / "template").mkdir(parents=True)
+    (template_directory / "fengine.yaml").write_text("variables: {}\n")
+    (template_directory / "template" / "README.md").write_text("a\nb\nc\n")
+    await init_repository(template_directory)
+    await utils.check_call("git", "tag", "v1.0.0", cwd=template_directory)
+    (template_directory / "template" / "README.md").write_text("a\nb\nC\n")
+    await utils.check_call("git", "commit", "-am", "v2", cwd=template_directory)
+    await utils.check_call("git", "tag", "v2.0.0", cwd=template_directory)
+    await utils.check_call("git", "checkout", "v1.0.0", cwd=template_directory)
+
+    incarnation_directories = [tmp_path / f"incarnation-{i}" for i in range(3)]
+    for incarnation_directory in incarnation_directories:
+        incarnation_directory.mkdir()
+        await initialize_incarnation(
+            template_root_dir=template_directory,
+            template_repository="any-repository-url",
+            template_repository_version="v1.0.0",
+            template_data={},
+            incarnation_root_dir=incarnation_directory,
+        )
+        await init_repository(incarnation_directory)
+    # the last incarnation has a conflicting change
+    (incarnation_directories[2] / "README.md").write_text("a\nb\nX\n")
+    await utils.check_call("git", "commit", "-am", "customized", cwd=incarnation_directories[2])
+
+    render_template_spy = mocker.spy(foxops.engine.initialization, "render_template")
+    patch_cache = PatchCache()
+
+    # WHEN
+    results = [
+        await update_incarnation_from_git_template_repository(
+            template_git_repository=template_directory,
+            update_template_repository_version="v2.0.0",
+            update_template_data={},
+            incarnation_root_dir=incarnation_directory,
+            diff_patch_func=diff_and_patch,
+            patch_cache=patch_cache,
+        )
+        for incarnation_directory in incarnation_directories
+    ]
+
+    # THEN
+    for incarnation_directory, (update_performed, incarnation_state, patch_result) in zip(
+        incarnation_directories[:2], results[:2]
+    ):
+        assert update_performed
+        assert patch_result is not None and not patch_result.has_errors()
+        assert incarnation_state.template_repository_version == "v2.0.0"
+        assert (incarnation_directory / "README.md").read_text() == "a\nb\nC\n"
+        assert "template_repository_version: v2.0.0" in (incarnation_directory / ".fengine.yaml").read_text()
+
+    update_performed, _, patch_result = results[2]
+    assert update_performed
+    assert patch_result is not None and patch_result.conflicts == [Path("README.md")]
+
+    # once for the cached patch and once for the conflict resolution of the last incarnation
+    assert render_template_spy.call_count == 4
+
+
+async def test_update_incarnation_from_git_template_repository_resolves_conflicts_on_the_renderings_of_a_new_patch(
+    tmp_path: Path, mocker
+):
+    # GIVEN
+    template_directory = tmp_path / "template"
+    (template_directory / "template").mkdir(parents=True)
+    (template_directory / "fengine.yaml").write_text("variables: {}\n")
+    (template_directory / "template" / "README.md").write_text("a\nb\nc\n")
+    await init_repository(template_directory)
+    await utils.check_call("git", "tag", "v1.0.0", cwd=template_directory)
+    (template_directory / "template" / "README.md").write_text("a\nb\nC\n")
+    await utils.check_call("git", "commit", "-am", "v2", cwd=template_directory)
+    await utils.check_call("git", "tag", "v2.0.0", cwd=template_directory)
+    await utils.check_call("git", "checkout", "v1.0.0", cwd=template_directory)
+
+    incarnation_directory = tmp_path / "incarnation"
+    incarnation_directory.mkdir()
+    await initialize_incarnation(
+        template_root_dir=template_directory,
+        template_repository="any-repository-url",
+        template_repository_version="v1.0.0",
+        template_data={},
+        incarnation_root_dir=incarnation_directory,
+    )
+    (incarnation_directory / "README.md").write_text("a\nb\nX\n")
+    await init_repository(incarnation_directory)
+
+    render_template_spy = mocker.spy(foxops.engine.initialization, "render_template")
+
+    # WHEN
+    update_performed, incarnation_state, patch_result = await update_incarnation_from_git_template_repository(
+        template_git_repository=template_directory,
+        update_template_repository_version="v2.0.0",
+        update_template_data={},
+        incarnation_root_dir=incarnation_directory,
+        diff_patch_func=diff_and_patch,
+        patch_cache=PatchCache(),
+    )
+
+    # THEN
+    assert update_performed
+    assert incarnation_state.template_repository_version == "v2.0.0"
+    assert patch_result is not None and patch_result.conflicts == [Path("README.md")]
+    # the pristine and the updated incarnation, rendered only once
+    assert render_template_spy.call_count == 2
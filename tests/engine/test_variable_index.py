@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from foxops.engine.variable_index import build_variable_index
+
+
+def test_build_variable_index_collects_variables_of_contents_and_paths(tmp_path: Path):
+    # GIVEN
+    (tmp_path / "README.md").write_text("# {{ name }} by {{ author.name | upper }}")
+    (tmp_path / "{{ package }}").mkdir()
+    (tmp_path / "{{ package }}" / "__init__.py").write_text("{% set v = version %}{{ v }}")
+    (tmp_path / "static.txt").write_text("no variables")
+
+    # WHEN
+    index = build_variable_index(tmp_path, rendering_filename_exclude_patterns=[])
+
+    # THEN
+    assert index.dependencies == {
+        Path("README.md"): {"name", "author"},
+        Path("{{ package }}/__init__.py"): {"package", "version"},
+        Path("static.txt"): set(),
+    }
+
+
+def test_build_variable_index_follows_includes_and_imports(tmp_path: Path):
+    # GIVEN
+    (tmp_path / "partials").mkdir()
+    (tmp_path / "partials" / "header.txt").write_text("{{ title }}{% include 'partials/footer.txt' %}")
+    (tmp_path / "partials" / "footer.txt").write_text("{{ footer }}")
+    (tmp_path / "partials" / "macros.txt").write_text("{% macro greet() %}{{ greeting }}{% endmacro %}")
+    (tmp_path / "page.txt").write_text(
+        "{% include 'partials/header.txt' %}{% from 'partials/macros.txt' import greet %}{{ greet() }}{{ body }}"
+    )
+
+    # WHEN
+    index = build_variable_index(tmp_path, rendering_filename_exclude_patterns=[])
+
+    # THEN
+    assert index.dependencies[Path("page.txt")] == {"title", "footer", "greeting", "body"}
+
+
+def test_build_variable_index_marks_dynamic_includes_as_depending_on_everything(tmp_path: Path):
+    # GIVEN
+    (tmp_path / "page.txt").write_text("{% include 'partials/' ~ flavor ~ '.txt' %}")
+    (tmp_path / "other.txt").write_text("{{ other }}")
+
+    # WHEN
+    index = build_variable_index(tmp_path, rendering_filename_exclude_patterns=[])
+
+    # THEN
+    assert index.dependencies[Path("page.txt")] is None
+    assert index.paths_affected_by({"unrelated"}) == {Path("page.txt")}
+    assert index.paths_affected_by({"other"}) == {Path("page.txt"), Path("other.txt")}
+
+
+def test_build_variable_index_ignores_contents_of_excluded_files_and_symlinks(tmp_path: Path):
+    # GIVEN
+    (tmp_path / "{{ name }}.bin").write_text("{{ not a variable }}")
+    (tmp_path / "link").symlink_to("{{ target }}.txt")
+
+    # WHEN
+    index = build_variable_index(tmp_path, rendering_filename_exclude_patterns=["*.bin"])
+
+    # THEN
+    assert index.dependencies == {
+        Path("{{ name }}.bin"): {"name"},
+        Path("link"): {"target"},
+    }
@@ -1,11 +1,13 @@
 import pytest
 
+import foxops.external.git
 from foxops.external.git import (
     GitError,
     GitRepository,
     add_authentication_to_git_clone_url,
     git_exec,
 )
+from foxops.utils import SubprocessKind
 
 
 async def test_git_exec_throws_exception_on_nonzero_exit_code():
@@ -17,6 +19,42 @@ async def test_git_exec_throws_exception_on_nonzero_exit_code():
         await git_exec(*git_args)
 
 
+async def test_git_exec_schedules_network_and_local_commands_separately(tmp_path, mocker):
+    # GIVEN
+    check_call_spy = mocker.spy(foxops.external.git, "check_call")
+
+    # WHEN
+    await git_exec("init", cwd=tmp_path, queue_key="my-repository")
+    await git_exec("ls-remote", ".", cwd=tmp_path, queue_key="my-repository")
+
+    # THEN
+    assert [c.kwargs["kind"] for c in check_call_spy.call_args_list] == [SubprocessKind.LOCAL, SubprocessKind.NETWORK]
+    assert {c.kwargs["queue_key"] for c in check_call_spy.call_args_list} == {"my-repository"}
+
+
+async def test_diff_is_scheduled_like_all_other_git_commands(tmp_path, mocker):
+    # GIVEN
+    (tmp_path / "testfile").write_text("hello")
+
+    repo = GitRepository(tmp_path, queue_key="my-repository")
+    await repo._run("init")
+    await repo._run("config", "user.name", "Test User")
+    await repo._run("config", "user.email", "testuser@local")
+    await repo.commit_all("initial commit")
+    (tmp_path / "testfile").write_text("hello world")
+    await repo.commit_all("second commit")
+    check_call_spy = mocker.spy(foxops.external.git, "check_call")
+
+    # WHEN
+    diff = await repo.diff("HEAD~1", "HEAD")
+
+    # THEN
+    assert "+hello world" in diff
+    check_call_spy.assert_called_once()
+    assert check_call_spy.call_args.kwargs["kind"] == SubprocessKind.LOCAL
+    assert check_call_spy.call_args.kwargs["queue_key"] == "my-repository"
+
+
 async def test_has_any_commits_returns_false_if_there_are_no_commits(tmp_path):
     # GIVEN
     repo = GitRepository(tmp_path)
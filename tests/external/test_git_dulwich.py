@@ -0,0 +1,247 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from foxops.external.git import GitError, GitRepository, open_git_repository
+from foxops.settings import GitBackend
+from foxops.utils import check_call
+
+pytest.importorskip("dulwich")
+
+from foxops.external.git_dulwich import DulwichGitRepository  # noqa: E402
+
+BACKENDS = [GitBackend.CLI, GitBackend.DULWICH]
+
+
+async def init_repository(directory: Path) -> GitRepository:
+    directory.mkdir(parents=True, exist_ok=True)
+    await check_call("git", "init", "--initial-branch", "main", cwd=directory)
+    await check_call("git", "config", "user.name", "Test User", cwd=directory)
+    await check_call("git", "config", "user.email", "testuser@local", cwd=directory)
+
+    return GitRepository(directory)
+
+
+async def tree_of(repo: GitRepository, ref: str = "HEAD") -> str:
+    proc = await repo._run("rev-parse", f"{ref}^{{tree}}")
+    return (await proc.stdout.read()).decode().strip()  # type: ignore
+
+
+def write_sample_content(directory: Path) -> None:
+    (directory / "README.md").write_text("Hello, world!\n")
+    (directory / "subdir").mkdir(exist_ok=True)
+    (directory / "subdir" / "script.sh").write_text("#!/bin/sh\necho hi\n")
+    (directory / "subdir" / "script.sh").chmod(0o755)
+    if not (directory / "link").is_symlink():
+        (directory / "link").symlink_to("README.md")
+
+
+@pytest.fixture
+async def repositories(tmp_path: Path) -> dict[GitBackend, GitRepository]:
+    repositories = {}
+    for backend in BACKENDS:
+        directory = tmp_path / backend.value
+        await init_repository(directory)
+        repositories[backend] = open_git_repository(directory, backend=backend)
+
+    return repositories
+
+
+def test_open_git_repository_returns_implementation_of_requested_backend(tmp_path: Path):
+    assert type(open_git_repository(tmp_path, backend=GitBackend.CLI)) is GitRepository
+    assert type(open_git_repository(tmp_path, backend=GitBackend.DULWICH)) is DulwichGitRepository
+
+
+async def test_commit_all_creates_identical_trees_in_all_backends(repositories: dict[GitBackend, GitRepository]):
+    # GIVEN
+    for repo in repositories.values():
+        write_sample_content(repo.directory)
+        (repo.directory / "to-be-deleted.txt").write_text("bye")
+        await repo.commit_all("initial commit")
+
+    # WHEN
+    for repo in repositories.values():
+        (repo.directory / "README.md").write_text("Hello, changed world!\n")
+        (repo.directory / "to-be-deleted.txt").unlink()
+        (repo.directory / "new-file.txt").write_text("new")
+        await repo.commit_all("second commit")
+
+    # THEN
+    cli_tree = await tree_of(repositories[GitBackend.CLI])
+    dulwich_tree = await tree_of(repositories[GitBackend.DULWICH])
+    assert cli_tree == dulwich_tree
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_commit_all_respects_gitignore(backend: GitBackend, repositories: dict[GitBackend, GitRepository]):
+    # GIVEN
+    repo = repositories[backend]
+    (repo.directory / ".gitignore").write_text("*.log\n")
+    (repo.directory / "debug.log").write_text("noise")
+    (repo.directory / "README.md").write_text("content")
+
+    # WHEN
+    await repo.commit_all("initial commit")
+
+    # THEN
+    proc = await repo._run("ls-files")
+    assert (await proc.stdout.read()).decode().splitlines() == [".gitignore", "README.md"]  # type: ignore
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_commit_all_fails_when_there_is_nothing_to_commit(
+    backend: GitBackend, repositories: dict[GitBackend, GitRepository]
+):
+    # GIVEN
+    repo = repositories[backend]
+    write_sample_content(repo.directory)
+    await repo.commit_all("initial commit")
+
+    # THEN
+    with pytest.raises(GitError):
+        await repo.commit_all("empty commit")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_has_uncommitted_changes_detects_all_kinds_of_changes(
+    backend: GitBackend, repositories: dict[GitBackend, GitRepository]
+):
+    # GIVEN
+    repo = repositories[backend]
+    write_sample_content(repo.directory)
+    await repo.commit_all("initial commit")
+    assert await repo.has_uncommitted_changes() is False
+
+    # THEN
+    (repo.directory / "untracked.txt").write_text("new")
+    assert await repo.has_uncommitted_changes() is True
+    (repo.directory / "untracked.txt").unlink()
+
+    (repo.directory / "README.md").write_text("modified")
+    assert await repo.has_uncommitted_changes() is True
+    await repo._run("checkout", "--", "README.md")
+
+    (repo.directory / "subdir" / "script.sh").unlink()
+    assert await repo.has_uncommitted_changes() is True
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_create_and_checkout_branch_switches_the_current_branch(
+    backend: GitBackend, repositories: dict[GitBackend, GitRepository]
+):
+    # GIVEN
+    repo = repositories[backend]
+    write_sample_content(repo.directory)
+    await repo.commit_all("initial commit")
+    head = await repo.head()
+
+    # WHEN
+    await repo.create_and_checkout_branch("foxops/update-to-v1.0.0")
+
+    # THEN
+    assert await repo.current_branch() == "foxops/update-to-v1.0.0"
+    assert await repo.head() == head
+    assert await repo.has_uncommitted_changes() is False
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_create_and_checkout_branch_fails_for_existing_branch_unless_exist_ok(
+    backend: GitBackend, repositories: dict[GitBackend, GitRepository]
+):
+    # GIVEN
+    repo = repositories[backend]
+    write_sample_content(repo.directory)
+    await repo.commit_all("initial commit")
+    await repo.create_and_checkout_branch("feature")
+    (repo.directory / "README.md").write_text("feature content")
+    await repo.commit_all("feature commit")
+    await repo.checkout_branch("main")
+
+    # THEN
+    with pytest.raises(GitError):
+        await repo.create_and_checkout_branch("feature")
+
+    await repo.create_and_checkout_branch("feature", exist_ok=True)
+    assert await repo.current_branch() == "feature"
+    assert (repo.directory / "README.md").read_text() == "feature content"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_commit_related_queries(backend: GitBackend, repositories: dict[GitBackend, GitRepository]):
+    # GIVEN
+    repo = repositories[backend]
+    assert await repo.has_any_commits() is False
+
+    write_sample_content(repo.directory)
+    await repo.commit_all("initial commit")
+    first_commit = await repo.head()
+    await repo.tag("v1.0.0")
+
+    (repo.directory / "other.txt").write_text("other")
+    await repo.commit_all("second commit")
+
+    # THEN
+    assert await repo.has_any_commits() is True
+    assert await repo.has_commit(first_commit) is True
+    assert await repo.has_commit("0" * 40) is False
+    assert await repo.last_commit_id_that_changed_file("README.md") == first_commit
+    assert await repo.last_commit_id_that_changed_file(str(repo.directory / "README.md")) == first_commit
+    assert await repo.current_branch() == "main"
+
+    proc = await repo._run("rev-parse", "v1.0.0")
+    assert (await proc.stdout.read()).decode().strip() == first_commit  # type: ignore
+
+    with pytest.raises(GitError):
+        await repo.tag("v1.0.0")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+async def test_diff_can_be_applied_to_reproduce_the_new_state(
+    backend: GitBackend, repositories: dict[GitBackend, GitRepository], tmp_path: Path
+):
+    # GIVEN
+    repo = repositories[backend]
+    write_sample_content(repo.directory)
+    (repo.directory / "to-be-deleted.txt").write_text("bye\n")
+    await repo.commit_all("initial commit")
+    await repo.create_and_checkout_branch("new")
+    (repo.directory / "README.md").write_text("Hello, world!\nand more\n")
+    (repo.directory / "to-be-deleted.txt").unlink()
+    (repo.directory / "subdir" / "new-file.txt").write_text("no trailing newline")
+    (repo.directory / "subdir" / "script.sh").chmod(0o644)
+    await repo.commit_all("new commit")
+
+    # WHEN
+    diff_output = await repo.diff("main", "new")
+
+    # THEN
+    patch_path = tmp_path / "changes.patch"
+    patch_path.write_text(diff_output)
+    await repo.checkout_branch("main")
+    await repo._run("apply", "--index", str(patch_path))
+    assert await tree_of(repo, "new") == (await (await repo._run("write-tree")).stdout.read()).decode().strip()  # type: ignore
+
+
+async def test_diff_is_empty_for_identical_commits_in_all_backends(repositories: dict[GitBackend, GitRepository]):
+    for repo in repositories.values():
+        write_sample_content(repo.directory)
+        await repo.commit_all("initial commit")
+        await repo.tag("same")
+
+        assert await repo.diff("main", "same") == ""
+
+
+async def test_dulwich_repository_reads_the_head_of_a_worktree(tmp_path: Path):
+    # GIVEN
+    repo = await init_repository(tmp_path / "repo")
+    write_sample_content(repo.directory)
+    await repo.commit_all("initial commit")
+    await repo._run("worktree", "add", str(tmp_path / "worktree"), await repo.head())
+
+    # WHEN
+    worktree = DulwichGitRepository(tmp_path / "worktree")
+
+    # THEN
+    assert await worktree.head() == await repo.head()
+    assert os.path.isfile(tmp_path / "worktree" / ".git")
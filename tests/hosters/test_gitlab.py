@@ -0,0 +1,116 @@
+import json
+
+import httpx
+
+from foxops.hosters.gitlab import GitLab
+from foxops.hosters.types import (
+    ChangeStatusQuery,
+    MergeRequestStatus,
+    ReconciliationStatus,
+)
+
+
+def gitlab_with_graphql_projects(projects: dict[str, dict]) -> tuple[GitLab, list[dict]]:
+    """Returns a GitLab hoster whose GraphQL API answers project lookups from the given projects.
+
+    Every project has `merge_requests` by iid and `pipelines` (a list of statuses, newest first) by commit sha.
+    """
+    requests: list[dict] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/graphql"
+        body = json.loads(request.content)
+        requests.append(body)
+
+        data: dict[str, dict | None] = {}
+        variables = body["variables"]
+        i = 0
+        while f"project{i}" in variables:
+            project = projects.get(variables[f"project{i}"])
+            argument = variables[f"argument{i}"]
+            if project is None:
+                data[f"p{i}"] = None
+            elif f"p{i}: project(fullPath: $project{i}) {{ mergeRequest" in body["query"]:
+                data[f"p{i}"] = {"mergeRequest": project["merge_requests"].get(argument)}
+            else:
+                statuses = project["pipelines"].get(argument, [])
+                data[f"p{i}"] = {"pipelines": {"nodes": [{"status": status} for status in statuses]}}
+            i += 1
+
+        return httpx.Response(200, json={"data": data})
+
+    gitlab = GitLab("https://gitlab.example.com", "token")
+    gitlab.client = httpx.AsyncClient(base_url=gitlab.api_address, transport=httpx.MockTransport(handle))
+    return gitlab, requests
+
+
+def merge_request(
+    state: str, merge_status: str = "CAN_BE_MERGED", head_pipeline: str | None = None, merge_commit: str | None = None
+) -> dict:
+    return {
+        "state": state,
+        "mergeStatusEnum": merge_status,
+        "mergeCommitSha": merge_commit,
+        "diffHeadSha": "head",
+        "headPipeline": None if head_pipeline is None else {"status": head_pipeline},
+    }
+
+
+async def test_get_change_statuses_looks_up_the_statuses_of_many_changes_in_few_requests():
+    # GIVEN
+    gitlab, requests = gitlab_with_graphql_projects(
+        {
+            "incarnation": {
+                "merge_requests": {
+                    "1": merge_request("opened", head_pipeline="FAILED"),
+                    "2": merge_request("opened", merge_status="CANNOT_BE_MERGED"),
+                    "3": merge_request("opened", head_pipeline="RUNNING"),
+                    "4": merge_request("merged", merge_commit="merge-commit"),
+                    "5": merge_request("closed"),
+                },
+                "pipelines": {"succeeded": ["SUCCESS", "FAILED"], "merge-commit": ["RUNNING"]},
+            },
+        }
+    )
+
+    # WHEN
+    statuses = await gitlab.get_change_statuses(
+        [
+            ChangeStatusQuery("incarnation", "succeeded", None),
+            ChangeStatusQuery("incarnation", "without-pipeline", None),
+            ChangeStatusQuery("incarnation", "commit", "1"),
+            ChangeStatusQuery("incarnation", "commit", "2"),
+            ChangeStatusQuery("incarnation", "commit", "3"),
+            ChangeStatusQuery("incarnation", "commit", "4"),
+            ChangeStatusQuery("incarnation", "commit", "5"),
+            ChangeStatusQuery("incarnation", "commit", "6"),
+            ChangeStatusQuery("unknown", "commit", None),
+        ]
+    )
+
+    # THEN
+    assert statuses == [
+        (ReconciliationStatus.SUCCESS, None),
+        (ReconciliationStatus.SUCCESS, None),
+        (ReconciliationStatus.FAILED, MergeRequestStatus.OPEN),
+        (ReconciliationStatus.FAILED, MergeRequestStatus.OPEN),
+        (ReconciliationStatus.PENDING, MergeRequestStatus.OPEN),
+        (ReconciliationStatus.PENDING, MergeRequestStatus.MERGED),
+        (ReconciliationStatus.FAILED, MergeRequestStatus.CLOSED),
+        (ReconciliationStatus.FAILED, MergeRequestStatus.CLOSED),
+        (ReconciliationStatus.UNKNOWN, None),
+    ]
+    # one request for the changes, one for the merge commit of the merged merge request
+    assert len(requests) == 2
+
+
+async def test_get_change_statuses_splits_large_lookups_into_batches():
+    # GIVEN
+    gitlab, requests = gitlab_with_graphql_projects({"incarnation": {"merge_requests": {}, "pipelines": {}}})
+
+    # WHEN
+    statuses = await gitlab.get_change_statuses([ChangeStatusQuery("incarnation", f"{i}", None) for i in range(45)])
+
+    # THEN
+    assert statuses == [(ReconciliationStatus.SUCCESS, None)] * 45
+    assert [len(r["variables"]) // 2 for r in requests] == [20, 20, 5]
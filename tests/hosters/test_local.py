@@ -4,6 +4,7 @@ import pytest
 from pytest import fixture
 
 from foxops.engine import IncarnationState, save_incarnation_state
+from foxops.external.git import RevisionKind
 from foxops.hosters.local import LocalHoster
 from foxops.hosters.types import MergeRequestStatus
 
@@ -265,3 +266,25 @@ async def test_get_incarnation_state_returns_none_if_incarnation_does_not_exist(
 
     # THEN
     assert state is None
+
+
+async def test_resolve_revision_returns_commit_sha_of_branches_and_tags(local_hoster):
+    # GIVEN
+    repo_name = "test-repository"
+    await local_hoster.create_repository(repo_name)
+    async with local_hoster.cloned_repository(repo_name) as repo:
+        (repo.directory / "README.md").write_text("Hello, world!")
+        await repo.commit_all("Initial commit")
+        first_commit_sha = await repo.head()
+        await repo._run("tag", "--annotate", "--message", "annotated", "v1.0.0")
+
+        (repo.directory / "README.md").write_text("Hello, world2!")
+        await repo.commit_all("update")
+        second_commit_sha = await repo.head()
+        await repo.push(tags=True)
+
+    # THEN
+    assert await local_hoster.resolve_revision(repo_name, "main") == (second_commit_sha, RevisionKind.BRANCH)
+    assert await local_hoster.resolve_revision(repo_name, "v1.0.0") == (first_commit_sha, RevisionKind.TAG)
+    assert await local_hoster.resolve_revision(repo_name, first_commit_sha) == (first_commit_sha, RevisionKind.COMMIT)
+    assert await local_hoster.resolve_revision(repo_name, "does-not-exist") is None
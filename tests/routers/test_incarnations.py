@@ -1,18 +1,31 @@
-import json
+import asyncio
 from datetime import datetime
 from http import HTTPStatus
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock
 
 import pytest
 from fastapi import FastAPI
 from httpx import AsyncClient
 from pytest_mock import MockFixture
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
 
 from foxops.database.repositories.change import ChangeRepository
 from foxops.database.repositories.incarnation.repository import IncarnationRepository
-from foxops.dependencies import get_change_service
+from foxops.dependencies import get_change_service, get_change_status_cache, get_hoster
+from foxops.external.git import RevisionNotFoundError
+from foxops.hosters import Hoster
+from foxops.hosters.types import ReconciliationStatus
 from foxops.models.change import Change
+from foxops.routers.incarnations import _server_sent_events
 from foxops.services.change import ChangeService, IncarnationAlreadyExists
+from foxops.services.events import (
+    ChangeEvent,
+    ChangeEventType,
+    EventBus,
+    StatusRefresher,
+)
+from foxops.services.status import ChangeStatusCache
 
 pytestmark = [pytest.mark.api]
 
@@ -74,7 +87,7 @@ async def test_api_get_incarnations_returns_incarnations_from_inventory(
         commit_sha="commit_sha",
         requested_version="v1.0",
         requested_version_hash="template_commit_sha",
-        requested_data=json.dumps({"foo": "bar"}),
+        requested_data={"foo": "bar"},
     )
 
     # WHEN
@@ -96,10 +109,197 @@ async def test_api_get_incarnations_returns_incarnations_from_inventory(
             "requested_version": "v1.0",
             "revision": 1,
             "type": "direct",
+            "status": None,
+            "merge_request_status": None,
         }
     ]
 
 
+async def test_api_get_incarnations_filters_incarnations_from_inventory(
+    api_client: AsyncClient,
+    change_repository: ChangeRepository,
+):
+    # GIVEN
+    for incarnation_repository, requested_version in [("old", "v1.0"), ("new", "v2.0")]:
+        await change_repository.create_incarnation_with_first_change(
+            incarnation_repository=incarnation_repository,
+            target_directory="test",
+            template_repository="template",
+            commit_sha="commit_sha",
+            requested_version=requested_version,
+            requested_version_hash="template_commit_sha",
+            requested_data={},
+        )
+
+    # WHEN
+    response = await api_client.get(
+        "/incarnations",
+        params={"template_repository": "template", "requested_version_prefix": "v1.", "change_type": "direct"},
+    )
+
+    # THEN
+    assert response.status_code == HTTPStatus.OK
+    assert [i["incarnation_repository"] for i in response.json()] == ["old"]
+
+
+async def test_api_get_incarnations_returns_not_modified_for_the_current_etag(
+    api_client: AsyncClient,
+    change_repository: ChangeRepository,
+):
+    # GIVEN
+    await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="test",
+        target_directory="test",
+        template_repository="template",
+        commit_sha="commit_sha",
+        requested_version="v1.0",
+        requested_version_hash="template_commit_sha",
+        requested_data={},
+    )
+    etag = (await api_client.get("/incarnations")).headers["ETag"]
+
+    # WHEN
+    not_modified_response = await api_client.get("/incarnations", headers={"If-None-Match": etag})
+    await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="test2",
+        target_directory="test",
+        template_repository="template",
+        commit_sha="commit_sha",
+        requested_version="v1.0",
+        requested_version_hash="template_commit_sha",
+        requested_data={},
+    )
+    modified_response = await api_client.get("/incarnations", headers={"If-None-Match": etag})
+
+    # THEN
+    assert not_modified_response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not_modified_response.headers["ETag"] == etag
+    assert not_modified_response.content == b""
+    assert modified_response.status_code == HTTPStatus.OK
+    assert modified_response.headers["ETag"] != etag
+    assert len(modified_response.json()) == 2
+
+
+async def test_api_get_incarnation_returns_not_modified_without_asking_the_hoster(
+    api_client: AsyncClient,
+    app: FastAPI,
+    change_repository: ChangeRepository,
+    test_async_engine: AsyncEngine,
+):
+    # GIVEN
+    hoster = Mock(spec=Hoster)
+    hoster.get_reconciliation_status = AsyncMock(return_value=ReconciliationStatus.SUCCESS)
+    hoster.get_commit_url = AsyncMock(return_value="https://nonsense.com/test/-/commit/commit_sha")
+    app.dependency_overrides[get_hoster] = lambda: hoster
+    status_cache = ChangeStatusCache()
+    app.dependency_overrides[get_change_status_cache] = lambda: status_cache
+
+    change = await change_repository.create_incarnation_with_first_change(
+        incarnation_repository="test",
+        target_directory="test",
+        template_repository="template",
+        commit_sha="commit_sha",
+        requested_version="v1.0",
+        requested_version_hash="template_commit_sha",
+        requested_data={},
+    )
+    await change_repository.update_commit_pushed(change.id, True)
+    etag = (await api_client.get(f"/incarnations/{change.incarnation_id}")).headers["ETag"]
+    hoster.reset_mock()
+    statements = []
+    event.listen(test_async_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    # WHEN
+    response = await api_client.get(f"/incarnations/{change.incarnation_id}", headers={"If-None-Match": etag})
+
+    # THEN
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    hoster.get_reconciliation_status.assert_not_called()
+    hoster.get_commit_url.assert_not_called()
+    assert len(statements) == 1
+
+
+async def test_api_search_incarnations_returns_incarnations_with_matching_template_data(
+    api_client: AsyncClient,
+    change_repository: ChangeRepository,
+):
+    # GIVEN
+    for incarnation_repository, color in [("blue", "blue"), ("red", "red")]:
+        await change_repository.create_incarnation_with_first_change(
+            incarnation_repository=incarnation_repository,
+            target_directory="test",
+            template_repository="template",
+            commit_sha="commit_sha",
+            requested_version="v1.0",
+            requested_version_hash="template_commit_sha",
+            requested_data={"color": color, "url": "https://example.com/?a=b"},
+        )
+
+    # WHEN
+    response = await api_client.get(
+        "/incarnations/search", params={"template_data": ["color=red", "url=https://example.com/?a=b"]}
+    )
+
+    # THEN
+    assert response.status_code == HTTPStatus.OK
+    assert [i["incarnation_repository"] for i in response.json()] == ["red"]
+
+
+async def test_api_search_incarnations_rejects_template_data_without_value(api_client: AsyncClient):
+    # WHEN
+    response = await api_client.get("/incarnations/search", params={"template_data": "color"})
+
+    # THEN
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+async def test_api_stream_incarnation_events_returns_not_found_for_unknown_incarnation(api_client: AsyncClient):
+    # WHEN
+    response = await api_client.get("/incarnations/123/events")
+
+    # THEN
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+async def test_server_sent_events_renders_the_published_events_of_the_incarnation():
+    # GIVEN
+    event_bus = EventBus()
+    change_service = Mock(spec=ChangeService)
+    change_service.get_incarnations_with_details = AsyncMock(return_value={})
+    events = _server_sent_events(1, change_service, event_bus, StatusRefresher(event_bus))
+
+    # WHEN
+    next_event = asyncio.create_task(events.__anext__())
+    await asyncio.sleep(0)
+    event_bus.publish(ChangeEvent(incarnation_id=1, type=ChangeEventType.PUSHED, commit_sha="commit"))
+    chunk = await next_event
+    await events.aclose()
+
+    # THEN
+    assert chunk.startswith("event: pushed\ndata: {")
+    assert chunk.endswith("}\n\n")
+    assert '"commit_sha": "commit"' in chunk
+
+
+async def test_api_preview_incarnation_update_returns_bad_request_for_unknown_versions(
+    api_client: AsyncClient,
+    mocker: MockFixture,
+    change_service_mock: ChangeService,
+):
+    # GIVEN
+    change_service_mock.preview_change = mocker.AsyncMock(side_effect=RevisionNotFoundError(b"v4.7.1"))  # type: ignore
+
+    # WHEN
+    response = await api_client.get("/incarnations/1/preview", params={"version": "v4.7.1"})
+
+    # THEN
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {
+        "message": "Git failed with an unexpected non-zero exit code: 'Revision 'v4.7.1' not found.'"
+    }
+
+
 async def test_api_create_incarnation(
     api_client: AsyncClient,
     app: FastAPI,
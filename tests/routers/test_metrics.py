@@ -0,0 +1,19 @@
+from http import HTTPStatus
+
+from httpx import AsyncClient
+
+from foxops.utils import SubprocessKind, check_call
+
+
+async def should_respond_with_the_metrics_of_the_subprocess_schedulers(unauthenticated_client: AsyncClient):
+    # GIVEN
+    await check_call("true", kind=SubprocessKind.NETWORK)
+
+    # WHEN
+    response = await unauthenticated_client.get("/metrics")
+
+    # THEN
+    assert response.status_code == HTTPStatus.OK
+    assert "# TYPE foxops_subprocess_slot_wait_seconds_total counter" in response.text
+    assert 'foxops_subprocess_slot_wait_seconds_max{kind="local"} ' in response.text
+    assert 'foxops_subprocess_slot_acquisitions_total{kind="network"} 1\n' in response.text
@@ -1,25 +1,36 @@
 import asyncio
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 import pytest
 from pytest import fixture
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncEngine
 
-from foxops.database.repositories.change import ChangeRepository
+from foxops.database.repositories.change import (
+    ChangeNotFoundError,
+    ChangeRepository,
+    ChangeType,
+)
 from foxops.database.repositories.incarnation.errors import IncarnationNotFoundError
 from foxops.database.repositories.incarnation.repository import IncarnationRepository
+from foxops.database.schema import change as change_table
 from foxops.engine import load_incarnation_state
+from foxops.engine.patching.git_diff_patch import PatchResult
+from foxops.external.git import RevisionNotFoundError
 from foxops.hosters.local import LocalHoster
-from foxops.hosters.types import MergeRequestStatus
+from foxops.hosters.types import MergeRequestStatus, ReconciliationStatus
 from foxops.models import Incarnation
 from foxops.models.change import ChangeWithMergeRequest
 from foxops.services.change import (
+    ChangeInProgress,
     ChangeRejectedDueToNoChanges,
     ChangeService,
     IncarnationAlreadyExists,
     _construct_merge_request_conflict_description,
     delete_all_files_in_local_git_repository,
 )
+from foxops.services.events import ChangeEventType, EventBus
 
 
 @fixture(scope="function")
@@ -308,6 +319,65 @@ async def test_create_change_direct_succeeds_when_the_previous_change_was_not_me
     assert change.commit_sha != previous_commit_sha
 
 
+async def test_create_change_direct_fails_without_cloning_when_version_and_data_are_unchanged(
+    change_service: ChangeService, local_hoster: LocalHoster, initialized_incarnation: Incarnation, monkeypatch
+):
+    # GIVEN
+    def cloned_repository(*args, **kwargs):
+        raise AssertionError("no repository must be cloned")
+
+    monkeypatch.setattr(local_hoster, "cloned_repository", cloned_repository)
+
+    # THEN
+    with pytest.raises(ChangeRejectedDueToNoChanges):
+        await change_service.create_change_direct(initialized_incarnation.id, requested_version="v1.0.0")
+
+
+async def test_create_change_direct_renders_a_branch_that_moved_since_it_was_last_resolved(
+    change_service: ChangeService,
+    local_hoster: LocalHoster,
+    git_repo_template: str,
+    initialized_incarnation: Incarnation,
+):
+    # GIVEN
+    async with local_hoster.cloned_repository(git_repo_template) as repo:
+        branch = await repo.current_branch()
+    await change_service.create_change_direct(initialized_incarnation.id, requested_version=branch)
+    # the branch is resolved (and cached) to tell that repeating the change is a no-op
+    with pytest.raises(ChangeRejectedDueToNoChanges):
+        await change_service.create_change_direct(initialized_incarnation.id, requested_version=branch)
+
+    async with local_hoster.cloned_repository(git_repo_template) as repo:
+        (repo.directory / "template" / "README.md").write_text("Hello, world4!")
+        await repo.commit_all("update")
+        await repo.push()
+        moved_commit_sha = await repo.head()
+
+    # WHEN
+    change = await change_service.create_change_direct(initialized_incarnation.id, requested_version=branch)
+
+    # THEN
+    assert change.requested_version_hash == moved_commit_sha
+
+
+async def test_create_change_direct_succeeds_when_repeating_a_change_that_was_not_merged(
+    change_service: ChangeService, local_hoster: LocalHoster, initialized_incarnation: Incarnation
+):
+    # GIVEN
+    unmerged_change = await change_service.create_change_merge_request(
+        incarnation_id=initialized_incarnation.id,
+        requested_version="v1.1.0",
+        automerge=False,
+    )
+    local_hoster.close_merge_request(initialized_incarnation.incarnation_repository, unmerged_change.merge_request_id)
+
+    # WHEN
+    change = await change_service.create_change_direct(initialized_incarnation.id, requested_version="v1.1.0")
+
+    # THEN
+    assert change.revision == unmerged_change.revision + 1
+
+
 async def test_create_change_merge_request_succeeds_when_updating_the_template_version_without_automerge(
     change_service: ChangeService, initialized_incarnation: Incarnation
 ):
@@ -475,6 +545,311 @@ async def test_reset_incarnation_fails_when_incarnation_does_not_exist(change_se
         await change_service.reset_incarnation(123456789)
 
 
+async def test_preview_change_returns_patch_and_conflicts_without_pushing(
+    change_service: ChangeService, initialized_incarnation_with_customizations: Incarnation, local_hoster: LocalHoster
+):
+    # GIVEN
+    incarnation = initialized_incarnation_with_customizations
+    head = await local_hoster.resolve_revision(incarnation.incarnation_repository, "HEAD")
+
+    # WHEN
+    preview = await change_service.preview_change(incarnation.id, requested_version="v1.1.0")
+
+    # THEN
+    assert preview.requested_version == "v1.1.0"
+    assert preview.conflicts == ["README.md"]
+    assert "+template_repository_version: v1.1.0" in preview.patch
+    assert "README.md" in preview.patch
+    assert await local_hoster.resolve_revision(incarnation.incarnation_repository, "HEAD") == head
+
+
+async def test_preview_change_reports_the_commit_of_the_requested_version(
+    change_service: ChangeService,
+    local_hoster: LocalHoster,
+    git_repo_template: str,
+    initialized_incarnation: Incarnation,
+):
+    # GIVEN
+    tag = await local_hoster.resolve_revision(git_repo_template, "v1.1.0")
+    assert tag is not None
+
+    # WHEN
+    # an abbreviated commit SHA can't be resolved without cloning the template repository
+    preview = await change_service.preview_change(initialized_incarnation.id, requested_version=tag.sha[:12])
+
+    # THEN
+    assert preview.requested_version_hash == tag.sha
+
+
+async def test_preview_change_fails_for_unknown_versions(
+    change_service: ChangeService, initialized_incarnation: Incarnation
+):
+    # THEN
+    with pytest.raises(RevisionNotFoundError):
+        await change_service.preview_change(initialized_incarnation.id, requested_version="v4.7.1")
+
+
+async def test_preview_change_returns_an_empty_patch_if_the_update_changes_nothing(
+    change_service: ChangeService, initialized_incarnation: Incarnation, mocker
+):
+    # GIVEN
+    mocker.patch(
+        "foxops.engine.update_incarnation_from_git_template_repository",
+        mocker.AsyncMock(return_value=(True, None, PatchResult(conflicts=[], deleted=[]))),
+    )
+
+    # WHEN
+    preview = await change_service.preview_change(initialized_incarnation.id, requested_version="v1.1.0")
+
+    # THEN
+    assert preview.patch == ""
+    assert preview.conflicts == []
+
+
+async def test_preview_change_is_cached_until_the_incarnation_repository_moves(
+    change_service: ChangeService, initialized_incarnation: Incarnation, local_hoster: LocalHoster, mocker
+):
+    # GIVEN
+    cloned_repository_spy = mocker.spy(local_hoster, "cloned_repository")
+    preview = await change_service.preview_change(initialized_incarnation.id, requested_version="v1.1.0")
+    assert cloned_repository_spy.call_count == 2
+
+    # WHEN
+    cached_preview = await change_service.preview_change(initialized_incarnation.id, requested_version="v1.1.0")
+    cached_preview_clones = cloned_repository_spy.call_count
+    await change_service.create_change_direct(initialized_incarnation.id, "v1.2.0")
+    cloned_repository_spy.reset_mock()
+    updated_preview = await change_service.preview_change(initialized_incarnation.id, requested_version="v1.1.0")
+
+    # THEN
+    assert cached_preview == preview
+    assert cached_preview_clones == 2
+    assert preview.conflicts == []
+    assert "+Hello, world2!" in preview.patch
+    assert cloned_repository_spy.call_count == 2
+    assert "-Hello, world3!" in updated_preview.patch
+
+
+async def test_get_incarnation_with_details_caches_the_status_until_the_incarnation_changes(
+    change_service: ChangeService, initialized_incarnation: Incarnation, local_hoster: LocalHoster, mocker
+):
+    # GIVEN
+    get_reconciliation_status_spy = mocker.spy(local_hoster, "get_reconciliation_status")
+    details = await change_service.get_incarnation_with_details(initialized_incarnation.id)
+
+    # WHEN
+    cached_details = await change_service.get_incarnation_with_details(initialized_incarnation.id)
+    cached_details_status_lookups = get_reconciliation_status_spy.call_count
+    await change_service.create_change_direct(initialized_incarnation.id, "v1.1.0")
+    updated_details = await change_service.get_incarnation_with_details(initialized_incarnation.id)
+
+    # THEN
+    assert cached_details == details
+    assert cached_details_status_lookups == 1
+    assert get_reconciliation_status_spy.call_count == 2
+    assert updated_details.template_repository_version == "v1.1.0"
+
+
+async def test_list_incarnations_with_status_looks_up_the_statuses_in_a_single_batch(
+    change_service: ChangeService,
+    initialized_incarnation: Incarnation,
+    git_repo_template: str,
+    local_hoster: LocalHoster,
+    mocker,
+):
+    # GIVEN
+    await local_hoster.create_repository("other_incarnation")
+    await change_service.create_incarnation(
+        incarnation_repository="other_incarnation",
+        template_repository=git_repo_template,
+        template_repository_version="v1.0.0",
+        template_data={},
+    )
+    get_change_statuses_spy = mocker.spy(local_hoster, "get_change_statuses")
+
+    # WHEN
+    incarnations = await change_service.list_incarnations(with_status=True)
+    cached_incarnations = await change_service.list_incarnations(with_status=True)
+
+    # THEN
+    assert [i.status for i in incarnations] == [ReconciliationStatus.SUCCESS, ReconciliationStatus.SUCCESS]
+    assert cached_incarnations == incarnations
+    get_change_statuses_spy.assert_called_once()
+    assert len(get_change_statuses_spy.call_args.args[0]) == 2
+
+
+async def test_get_incarnations_with_details_leaves_out_unknown_incarnations(
+    change_service: ChangeService, initialized_incarnation: Incarnation
+):
+    # WHEN
+    details = await change_service.get_incarnations_with_details([initialized_incarnation.id, 4711])
+
+    # THEN
+    assert list(details) == [initialized_incarnation.id]
+    assert details[initialized_incarnation.id] == await change_service.get_incarnation_with_details(
+        initialized_incarnation.id
+    )
+
+
+async def test_create_change_direct_publishes_the_progress_of_the_change(
+    test_async_engine: AsyncEngine,
+    incarnation_repository: IncarnationRepository,
+    local_hoster: LocalHoster,
+    initialized_incarnation: Incarnation,
+):
+    # GIVEN
+    event_bus = EventBus()
+    change_service = ChangeService(
+        hoster=local_hoster,
+        incarnation_repository=incarnation_repository,
+        change_repository=ChangeRepository(test_async_engine),
+        event_bus=event_bus,
+    )
+
+    with event_bus.subscribe(initialized_incarnation.id) as events:
+        # WHEN
+        change = await change_service.create_change_direct(initialized_incarnation.id, "v1.1.0")
+
+        # THEN
+        published = [events.get_nowait() for _ in range(events.qsize())]
+    assert [e.type for e in published] == [ChangeEventType.CLONED, ChangeEventType.PATCHED, ChangeEventType.PUSHED]
+    assert published[-1].change_id == change.id
+    assert published[-1].commit_sha == change.commit_sha
+
+
+async def test_update_incomplete_changes_completes_pushed_changes_and_deletes_the_others(
+    change_service: ChangeService,
+    change_repository: ChangeRepository,
+    initialized_incarnation: Incarnation,
+    local_hoster: LocalHoster,
+    mocker,
+):
+    # GIVEN
+    mocker.patch("foxops.services.change.INCOMPLETE_CHANGE_GRACE_PERIOD", timedelta(0))
+    # the in-memory test database shares a single connection, which doesn't support concurrent transactions
+    mocker.patch("foxops.services.change.INCOMPLETE_CHANGES_BATCH_SIZE", 1)
+    async with local_hoster.cloned_repository(initialized_incarnation.incarnation_repository) as repo:
+        await repo.create_and_checkout_branch("foxops-update")
+        (repo.directory / "README.md").write_text("Hello, update!")
+        await repo.commit_all("update")
+        await repo.push()
+        pushed_commit_sha = await repo.head()
+
+    unpushed_change = await change_repository.create_change(
+        incarnation_id=initialized_incarnation.id,
+        revision=2,
+        change_type=ChangeType.DIRECT,
+        commit_sha="0" * 40,
+        commit_pushed=False,
+        requested_version_hash="dummy",
+        requested_version="v1.1.0",
+        requested_data={},
+    )
+    merge_request_change = await change_repository.create_change(
+        incarnation_id=initialized_incarnation.id,
+        revision=3,
+        change_type=ChangeType.MERGE_REQUEST,
+        commit_sha=pushed_commit_sha,
+        commit_pushed=False,
+        requested_version_hash="dummy",
+        requested_version="v1.1.0",
+        requested_data={},
+        merge_request_branch_name="foxops-update",
+    )
+
+    # WHEN
+    updated = await change_service.update_incomplete_changes()
+
+    # THEN
+    assert updated == 2
+    with pytest.raises(ChangeNotFoundError):
+        await change_repository.get_change(unpushed_change.id)
+
+    completed_change = await change_service.get_change_with_merge_request(merge_request_change.id)
+    assert completed_change.merge_request_status == MergeRequestStatus.OPEN
+    assert await change_repository.list_incomplete_changes(updated_before=datetime.now(timezone.utc)) == []
+
+
+async def test_update_incomplete_change_creates_the_merge_request_the_change_was_created_with(
+    change_service: ChangeService,
+    change_repository: ChangeRepository,
+    initialized_incarnation: Incarnation,
+    local_hoster: LocalHoster,
+    mocker,
+):
+    # GIVEN
+    mocker.patch("foxops.services.change.INCOMPLETE_CHANGE_GRACE_PERIOD", timedelta(0))
+    async with local_hoster.cloned_repository(initialized_incarnation.incarnation_repository) as repo:
+        await repo.create_and_checkout_branch("foxops-update")
+        (repo.directory / "README.md").write_text("Hello, update!")
+        await repo.commit_all("update")
+        await repo.push()
+        pushed_commit_sha = await repo.head()
+
+    change = await change_repository.create_change(
+        incarnation_id=initialized_incarnation.id,
+        revision=2,
+        change_type=ChangeType.MERGE_REQUEST,
+        commit_sha=pushed_commit_sha,
+        commit_pushed=True,
+        requested_version_hash="dummy",
+        requested_version="v1.1.0",
+        requested_data={},
+        merge_request_branch_name="foxops-update",
+        merge_request_title="🚧 - CONFLICT: Update to v1.1.0",
+        merge_request_description="conflicts",
+        merge_request_automerge=True,
+    )
+    merge_request_spy = mocker.spy(local_hoster, "merge_request")
+
+    # WHEN
+    await change_service.update_incomplete_change(change.id)
+
+    # THEN
+    merge_request_spy.assert_called_once_with(
+        incarnation_repository=initialized_incarnation.incarnation_repository,
+        source_branch="foxops-update",
+        title="🚧 - CONFLICT: Update to v1.1.0",
+        description="conflicts",
+        with_automerge=True,
+    )
+
+
+async def test_update_incomplete_change_skips_old_changes_which_made_progress_recently(
+    test_async_engine: AsyncEngine,
+    change_service: ChangeService,
+    change_repository: ChangeRepository,
+    initialized_incarnation: Incarnation,
+):
+    # GIVEN
+    change = await change_repository.create_change(
+        incarnation_id=initialized_incarnation.id,
+        revision=2,
+        change_type=ChangeType.DIRECT,
+        commit_sha="0" * 40,
+        commit_pushed=False,
+        requested_version_hash="dummy",
+        requested_version="v1.1.0",
+        requested_data={},
+    )
+    an_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    async with test_async_engine.begin() as conn:
+        await conn.execute(
+            update(change_table)
+            .values(created_at=an_hour_ago, updated_at=an_hour_ago)
+            .where(change_table.c.id == change.id)
+        )
+    await change_repository.touch_change(change.id)
+
+    # WHEN
+    with pytest.raises(ChangeInProgress):
+        await change_service.update_incomplete_change(change.id)
+
+    # THEN
+    assert await change_repository.get_change(change.id) is not None
+    assert await change_service.update_incomplete_changes() == 0
+
+
 def test_delete_all_files_in_local_git_repository_removes_hidden_directories_and_files(tmp_path):
     # GIVEN
     (tmp_path / ".dummy_folder").mkdir()
@@ -0,0 +1,175 @@
+from pathlib import Path
+
+from pytest import fixture
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from foxops.database.repositories.change import ChangeRepository
+from foxops.database.repositories.drift import DriftRepository
+from foxops.database.repositories.incarnation.repository import IncarnationRepository
+from foxops.hosters.local import LocalHoster
+from foxops.services.change import ChangeService
+from foxops.services.drift import DriftService
+
+
+@fixture(scope="function")
+def local_hoster(tmp_path) -> LocalHoster:
+    return LocalHoster(Path(tmp_path))
+
+
+@fixture(scope="function")
+async def git_repo_template(local_hoster: LocalHoster) -> str:
+    repo_name = "template"
+    await local_hoster.create_repository(repo_name)
+
+    async with local_hoster.cloned_repository(repo_name) as repo:
+        (repo.directory / "template" / "subdir").mkdir(parents=True)
+        (repo.directory / "template" / "README.md").write_text("Hello, {{ name }}!")
+        (repo.directory / "template" / "subdir" / "run.sh").write_text("#!/bin/sh\n")
+        (repo.directory / "template" / "subdir" / "run.sh").chmod(0o755)
+        (repo.directory / "fengine.yaml").write_text(
+            "variables:\n  name:\n    type: str\n    description: the name\n    default: world\n"
+        )
+        await repo.commit_all("Initial commit")
+        await repo.tag("v1.0.0")
+        await repo.push(tags=True)
+
+    return repo_name
+
+
+@fixture(scope="function")
+async def change_service(
+    test_async_engine: AsyncEngine, incarnation_repository: IncarnationRepository, local_hoster: LocalHoster
+) -> ChangeService:
+    return ChangeService(
+        hoster=local_hoster,
+        incarnation_repository=incarnation_repository,
+        change_repository=ChangeRepository(test_async_engine),
+    )
+
+
+@fixture(scope="function")
+async def drift_service(
+    test_async_engine: AsyncEngine, incarnation_repository: IncarnationRepository, local_hoster: LocalHoster
+) -> DriftService:
+    return DriftService(
+        hoster=local_hoster,
+        incarnation_repository=incarnation_repository,
+        drift_repository=DriftRepository(test_async_engine),
+    )
+
+
+async def create_incarnation(
+    local_hoster: LocalHoster, change_service: ChangeService, template: str, repo_name: str, target_directory: str = "."
+) -> int:
+    await local_hoster.create_repository(repo_name)
+    change = await change_service.create_incarnation(
+        incarnation_repository=repo_name,
+        target_directory=target_directory,
+        template_repository=template,
+        template_repository_version="v1.0.0",
+        template_data={"name": "foxops"},
+    )
+    return change.incarnation_id
+
+
+async def test_scan_reports_no_drift_for_a_pristine_incarnation(
+    local_hoster: LocalHoster, git_repo_template: str, change_service: ChangeService, drift_service: DriftService
+):
+    # GIVEN
+    incarnation_id = await create_incarnation(
+        local_hoster, change_service, git_repo_template, "incarnation", target_directory="subdir"
+    )
+
+    # WHEN
+    drift = await drift_service.scan(incarnation_id)
+
+    # THEN
+    assert drift is not None
+    assert not drift.drifted
+    assert drift == await drift_service.get(incarnation_id)
+
+
+async def test_scan_reports_added_modified_and_removed_files(
+    local_hoster: LocalHoster, git_repo_template: str, change_service: ChangeService, drift_service: DriftService
+):
+    # GIVEN
+    incarnation_id = await create_incarnation(local_hoster, change_service, git_repo_template, "incarnation")
+    async with local_hoster.cloned_repository("incarnation") as repo:
+        (repo.directory / "README.md").write_text("Hello, customized!")
+        (repo.directory / "subdir" / "run.sh").chmod(0o644)
+        (repo.directory / "CONTRIBUTING.md").write_text("more files with content")
+        await repo.commit_all("some customizations")
+        await repo.push()
+
+    # WHEN
+    drift = await drift_service.scan(incarnation_id)
+
+    # THEN
+    assert drift is not None
+    assert drift.drifted
+    assert drift.added_files == ["CONTRIBUTING.md"]
+    assert drift.modified_files == ["README.md", "subdir/run.sh"]
+    assert drift.removed_files == []
+
+    # WHEN
+    async with local_hoster.cloned_repository("incarnation") as repo:
+        (repo.directory / "README.md").unlink()
+        await repo.commit_all("remove readme")
+        await repo.push()
+    drift = await drift_service.scan(incarnation_id)
+
+    # THEN
+    assert drift is not None
+    assert drift.modified_files == ["subdir/run.sh"]
+    assert drift.removed_files == ["README.md"]
+
+
+async def test_incremental_scan_skips_incarnations_whose_head_did_not_change(
+    mocker: MockerFixture,
+    local_hoster: LocalHoster,
+    git_repo_template: str,
+    change_service: ChangeService,
+    drift_service: DriftService,
+):
+    # GIVEN
+    incarnation_id = await create_incarnation(local_hoster, change_service, git_repo_template, "incarnation")
+    first_drift = await drift_service.scan(incarnation_id)
+    get_repository_tree = mocker.spy(local_hoster, "get_repository_tree")
+
+    # WHEN
+    second_drift = await drift_service.scan(incarnation_id)
+
+    # THEN
+    assert second_drift == first_drift
+    get_repository_tree.assert_not_called()
+
+    # WHEN
+    await drift_service.scan(incarnation_id, incremental=False)
+
+    # THEN
+    get_repository_tree.assert_called_once()
+
+
+async def test_scan_all_renders_each_template_version_and_data_only_once(
+    mocker: MockerFixture,
+    local_hoster: LocalHoster,
+    git_repo_template: str,
+    change_service: ChangeService,
+    drift_service: DriftService,
+):
+    # GIVEN
+    for i in range(3):
+        await create_incarnation(local_hoster, change_service, git_repo_template, f"incarnation-{i}")
+    cloned_repository = mocker.spy(local_hoster, "cloned_repository")
+
+    # WHEN
+    drifts = await drift_service.scan_all(max_concurrency=2)
+
+    # THEN
+    assert len(drifts) == 3
+    assert not any(d.drifted for d in drifts)
+    assert cloned_repository.call_count == 1
+    assert [d.incarnation_id for d in await drift_service.list_drift(drifted=False)] == [
+        d.incarnation_id for d in drifts
+    ]
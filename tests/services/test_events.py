@@ -0,0 +1,123 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, Mock
+
+from foxops.hosters.types import MergeRequestStatus, ReconciliationStatus
+from foxops.models import IncarnationWithDetails
+from foxops.services.change import ChangeService
+from foxops.services.events import (
+    ChangeEvent,
+    ChangeEventType,
+    EventBus,
+    StatusRefresher,
+)
+
+
+def incarnation_details(
+    status: ReconciliationStatus, merge_request_status: MergeRequestStatus | None
+) -> IncarnationWithDetails:
+    return IncarnationWithDetails(
+        id=1,
+        incarnation_repository="incarnation",
+        target_directory=".",
+        commit_sha="commit",
+        commit_url="https://example.com/commit",
+        merge_request_id=None if merge_request_status is None else "1",
+        merge_request_url=None,
+        merge_request_status=merge_request_status,
+        status=status,
+        template_repository=None,
+        template_repository_version=None,
+        template_repository_version_hash=None,
+        template_data=None,
+    )
+
+
+def test_event_bus_publishes_events_to_the_subscribers_of_the_incarnation():
+    # GIVEN
+    event_bus = EventBus()
+
+    with event_bus.subscribe(1) as events, event_bus.subscribe(2) as other_events:
+        # WHEN
+        event_bus.publish(ChangeEvent(incarnation_id=1, type=ChangeEventType.PUSHED))
+
+        # THEN
+        assert events.get_nowait().type == ChangeEventType.PUSHED
+        assert other_events.empty()
+
+
+def test_event_bus_drops_the_oldest_events_of_slow_subscribers():
+    # GIVEN
+    event_bus = EventBus(max_queued_events=2)
+
+    with event_bus.subscribe(1) as events:
+        # WHEN
+        for event_type in [ChangeEventType.CLONED, ChangeEventType.PATCHED, ChangeEventType.PUSHED]:
+            event_bus.publish(ChangeEvent(incarnation_id=1, type=event_type))
+
+        # THEN
+        assert [events.get_nowait().type, events.get_nowait().type] == [
+            ChangeEventType.PATCHED,
+            ChangeEventType.PUSHED,
+        ]
+
+
+async def test_status_refresher_publishes_the_current_statuses_and_their_changes():
+    # GIVEN
+    event_bus = EventBus()
+    status_refresher = StatusRefresher(event_bus, interval=timedelta(seconds=0))
+    change_service = Mock(spec=ChangeService)
+    change_service.get_incarnations_with_details = AsyncMock(
+        side_effect=[
+            {1: incarnation_details(ReconciliationStatus.PENDING, MergeRequestStatus.OPEN)},
+            {1: incarnation_details(ReconciliationStatus.PENDING, MergeRequestStatus.OPEN)},
+            {1: incarnation_details(ReconciliationStatus.SUCCESS, MergeRequestStatus.MERGED)},
+        ]
+        + [{1: incarnation_details(ReconciliationStatus.SUCCESS, MergeRequestStatus.MERGED)}] * 100
+    )
+
+    with event_bus.subscribe(1) as events:
+        # WHEN
+        async with (
+            status_refresher.watching(1, change_service, events),
+            status_refresher.watching(1, change_service, events),
+        ):
+            received = [await asyncio.wait_for(events.get(), timeout=1) for _ in range(4)]
+
+    # THEN
+    assert [(e.type, e.status) for e in received] == [
+        (ChangeEventType.MERGE_REQUEST_STATUS, "open"),
+        (ChangeEventType.PIPELINE_STATUS, "pending"),
+        (ChangeEventType.MERGE_REQUEST_STATUS, "merged"),
+        (ChangeEventType.PIPELINE_STATUS, "success"),
+    ]
+    change_service.get_incarnations_with_details.assert_called_with([1])
+
+
+async def test_status_refresher_sends_the_current_statuses_to_late_watchers():
+    # GIVEN
+    event_bus = EventBus()
+    status_refresher = StatusRefresher(event_bus, interval=timedelta(minutes=1))
+    change_service = Mock(spec=ChangeService)
+    change_service.get_incarnations_with_details = AsyncMock(
+        return_value={1: incarnation_details(ReconciliationStatus.PENDING, MergeRequestStatus.OPEN)}
+    )
+
+    with event_bus.subscribe(1) as first_events:
+        async with status_refresher.watching(1, change_service, first_events):
+            first_received = [await asyncio.wait_for(first_events.get(), timeout=1) for _ in range(2)]
+
+            # WHEN
+            with event_bus.subscribe(1) as late_events:
+                async with status_refresher.watching(1, change_service, late_events):
+                    late_received = [await asyncio.wait_for(late_events.get(), timeout=1) for _ in range(2)]
+
+            # THEN
+            assert first_events.empty()
+
+    assert [(e.type, e.status) for e in late_received] == [(e.type, e.status) for e in first_received]
+    assert [(e.type, e.status) for e in late_received] == [
+        (ChangeEventType.MERGE_REQUEST_STATUS, "open"),
+        (ChangeEventType.PIPELINE_STATUS, "pending"),
+    ]
+    change_service.get_incarnations_with_details.assert_called_once()
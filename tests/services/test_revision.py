@@ -0,0 +1,122 @@
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, Mock
+
+from pytest import fixture
+
+from foxops.external.git import ResolvedRevision, RevisionKind
+from foxops.hosters.local import LocalHoster
+from foxops.services.revision import RevisionResolver
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@fixture
+def hoster() -> Mock:
+    revisions = {
+        "v1.0.0": ResolvedRevision("1" * 40, RevisionKind.TAG),
+        "main": ResolvedRevision("2" * 40, RevisionKind.BRANCH),
+        "3" * 40: ResolvedRevision("3" * 40, RevisionKind.COMMIT),
+    }
+
+    async def resolve_revision(repository: str, revision: str) -> ResolvedRevision | None:
+        await asyncio.sleep(0)
+        return revisions.get(revision)
+
+    hoster = Mock(spec=LocalHoster)
+    hoster.resolve_revision = AsyncMock(side_effect=resolve_revision)
+    return hoster
+
+
+async def test_resolve_caches_tags_longer_than_branches(hoster: Mock, clock: FakeClock):
+    # GIVEN
+    resolver = RevisionResolver(tag_ttl=timedelta(hours=1), branch_ttl=timedelta(seconds=30), clock=clock)
+    assert await resolver.resolve(hoster, "template", "v1.0.0") == "1" * 40
+    assert await resolver.resolve(hoster, "template", "main") == "2" * 40
+
+    # WHEN
+    clock.now = 60
+    await resolver.resolve(hoster, "template", "v1.0.0")
+    await resolver.resolve(hoster, "template", "main")
+
+    # THEN
+    assert [c.args[1] for c in hoster.resolve_revision.call_args_list] == ["v1.0.0", "main", "main"]
+
+
+async def test_resolve_fresh_resolves_branches_at_the_remote(hoster: Mock, clock: FakeClock):
+    # GIVEN
+    resolver = RevisionResolver(clock=clock)
+    for revision in ["v1.0.0", "main", "3" * 40]:
+        await resolver.resolve(hoster, "template", revision)
+
+    # WHEN
+    for revision in ["v1.0.0", "main", "3" * 40]:
+        await resolver.resolve(hoster, "template", revision, fresh=True)
+
+    # THEN
+    assert [c.args[1] for c in hoster.resolve_revision.call_args_list] == ["v1.0.0", "main", "3" * 40, "main"]
+
+
+async def test_resolve_caches_commit_shas_forever(hoster: Mock, clock: FakeClock):
+    # GIVEN
+    resolver = RevisionResolver(clock=clock)
+    await resolver.resolve(hoster, "template", "3" * 40)
+
+    # WHEN
+    clock.now = timedelta(days=365).total_seconds()
+    await resolver.resolve(hoster, "template", "3" * 40)
+
+    # THEN
+    assert hoster.resolve_revision.call_count == 1
+
+
+async def test_resolve_does_not_cache_unresolvable_revisions(hoster: Mock):
+    # GIVEN
+    resolver = RevisionResolver()
+
+    # WHEN
+    assert await resolver.resolve(hoster, "template", "abc123") is None
+    assert await resolver.resolve(hoster, "template", "abc123") is None
+
+    # THEN
+    assert hoster.resolve_revision.call_count == 2
+
+
+async def test_resolve_evicts_least_recently_used_entries(hoster: Mock):
+    # GIVEN
+    resolver = RevisionResolver(maxsize=2)
+    await resolver.resolve(hoster, "template", "v1.0.0")
+    await resolver.resolve(hoster, "template", "main")
+    await resolver.resolve(hoster, "template", "v1.0.0")
+
+    # WHEN
+    await resolver.resolve(hoster, "template", "3" * 40)
+
+    # THEN
+    hoster.resolve_revision.reset_mock()
+    await resolver.resolve(hoster, "template", "v1.0.0")
+    await resolver.resolve(hoster, "template", "main")
+    assert [c.args[1] for c in hoster.resolve_revision.call_args_list] == ["main"]
+
+
+async def test_resolve_shares_a_single_lookup_between_concurrent_callers(hoster: Mock):
+    # GIVEN
+    resolver = RevisionResolver()
+
+    # WHEN
+    results = await asyncio.gather(*[resolver.resolve(hoster, "template", "main") for _ in range(10)])
+
+    # THEN
+    assert results == ["2" * 40] * 10
+    assert hoster.resolve_revision.call_count == 1
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from foxops.hosters.types import MergeRequestStatus, ReconciliationStatus
+from foxops.services.status import ChangeStatus, ChangeStatusCache, ChangeStatusKey
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_change_status_cache_keeps_final_statuses_longer():
+    # GIVEN
+    clock = FakeClock()
+    cache = ChangeStatusCache(ttl=timedelta(seconds=5), final_ttl=timedelta(minutes=5), clock=clock)
+    pending = ChangeStatus(ReconciliationStatus.PENDING, MergeRequestStatus.OPEN)
+    final = ChangeStatus(ReconciliationStatus.SUCCESS, MergeRequestStatus.MERGED)
+    cache.put(ChangeStatusKey(1, "sha", "1"), pending)
+    cache.put(ChangeStatusKey(2, "sha", "2"), final)
+
+    # WHEN
+    clock.now = 10
+
+    # THEN
+    assert cache.get(ChangeStatusKey(1, "sha", "1")) is None
+    assert cache.get(ChangeStatusKey(2, "sha", "2")) == final
+
+
+def test_change_status_cache_keeps_the_version_of_unchanged_statuses():
+    # GIVEN
+    clock = FakeClock()
+    cache = ChangeStatusCache(ttl=timedelta(seconds=5), clock=clock)
+    key = ChangeStatusKey(1, "sha", "1")
+    cache.put(key, ChangeStatus(ReconciliationStatus.PENDING, MergeRequestStatus.OPEN))
+    version = cache.version(key)
+
+    # WHEN
+    clock.now = 10
+    expired_version = cache.version(key)
+    cache.put(key, ChangeStatus(ReconciliationStatus.PENDING, MergeRequestStatus.OPEN))
+    unchanged_version = cache.version(key)
+    cache.put(key, ChangeStatus(ReconciliationStatus.SUCCESS, MergeRequestStatus.OPEN))
+
+    # THEN
+    assert version is not None
+    assert expired_version is None
+    assert unchanged_version == version
+    assert cache.version(key) not in (None, version)
+    assert cache.version(ChangeStatusKey(2, "sha", "2")) is None
+
+
+def test_change_status_is_not_final_while_the_merge_request_is_open():
+    assert not ChangeStatus(ReconciliationStatus.SUCCESS, MergeRequestStatus.OPEN).final
+    assert not ChangeStatus(ReconciliationStatus.PENDING, None).final
+    assert ChangeStatus(ReconciliationStatus.FAILED, None).final
@@ -3,7 +3,7 @@ from subprocess import CalledProcessError
 
 import pytest
 
-from foxops.utils import check_call
+from foxops.utils import FairScheduler, LoopLocal, check_call, gather_or_cancel
 
 
 async def test_check_call_should_raise_exception_on_non_zero_exit_code():
@@ -49,6 +49,18 @@ async def test_check_call_should_forward_args():
     assert await proc.stdout.read() == b"Hello World\n"
 
 
+async def test_check_call_should_not_block_on_large_outputs():
+    # GIVEN
+    program = "head"
+    args = ["-c", "1000000", "/dev/zero"]
+
+    # WHEN
+    proc = await check_call(program, *args, timeout=10)
+
+    # THEN
+    assert len(await proc.stdout.read()) == 1000000
+
+
 async def test_check_call_should_kill_process_when_timeout_is_exceeded():
     # GIVEN
     program = "sleep"
@@ -57,3 +69,118 @@ async def test_check_call_should_kill_process_when_timeout_is_exceeded():
     # WHEN & THEN
     with pytest.raises(asyncio.TimeoutError):
         await check_call(program, *args, timeout=0.5)
+
+
+def test_loop_local_holds_one_instance_per_event_loop():
+    # GIVEN
+    loop_local = LoopLocal(object)
+
+    async def get_twice():
+        return loop_local.get(), loop_local.get()
+
+    # WHEN
+    first_a, first_b = asyncio.run(get_twice())
+    second_a, second_b = asyncio.run(get_twice())
+
+    # THEN
+    assert first_a is first_b
+    assert second_a is second_b
+    assert first_a is not second_a
+
+
+async def test_gather_or_cancel_cancels_remaining_awaitables_when_one_fails():
+    # GIVEN
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing():
+        raise ValueError("failed")
+
+    # THEN
+    with pytest.raises(ValueError):
+        await gather_or_cancel(slow(), failing())
+    assert cancelled.is_set()
+
+
+async def test_fair_scheduler_limits_the_number_of_concurrent_operations():
+    # GIVEN
+    scheduler = FairScheduler("test", limit=2)
+    running = 0
+    max_running = 0
+
+    async def operation():
+        nonlocal running, max_running
+        async with scheduler.slot():
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    # WHEN
+    await asyncio.gather(*[operation() for _ in range(6)])
+
+    # THEN
+    assert max_running == 2
+    assert scheduler.running == 0
+    assert scheduler.acquisitions == 6
+    assert scheduler.max_wait_seconds > 0
+
+
+async def test_fair_scheduler_hands_out_slots_round_robin_between_keys():
+    # GIVEN
+    scheduler = FairScheduler("test", limit=1)
+    release = asyncio.Event()
+    order = []
+
+    async def blocker():
+        async with scheduler.slot("blocker"):
+            await release.wait()
+
+    async def operation(key: str, index: int):
+        async with scheduler.slot(key):
+            order.append(f"{key}{index}")
+
+    blocking_task = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+
+    # WHEN
+    tasks = [asyncio.create_task(operation("a", i)) for i in range(3)]
+    tasks += [asyncio.create_task(operation("b", i)) for i in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(blocking_task, *tasks)
+
+    # THEN
+    assert order == ["a0", "b0", "a1", "b1", "a2"]
+
+
+async def test_fair_scheduler_does_not_lose_slots_of_cancelled_waiters():
+    # GIVEN
+    scheduler = FairScheduler("test", limit=1)
+    release = asyncio.Event()
+
+    async def blocker():
+        async with scheduler.slot():
+            await release.wait()
+
+    blocking_task = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    waiting_task = asyncio.create_task(scheduler.slot().__aenter__())
+    await asyncio.sleep(0)
+
+    # WHEN
+    waiting_task.cancel()
+    release.set()
+    await blocking_task
+
+    # THEN
+    assert scheduler.queued == 0
+    assert scheduler.running == 0
+    async with scheduler.slot():
+        assert scheduler.running == 1